@@ -15,7 +15,7 @@ import {
   type UpdateType,
 } from "@langchain/langgraph/web";
 import ChatMessageList from "@/components/chat-message-list";
-import { uiMessageReducer } from "@langchain/langgraph-sdk/react-ui";
+import { API_URL } from "@/lib/api";
 
 // Define schema for Shopping Agent state
 const AgentState = Annotation.Root({
@@ -35,14 +35,8 @@ export default function ShoppingAgentPage() {
     { UpdateType: UpdateType<typeof AgentState.spec> } // Update type
   >({
     assistantId: "agent",
-    apiUrl: "http://127.0.0.1:2024",
+    apiUrl: API_URL,
     messagesKey: "messages",
-    // onCustomEvent: (event, options) => {
-    //   options.mutate((prev) => {
-    //     const ui = uiMessageReducer(prev.ui ?? [], event);
-    //     return { ...prev, ui };
-    //   });
-    // },
   });
   const { messages, values, submit, isLoading, stop } = stream;
 
@@ -79,7 +73,11 @@ export default function ShoppingAgentPage() {
           transition={{ duration: 0.6, delay: 0.2 }}
           className="w-full flex-1 bg-white/60 backdrop-blur-sm rounded-2xl border border-slate-200/50 shadow-sm overflow-hidden"
         >
-          <ChatMessageList messages={messages} values={values} stream={stream} />
+          <ChatMessageList
+            messages={messages}
+            values={values}
+            stream={stream}
+          />
         </motion.div>
 
         {/* Input Section */}
@@ -1,8 +1,8 @@
 import sqlite3
+from functools import lru_cache
 from typing import List, Dict, Union, Annotated, Sequence
 import uuid
 
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph.ui import AnyUIMessage, ui_message_reducer, push_ui_message, delete_ui_message
@@ -10,6 +10,10 @@ from langchain_core.messages import AIMessage, BaseMessage
 from langgraph.graph.message import add_messages, MessagesState
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt.chat_agent_executor import AgentState
+from langchain_core.runnables import RunnableLambda
+
+from render import attach_tables
+from shopping_agent.utils.tiering import MODELS, ModelRouter
 
 # 1. Connect to SQLite DB
 def get_db_connection():
@@ -303,7 +307,35 @@ def get_order_status(order_id: int) -> Union[Dict, str]:
 
 
 # 3. Build the agent
-llm = ChatOpenAI(model="gpt-4o-mini")
+@lru_cache(maxsize=None)
+def get_llm(tier: str = "large"):
+    """Builds the tier's chat model on first use and reuses it for the process."""
+    # Imported here: the OpenAI client stack is slow to import
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=MODELS[tier])
+
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools(tier: str = "large"):
+    """Returns the tier's chat model with the shop tools bound, built once per process."""
+    return get_llm(tier).bind_tools(tools)
+
+
+def select_model(state, runtime):
+    """Dynamic model for create_react_agent, so nothing is built at import time.
+
+    Each call goes through model_router: easy turns to the small model,
+    with bad tool calls redone by the large one (see utils/tiering.py in
+    shopping-chat-backend).
+    """
+    messages = state["messages"]
+    return RunnableLambda(
+        lambda history: model_router.invoke(
+            messages, history, tool_names, lambda names, tier: get_llm_with_tools(tier)
+        )
+    )
+
 
 shopping_prompt = """
 You are a helpful shopping assistant. 
@@ -317,14 +349,13 @@ Behavior Rules:
 5. If the tool result contains _ui: True, don’t re-state it to the user. Just return empty str because we are rendering the same info in the ui as special component.
 
 Shopping Interaction Rules:
-- When browsing products, show only relevant fields: product id, name, price, and stock.
-- When showing details for a single product, include id, name, price, and stock.
-- When showing cart, include product name, quantity, price, and total.
-- At checkout, confirm the order summary clearly.
+- Product lists, product details, carts and orders from the tools are shown to the user as tables under your reply automatically.
+- Mention at most the one or two facts that matter (e.g. how many products matched, the cart total).
+- At checkout, confirm the order clearly.
 
 Output Format:
-- Always give a short natural language summary (1–2 sentences).
-- If the answer contains structured data (like product lists, cart contents, or orders), present it as a **Markdown table** with only the most relevant columns.
+- Reply with a short natural language summary (1–2 sentences) only.
+- Do NOT write tables or list the products, cart items or order items yourself.
 - Do NOT show raw JSON or SQL queries.
 - Do NOT expose internal tool calls.
 
@@ -334,13 +365,8 @@ User: "Hi, how are you?"
 Assistant: "I’m doing great! Excited to help you shop today."
 
 User: "Show me the products"
-Assistant: 
-Here are the products available right now:
-
-| ID | Product    | Price | Stock |
-|----|------------|-------|-------|
-| 1  | Laptop     | 750   | 10    |
-| 2  | Smartphone | 500   | 25    |
+Assistant:
+Here are the 12 products available right now.
 
 User: "Add 2 headphones to my cart"
 Assistant:
@@ -348,13 +374,7 @@ Assistant:
 
 User: "View my cart"
 Assistant:
-Here’s what’s in your cart:
-
-| Product    | Quantity | Price | Subtotal |
-|------------|----------|-------|----------|
-| Headphones | 2        | 50    | 100      |
-
-Total: **$100**
+You have 2 Headphones in your cart, $100 in total.
 
 User: "Checkout"
 Assistant:
@@ -371,6 +391,8 @@ tools = [
     checkout,
     get_order_status,
 ]
+tool_names = frozenset(t.name for t in tools)
+model_router = ModelRouter(tools)
 
 
 class CustomAgentState(AgentState):
@@ -379,8 +401,10 @@ class CustomAgentState(AgentState):
 
 # 4. Create the agent with tools
 agent = create_react_agent(
-    model=llm,
+    model=select_model,
     tools=tools,
     # state_schema=CustomAgentState,
     prompt=shopping_prompt,
+    # Tables for the tool results are rendered, not generated
+    post_model_hook=attach_tables,
 )
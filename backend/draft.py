@@ -1,8 +1,8 @@
 import sqlite3
+from functools import lru_cache
 from typing import List, Dict, Union, Annotated, Sequence
 import uuid
 
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph.ui import AnyUIMessage, ui_message_reducer, push_ui_message, delete_ui_message
 from langchain_core.messages import AIMessage, BaseMessage
@@ -11,8 +11,11 @@ from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt.chat_agent_executor import AgentState
 from langgraph.graph import START, StateGraph
 from langgraph.prebuilt import tools_condition, ToolNode
-from IPython.display import Image, display
 
+import time
+
+from shopping_agent.utils.metrics import observe_llm_call, start_metrics_server, timed_node
+from render import with_tables
 from tools import (
     list_products,
     product_details,
@@ -25,7 +28,6 @@ from tools import (
 )
 
 # 3. Build the agent
-llm = ChatOpenAI(model="gpt-4o-mini")
 tools = [
     list_products,
     product_details,
@@ -37,7 +39,21 @@ tools = [
     get_weather,
 ]
 
-llm_with_tools = llm.bind_tools(tools)
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Builds the chat model on first use and reuses it for the process."""
+    # Imported here: the OpenAI client stack is slow to import
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model="gpt-4o-mini")
+
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools():
+    """Returns the chat model with the tools bound, built once per process."""
+    return get_llm().bind_tools(tools)
+
 
 shopping_prompt = """
 You are a helpful shopping assistant. 
@@ -51,14 +67,13 @@ Behavior Rules:
 5. If the tool result contains _ui: True, don’t re-state it to the user. Just return empty str because we are rendering the same info in the ui as special component.
 
 Shopping Interaction Rules:
-- When browsing products, show only relevant fields: product id, name, price, and stock.
-- When showing details for a single product, include id, name, price, and stock.
-- When showing cart, include product name, quantity, price, and total.
-- At checkout, confirm the order summary clearly.
+- Product lists, product details, carts and orders from the tools are shown to the user as tables under your reply automatically.
+- Mention at most the one or two facts that matter (e.g. how many products matched, the cart total).
+- At checkout, confirm the order clearly.
 
 Output Format:
-- Always give a short natural language summary (1–2 sentences).
-- If the answer contains structured data (like product lists, cart contents, or orders), present it as a **Markdown table** with only the most relevant columns.
+- Reply with a short natural language summary (1–2 sentences) only.
+- Do NOT write tables or list the products, cart items or order items yourself.
 - Do NOT show raw JSON or SQL queries.
 - Do NOT expose internal tool calls.
 
@@ -68,13 +83,8 @@ User: "Hi, how are you?"
 Assistant: "I’m doing great! Excited to help you shop today."
 
 User: "Show me the products"
-Assistant: 
-Here are the products available right now:
-
-| ID | Product    | Price | Stock |
-|----|------------|-------|-------|
-| 1  | Laptop     | 750   | 10    |
-| 2  | Smartphone | 500   | 25    |
+Assistant:
+Here are the 12 products available right now.
 
 User: "Add 2 headphones to my cart"
 Assistant:
@@ -82,13 +92,7 @@ Assistant:
 
 User: "View my cart"
 Assistant:
-Here’s what’s in your cart:
-
-| Product    | Quantity | Price | Subtotal |
-|------------|----------|-------|----------|
-| Headphones | 2        | 50    | 100      |
-
-Total: **$100**
+You have 2 Headphones in your cart, $100 in total.
 
 User: "Checkout"
 Assistant:
@@ -101,15 +105,19 @@ class CustomAgentState(AgentState):
 
 
 def assistant(state: MessagesState):
-   return {"messages": [llm_with_tools.invoke([shopping_prompt] + state["messages"])]}
+   start = time.perf_counter()
+   response = get_llm_with_tools().invoke([shopping_prompt] + state["messages"])
+   observe_llm_call("gpt-4o-mini", time.perf_counter() - start, response)
+   # Tables for the tool results are rendered, not generated
+   return {"messages": [with_tables(response, state["messages"])]}
 
 
 # Graph
 builder = StateGraph(MessagesState)
 
 # Define nodes: these do the work
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+builder.add_node("assistant", timed_node("assistant", assistant))
+builder.add_node("tools", timed_node("tools", ToolNode(tools)))
 
 # Define edges: these determine how the control flow moves
 builder.add_edge(START, "assistant")
@@ -121,3 +129,4 @@ builder.add_conditional_edges(
 )
 builder.add_edge("tools", "assistant")
 agent = builder.compile()
+start_metrics_server()
@@ -0,0 +1,119 @@
+# Markdown for tool results.
+#
+# The model used to copy every product list, cart and order into a Markdown
+# table, spending output tokens (the slow part of a turn) on data the tools
+# had already returned. The graph now renders those tables here and appends
+# them to the model's one- or two-sentence summary; the frontend still picks
+# them out with splitTextAndTables.
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+PRODUCT_TOOLS = {"list_products", "search_products", "product_details"}
+
+
+def _cell(value: Any) -> str:
+    # A pipe would end the cell; newlines would end the table
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def _money(value: Any) -> str:
+    return f"${value:,.2f}" if isinstance(value, (int, float)) else _cell(value)
+
+
+def _table(headers: Sequence[str], rows: List[Sequence[str]]) -> str:
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "|" + "|".join("---" for _ in headers) + "|",
+    ]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _products(products: List[Dict[str, Any]]) -> str:
+    return _table(
+        ["ID", "Product", "Price", "Stock"],
+        [
+            [_cell(p.get("product_id")), _cell(p.get("name")), _money(p.get("price")), _cell(p.get("stock"))]
+            for p in products
+        ],
+    )
+
+
+def _line_items(items: List[Dict[str, Any]]) -> str:
+    return _table(
+        ["Product", "Quantity", "Price", "Subtotal"],
+        [
+            [_cell(i.get("name")), _cell(i.get("quantity")), _money(i.get("price")), _money(i.get("subtotal"))]
+            for i in items
+        ],
+    )
+
+
+def _cart(cart: Dict[str, Any]) -> str:
+    return f"{_line_items(cart['items'])}\n\nTotal: **{_money(cart['total'])}**"
+
+
+def _order(result: Dict[str, Any]) -> str:
+    order = result["order"]
+    header = f"Order **#{order['order_id']}** · {_cell(order['status'])} · placed {_cell(order['order_date'])}"
+    return f"{header}\n\n{_line_items(result['items'])}\n\nTotal: **{_money(order['total'])}**"
+
+
+def _parse(message: ToolMessage) -> Any:
+    # ToolNode serializes dict and list results as JSON; plain strings
+    # ("🛒 Added ...", "❌ ...") are left to the model's summary.
+    if not isinstance(message.content, str) or "_ui" in message.content:
+        return None
+    try:
+        return json.loads(message.content)
+    except ValueError:
+        return None
+
+
+def render_turn(messages: Sequence[BaseMessage]) -> str:
+    """Renders the structured tool results since the last user message.
+
+    Products from every lookup in the turn share one table; carts and
+    orders get a block each.
+    """
+    start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1) + 1
+    products: Dict[Any, Dict[str, Any]] = {}
+    blocks: List[str] = []
+
+    for message in messages[start:]:
+        if not isinstance(message, ToolMessage):
+            continue
+        result = _parse(message)
+        if message.name in PRODUCT_TOOLS and isinstance(result, (list, dict)):
+            for product in result if isinstance(result, list) else [result]:
+                products[product.get("product_id")] = product
+        elif message.name == "view_cart" and isinstance(result, dict):
+            blocks.append(_cart(result))
+        elif message.name == "get_order_status" and isinstance(result, dict):
+            blocks.append(_order(result))
+
+    if products:
+        blocks.insert(0, _products(list(products.values())))
+    return "\n\n".join(blocks)
+
+
+def with_tables(response: BaseMessage, messages: Sequence[BaseMessage]) -> BaseMessage:
+    """Appends the turn's rendered tables to the model's final answer."""
+    if not isinstance(response, AIMessage) or response.tool_calls or not isinstance(response.content, str):
+        return response
+
+    tables = render_turn(messages)
+    if not tables:
+        return response
+    summary = response.content.strip()
+    return response.model_copy(update={"content": f"{summary}\n\n{tables}" if summary else tables})
+
+
+def attach_tables(state) -> Dict[str, List[BaseMessage]]:
+    """post_model_hook for create_react_agent: replaces the final answer with
+    one that carries the tables (same message id, so add_messages swaps it)."""
+    last = state["messages"][-1]
+    response = with_tables(last, state["messages"])
+    return {"messages": [response]} if response is not last else {}
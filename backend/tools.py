@@ -5,16 +5,22 @@ import uuid
 from langchain_core.tools import tool
 from langgraph.graph.ui import AnyUIMessage, ui_message_reducer, push_ui_message, delete_ui_message
 from langchain_core.messages import AIMessage, BaseMessage
+import time
+
+from shopping_agent.utils.metrics import DB_ACQUIRE, timed_tool
 
 
 def get_db_connection():
     """Returns a new database connection and cursor."""
+    start = time.perf_counter()
     conn = sqlite3.connect("ecommerce_test.db")
+    DB_ACQUIRE.observe(time.perf_counter() - start)
     return conn, conn.cursor()
 
 
 # 2. Define tools for the agent
 @tool
+@timed_tool
 def get_weather(location: str) -> str:
     """Get the current weather for a location."""
     # Simulate weather API call
@@ -41,6 +47,7 @@ def get_weather(location: str) -> str:
 
 
 @tool
+@timed_tool
 def list_products() -> List[Dict[str, Union[int, str, float]]]:
     """Lists all available products with id, name, price, and stock."""
     # Create a new connection and cursor within the tool's execution context
@@ -60,6 +67,7 @@ def list_products() -> List[Dict[str, Union[int, str, float]]]:
 
 
 @tool
+@timed_tool
 def product_details(product_id: int) -> Union[Dict[str, Union[int, str, float]], str]:
     """Gets details of a specific product by its ID."""
     conn, cursor = get_db_connection()
@@ -83,6 +91,7 @@ def product_details(product_id: int) -> Union[Dict[str, Union[int, str, float]],
 
 
 @tool
+@timed_tool
 def search_products(query: str) -> List[Dict[str, Union[int, str, float]]]:
     """Searches for products by name using a keyword."""
     conn, cursor = get_db_connection()
@@ -106,6 +115,7 @@ def search_products(query: str) -> List[Dict[str, Union[int, str, float]]]:
 
 
 @tool
+@timed_tool
 def add_to_cart(user_id: int, product_id: int, quantity: int) -> str:
     """Adds a product to the user's cart."""
     conn, cursor = get_db_connection()
@@ -169,6 +179,7 @@ def add_to_cart(user_id: int, product_id: int, quantity: int) -> str:
 
 
 @tool
+@timed_tool
 def view_cart(user_id: int) -> Union[Dict, str]:
     """Views items in the user's cart with totals."""
     conn, cursor = get_db_connection()
@@ -211,6 +222,7 @@ def view_cart(user_id: int) -> Union[Dict, str]:
 
 
 @tool
+@timed_tool
 def checkout(user_id: int) -> str:
     """Checks out the cart: creates an order and clears cart."""
     conn, cursor = get_db_connection()
@@ -284,6 +296,7 @@ def checkout(user_id: int) -> str:
 
 
 @tool
+@timed_tool
 def get_order_status(order_id: int) -> Union[Dict, str]:
     """Gets the status and details of a specific order."""
     conn, cursor = get_db_connection()
@@ -1,9 +1,12 @@
 /* eslint-disable @typescript-eslint/no-explicit-any */
 "use client";
 
+import { useState } from "react";
 import type { Message } from "@langchain/langgraph-sdk";
 import { LoadExternalComponent } from "@langchain/langgraph-sdk/react-ui";
 import { CartComponent, ProductCarousel, WeatherComponent } from "./agent/ui";
+import { Button } from "@/components/ui/button";
+import { API_URL } from "@/lib/api";
 import splitTextAndTables from "@/utils/splitTextAndTables";
 import MarkdownTable from "./MarkdownTable";
 
@@ -15,10 +18,56 @@ type Product = {
   stock: number;
 };
 
+// A product list's UI message holds only its first page as `products`, plus
+// `cursor`, the last product id on it (null when nothing follows). Later
+// pages are fetched from the cursor, so reloaded threads can load them too.
+const ProductList = ({
+  products: firstPage = [],
+  cursor: firstCursor = null,
+}: {
+  products?: Product[];
+  cursor?: number | null;
+}) => {
+  const [products, setProducts] = useState<Product[]>(firstPage);
+  const [cursor, setCursor] = useState<number | null>(firstCursor);
+  const [loading, setLoading] = useState(false);
+
+  const loadMore = async () => {
+    if (cursor === null || loading) return;
+    setLoading(true);
+    try {
+      const res = await fetch(`${API_URL}/products?after=${cursor}`);
+      if (!res.ok) return;
+      const page: { products: Product[]; cursor: number | null } =
+        await res.json();
+      setProducts((prev) => [...prev, ...page.products]);
+      setCursor(page.cursor);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="space-y-3">
+      <ProductCarousel products={products} />
+      {cursor !== null && (
+        <Button
+          variant="outline"
+          className="w-full border-slate-200 hover:bg-slate-50"
+          onClick={loadMore}
+          disabled={loading}
+        >
+          {loading ? "Loading..." : "Load more products"}
+        </Button>
+      )}
+    </div>
+  );
+};
+
 const clientComponents = {
   weather: WeatherComponent,
   list_products: (props: any) => (
-    <ProductCarousel products={props.products as Product[]} />
+    <ProductList products={props.products} cursor={props.cursor} />
   ),
   view_cart: (props: any) => (
     <CartComponent items={props.items} total={props.total} />
@@ -0,0 +1,3 @@
+// The LangGraph server: the agent's streams and the HTTP routes in
+// shopping-chat-backend/shopping_agent/webapp.py.
+export const API_URL = "http://127.0.0.1:2024";
@@ -0,0 +1,88 @@
+"""Autocomplete latency: in-memory prefix index vs a LIKE query per keystroke.
+
+Generates --products names, builds the prefix index, then replays typing:
+every prefix (1 to 8 characters) of random words from the catalog. Reports
+build time and per-keystroke latency percentiles for the index (first and
+memoized lookups) and for the equivalent LIKE scan on an in-memory SQLite
+table, plus the cost of an incremental update.
+
+    python benchmarks/bench_autocomplete.py --products 200000
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils.autocomplete import PrefixIndex  # noqa: E402
+
+BRANDS = ["Apple", "Sony", "Logitech", "Bose", "Samsung", "Anker", "Dell", "Lenovo", "Nintendo", "Amazon"]
+KINDS = ["Headphones", "Keyboard", "Mouse", "Laptop", "Speaker", "Tablet", "Monitor", "Charger", "Camera", "Watch"]
+MODELS = ["Pro", "Air", "Max", "Mini", "Ultra", "Lite", "Plus", "Neo", "One", "Go"]
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def timed(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--words", type=int, default=300, help="words typed out letter by letter")
+    parser.add_argument("--like-words", type=int, default=10, help="words replayed against LIKE; it is slow")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    products = [
+        (i, f"{rng.choice(BRANDS)} {rng.choice(KINDS)} {rng.choice(MODELS)} {rng.randint(1, 9999)}", int(rng.paretovariate(1.2)))
+        for i in range(1, args.products + 1)
+    ]
+
+    start = time.perf_counter()
+    index = PrefixIndex(products)
+    print(f"indexed {args.products:,} products ({index.metrics()['entries']:,} entries) in {time.perf_counter() - start:.1f} s")
+
+    words = [rng.choice(name.split()) for _, name, _ in rng.sample(products, args.words)]
+    keystrokes = [word[:n] for word in words for n in range(1, min(len(word), 8) + 1)]
+
+    first = timed(index.suggest, keystrokes)
+    again = timed(index.suggest, keystrokes)
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT, popularity INTEGER);")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?);", products)
+    like_keystrokes = [word[:n] for word in words[: args.like_words] for n in range(1, min(len(word), 8) + 1)]
+    like = timed(
+        lambda q: conn.execute(
+            "SELECT product_id, name FROM products WHERE name LIKE ? OR name LIKE ? ORDER BY popularity DESC LIMIT 8;",
+            (f"{q}%", f"% {q}%"),
+        ).fetchall(),
+        like_keystrokes,
+    )
+
+    updates = [(rng.randint(1, args.products), f"{rng.choice(BRANDS)} {rng.choice(KINDS)} Renamed", rng.randint(0, 50)) for _ in range(200)]
+    update = timed(lambda product: index.upsert(*product), updates)
+
+    print(f"\n{'':<22} {'p50 us':>10} {'p99 us':>10} {'max us':>10}")
+    for label, timings in (("index, first lookup", first), ("index, repeated", again), ("LIKE scan", like), ("index upsert", update)):
+        print(f"{label:<22} {percentile(timings, 0.5):>10.1f} {percentile(timings, 0.99):>10.1f} {max(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Checkout latency at saturation: direct transactions vs the order pipeline.
+
+Threads each fill their own cart and check out in a loop against a scratch
+copy of the database, first with every checkout opening its own write
+transaction, then through the admission queue and single order writer
+(CHECKOUT_PIPELINE). Reports throughput, failures and latency percentiles
+per concurrency level.
+
+    python benchmarks/bench_checkout_queue.py --threads 4 16 64 --checkouts 30 --dir .
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils import db, tools  # noqa: E402
+from shopping_agent.utils.orders import OrderPipeline  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run(pipeline: bool, threads: int, args) -> dict:
+    scratch = tempfile.mkdtemp(prefix="shopping-checkout-", dir=args.dir)
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    db._schema_ready = False
+    tools.CHECKOUT_PIPELINE = pipeline
+    tools.order_pipeline = OrderPipeline(tools.place_order, maxsize=args.queue_size)
+
+    conn, _ = db.get_db_connection()
+    conn.execute("UPDATE products SET stock = 1000000;")
+    conn.commit()
+    conn.close()
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        local, failed = [], []
+        for _ in range(args.checkouts):
+            tools.add_to_cart.invoke({"user_id": index + 1, "product_id": index % 10 + 1, "quantity": 1})
+            start = time.perf_counter()
+            result = tools.checkout.invoke({"user_id": index + 1})
+            local.append((time.perf_counter() - start) * 1000)
+            if not result.startswith("✅"):
+                failed.append(result)
+        with lock:
+            latencies.extend(local)
+            failures.extend(failed)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    os.chdir(APP_DIR)
+    shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "ok/s": (len(latencies) - len(failures)) / elapsed,
+        "failed": len(failures),
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies),
+        "avg_wait_ms": tools.order_pipeline.metrics()["avg_wait_ms"] if pipeline else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--checkouts", type=int, default=30, help="checkouts per thread")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--dir", default=None, help="where to put the scratch database; use a real disk")
+    args = parser.parse_args()
+
+    print(f"{'mode':<9} {'threads':>7} {'ok/s':>7} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queue ms':>9}")
+    for threads in args.threads:
+        for pipeline in (False, True):
+            r = run(pipeline, threads, args)
+            print(
+                f"{'pipeline' if pipeline else 'direct':<9} {threads:>7} {r['ok/s']:>7.0f} {r['failed']:>7} "
+                f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['max']:>8.1f} {r['avg_wait_ms']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
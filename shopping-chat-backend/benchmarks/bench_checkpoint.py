@@ -0,0 +1,91 @@
+"""Checkpoint write/read latency per turn as a thread grows.
+
+Simulates a shopping thread where every turn appends a human message, a tool
+call, a list_products result and a reply, then saves and reloads the
+checkpoint through SqliteCheckpointSaver.
+
+    python benchmarks/bench_checkpoint.py --turns 100
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.base.id import uuid6  # noqa: E402
+
+from shopping_agent.utils.checkpointer import SqliteCheckpointSaver  # noqa: E402
+
+PRODUCTS = json.dumps(
+    [
+        {"product_id": i, "image_url": f"product-{i}.jpg", "name": f"Product {i}", "price": 99.0 + i, "stock": 10 + i}
+        for i in range(1, 31)
+    ]
+)
+
+
+def turn_messages(turn: int):
+    call_id = f"call_{uuid.uuid4().hex}"
+    return [
+        HumanMessage(f"show me the products ({turn})", id=str(uuid.uuid4())),
+        AIMessage("", id=str(uuid.uuid4()), tool_calls=[{"id": call_id, "name": "list_products", "args": {}}]),
+        ToolMessage(PRODUCTS, tool_call_id=call_id, name="list_products", id=str(uuid.uuid4())),
+        AIMessage("Here's the list of products from our shop.", id=str(uuid.uuid4())),
+    ]
+
+
+def run(saver, turns: int, report_every: int):
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+    messages = []
+    window = {"put": [], "get": []}
+    print(f"{'turn':>5} {'put ms':>9} {'get ms':>9} {'state KB':>9}")
+
+    for turn in range(1, turns + 1):
+        messages = messages + turn_messages(turn)
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=turn))
+        checkpoint["channel_values"] = {"messages": messages, "ui": []}
+        checkpoint["channel_versions"] = {"messages": turn, "ui": turn}
+
+        start = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": turn}, {"messages": turn})
+        saver.flush()
+        window["put"].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": "bench"}})
+        window["get"].append((time.perf_counter() - start) * 1000)
+
+        if turn % report_every == 0:
+            size = len(saver.serde.dumps_typed(checkpoint)[1]) / 1024
+            print(
+                f"{turn:>5} {statistics.median(window['put']):>9.2f} "
+                f"{statistics.median(window['get']):>9.2f} {size:>9.1f}"
+            )
+            window = {"put": [], "get": []}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--report-every", type=int, default=10)
+    parser.add_argument("--keep-last", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = SqliteCheckpointSaver(str(Path(tmp) / "checkpoints.db"), keep_last=args.keep_last)
+        run(saver, args.turns, args.report_every)
+        print(f"compaction: {saver.compact()}")
+        saver.close()
+
+
+if __name__ == "__main__":
+    main()
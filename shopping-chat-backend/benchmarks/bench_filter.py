@@ -0,0 +1,136 @@
+"""filter_products latency on a large synthetic catalog, with and without facet indexes.
+
+Builds a scratch copy of the database whose products table holds --products
+generated rows (about 30% out of stock, Zipf-like popularity), then times
+each facet combination through the filter_products tool:
+
+    none      the facet indexes dropped: every query scans products
+    indexed   the indexes from ensure_schema
+    analyzed  the same after ANALYZE, so the planner knows their selectivity
+
+and prints the query plan each one used.
+
+    python benchmarks/bench_filter.py --products 1000000 --dir .
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils import db, tools  # noqa: E402
+
+BRANDS = ["Apple", "Sony", "Logitech", "Bose", "Samsung", "Anker", "Dell", "Lenovo", "Nintendo", "Amazon"]
+KINDS = ["Headphones", "Keyboard", "Mouse", "Laptop", "Speaker", "Tablet", "Monitor", "Charger", "Camera", "Watch"]
+
+CASES = [
+    ("narrow price, by price", {"min_price": 50, "max_price": 55, "sort": "price"}),
+    ("in stock under $200, cheapest", {"max_price": 200, "in_stock": True, "sort": "price"}),
+    ("in stock, by popularity", {"in_stock": True, "sort": "popularity"}),
+    ("narrow price, by name", {"min_price": 50, "max_price": 50.5, "sort": "name"}),
+    ("under $100, by name", {"max_price": 100, "sort": "name"}),
+    ("$100-$500 in stock, by name", {"min_price": 100, "max_price": 500, "in_stock": True, "sort": "name"}),
+    ("keyword, in stock, by price", {"keyword": "Sony Headphones", "in_stock": True, "sort": "price"}),
+    ("keyword $20-$25, by popularity", {"keyword": "Anker", "min_price": 20, "max_price": 25, "sort": "popularity"}),
+]
+
+
+def build_catalog(path: str, products: int, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM products;")
+    rows = (
+        (
+            f"{rng.choice(BRANDS)} {rng.choice(KINDS)} {i}",
+            round(rng.lognormvariate(4.5, 1.0), 2),
+            0 if rng.random() < 0.3 else rng.randint(1, 500),
+            int(10_000 / (1 + rng.paretovariate(1.2))),
+        )
+        for i in range(products)
+    )
+    conn.executemany("INSERT INTO products (name, price, stock, popularity) VALUES (?, ?, ?, ?);", rows)
+    conn.commit()
+    conn.close()
+
+
+def run_cases(args) -> dict:
+    conn, cursor = db.get_db_connection()
+    results = {}
+    for label, case in CASES:
+        params = {"keyword": None, "min_price": None, "max_price": None, "in_stock": False, "limit": 20, **case}
+        sql, values = tools.filter_queries(cursor, **params)[0]
+        plan = "; ".join(row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", values))
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            tools.filter_products.invoke(case)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[label] = (statistics.median(timings), plan)
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="where to put the scratch database; use a real disk")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="shopping-filter-", dir=args.dir)
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    try:
+        # Adds the popularity column and the indexes
+        db.get_db_connection()[0].close()
+        conn = sqlite3.connect(db.DB_PATH)
+        indexes = dict(
+            conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products' AND sql IS NOT NULL;"
+            )
+        )
+        for name in indexes:
+            conn.execute(f"DROP INDEX {name};")
+        conn.close()
+
+        start = time.perf_counter()
+        build_catalog(db.DB_PATH, args.products, args.seed)
+        print(f"generated {args.products:,} products in {time.perf_counter() - start:.1f} s")
+
+        modes = {}
+        modes["none"] = run_cases(args)
+
+        conn = sqlite3.connect(db.DB_PATH)
+        start = time.perf_counter()
+        for sql in indexes.values():
+            conn.execute(sql)
+        print(f"built {len(indexes)} indexes in {time.perf_counter() - start:.1f} s")
+        modes["indexed"] = run_cases(args)
+
+        conn.execute("ANALYZE;")
+        conn.close()
+        modes["analyzed"] = run_cases(args)
+    finally:
+        os.chdir(APP_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"\n{'case':<34} " + " ".join(f"{mode + ' ms':>12}" for mode in modes))
+    for label, _ in CASES:
+        print(f"{label:<34} " + " ".join(f"{modes[mode][label][0]:>12.2f}" for mode in modes))
+    print("\nplans after ANALYZE:")
+    for label, _ in CASES:
+        print(f"  {label:<34} {modes['analyzed'][label][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Cart write throughput and latency: one commit per call vs group commit.
+
+Threads each run add_to_cart for their own user against a scratch copy of
+the database, first committing every call, then through the group committer
+(CART_GROUP_COMMIT) with the given batch window. Reports calls and commits
+per second and per-call latency for each concurrency level.
+
+    python benchmarks/bench_group_commit.py --threads 1 4 16 64 --window-ms 2 --dir .
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils import db, group_commit, tools  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run(grouped: bool, threads: int, args) -> dict:
+    scratch = tempfile.mkdtemp(prefix="shopping-group-", dir=args.dir)
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    db._schema_ready = False
+    tools.CART_GROUP_COMMIT = grouped
+    committer = group_commit.GroupCommitter(window_ms=args.window_ms, max_batch=args.max_batch)
+    group_commit._committers[None] = committer
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def worker(index: int) -> None:
+        local, failed = [], 0
+        for i in range(args.writes):
+            start = time.perf_counter()
+            result = tools.add_to_cart.invoke(
+                {"user_id": index + 1, "product_id": i % 10 + 1, "quantity": 1}
+            )
+            local.append((time.perf_counter() - start) * 1000)
+            failed += not result.startswith("🛒")
+        with lock:
+            latencies.extend(local)
+            failures.append(failed)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    os.chdir(APP_DIR)
+    shutil.rmtree(scratch, ignore_errors=True)
+    commits = committer.stats["batches"] if grouped else len(latencies)
+    return {
+        "calls/s": len(latencies) / elapsed,
+        "commits/s": commits / elapsed,
+        "failed": sum(failures),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "batch": committer.metrics()["avg_batch"] if grouped else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--writes", type=int, default=50, help="add_to_cart calls per thread")
+    parser.add_argument("--window-ms", type=float, default=group_commit.CART_COMMIT_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=group_commit.CART_COMMIT_MAX_BATCH)
+    parser.add_argument("--dir", default=None, help="where to put the scratch database; use a real disk")
+    args = parser.parse_args()
+
+    print(f"{'mode':<7} {'threads':>7} {'calls/s':>8} {'commits/s':>10} {'batch':>6} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for threads in args.threads:
+        for grouped in (False, True):
+            r = run(grouped, threads, args)
+            print(
+                f"{'group' if grouped else 'direct':<7} {threads:>7} {r['calls/s']:>8.0f} {r['commits/s']:>10.0f} "
+                f"{r['batch']:>6.1f} {r['failed']:>7} {r['p50']:>8.2f} {r['p99']:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Offline load test of the agent graphs with a scripted fake LLM.
+
+Swaps the chat model for benchmarks/fake_llm.ScriptedChatModel and drives the
+compiled graph from N threads, each replaying the browse -> search ->
+add_to_cart -> view_cart -> checkout session as its own user and thread.
+Reports end-to-end turns/sec, turn latency and per-node latency, i.e.
+everything but the model. Each target runs in its own process against a
+scratch copy of its database, so the tracked ecommerce_test.db is untouched.
+
+Targets:
+    shopping_agent  shopping-chat-backend (router, chatbot, tools)
+    backend         backend/agent.py (create_react_agent)
+    draft           backend/draft.py (assistant, tools)
+
+    python benchmarks/bench_load.py --threads 8 --sessions 20 --llm-latency-ms 0
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+LEGACY_DIR = APP_DIR.parent / "backend"
+TARGETS = {
+    "shopping_agent": APP_DIR,
+    "backend": LEGACY_DIR,
+    "draft": LEGACY_DIR,
+}
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+
+def load_graph(target: str, fake):
+    """Imports a target with the fake model patched in and recompiles its graph
+    with an in-memory checkpointer so each thread keeps its history."""
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    sys.path.insert(0, str(TARGETS[target]))
+    # backend/ takes its model tiering and metrics from the shopping_agent package
+    sys.path.insert(1, str(APP_DIR))
+    if target == "shopping_agent":
+        from shopping_agent import shopping_agent as module
+    elif target == "backend":
+        import agent as module
+    else:
+        import draft as module
+
+    module.get_llm = lambda *tier: fake
+    module.get_llm_with_tools.cache_clear()
+    return module.agent.builder.compile(checkpointer=InMemorySaver())
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_target(args) -> int:
+    from langchain_core.messages import HumanMessage
+
+    from fake_llm import SCRIPT, ScriptedChatModel
+
+    # Tools open "ecommerce_test.db" relative to the working directory
+    scratch = tempfile.mkdtemp(prefix="shopping-load-")
+    shutil.copy(TARGETS[args.target] / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+
+    fake = ScriptedChatModel(latency=args.llm_latency_ms / 1000)
+    graph = load_graph(args.target, fake)
+
+    lock = threading.Lock()
+    turn_ms: List[float] = []
+    node_ms: Dict[str, List[float]] = {}
+    errors: List[str] = []
+
+    def worker(index: int) -> None:
+        local_turns: List[float] = []
+        local_nodes: Dict[str, List[float]] = {}
+        for session in range(args.sessions):
+            config = {
+                "configurable": {"thread_id": f"load-{index}-{session}", "user_id": index + 1}
+            }
+            for utterance, *_ in SCRIPT:
+                start = last = time.perf_counter()
+                try:
+                    for update in graph.stream(
+                        {"messages": [HumanMessage(utterance)]}, config, stream_mode="updates"
+                    ):
+                        now = time.perf_counter()
+                        # Nodes in a turn run one after another, so the gap
+                        # between updates is the node that just finished
+                        for node in update:
+                            local_nodes.setdefault(node, []).append((now - last) * 1000)
+                        last = now
+                except Exception as e:
+                    with lock:
+                        errors.append(f"{utterance!r}: {e!r}")
+                    continue
+                local_turns.append((time.perf_counter() - start) * 1000)
+        with lock:
+            turn_ms.extend(local_turns)
+            for node, values in local_nodes.items():
+                node_ms.setdefault(node, []).extend(values)
+
+    # One warm-up session so imports and first connections are not measured
+    graph.invoke(
+        {"messages": [HumanMessage(SCRIPT[0][0])]},
+        {"configurable": {"thread_id": "warmup", "user_id": 0}},
+    )
+    fake.calls = 0
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    print(
+        f"\n{args.target}: {args.threads} threads, {len(turn_ms)} turns in {wall:.2f}s "
+        f"= {len(turn_ms) / wall:.1f} turns/s; turn p50 {percentile(turn_ms, 0.5):.1f} ms, "
+        f"p95 {percentile(turn_ms, 0.95):.1f} ms; fake LLM calls {fake.calls} "
+        f"at {args.llm_latency_ms:g} ms"
+    )
+    print(f"  {'node':<10} {'runs':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for node, values in sorted(node_ms.items()):
+        print(
+            f"  {node:<10} {len(values):>6} {sum(values) / len(values):>9.2f} "
+            f"{percentile(values, 0.5):>8.2f} {percentile(values, 0.95):>8.2f}"
+        )
+    for error in errors[:5]:
+        print(f"  error: {error}")
+    return 1 if errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=[*TARGETS, "all"], default="all")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=10, help="scripted sessions per thread")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.target != "all":
+        return run_target(args)
+
+    # Each target gets a fresh interpreter, so the modules and metrics of one
+    # do not leak into the next
+    status = 0
+    for target in TARGETS:
+        command = [sys.executable, __file__, "--target", target]
+        command += ["--threads", str(args.threads), "--sessions", str(args.sessions)]
+        command += ["--llm-latency-ms", str(args.llm_latency_ms)]
+        status |= subprocess.call(command)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Hot-path overhead of the Prometheus instrumentation.
+
+Times a trivial node and a trivial tool function with and without the
+timed_node / timed_tool wrappers and reports the added cost per call.
+
+    python benchmarks/bench_metrics.py
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shopping_agent.utils.metrics import DB_ACQUIRE, timed_node, timed_tool  # noqa: E402
+
+
+def node(state):
+    return {"messages": []}
+
+
+def bench_tool(x: int) -> int:
+    return x
+
+
+def per_call_ns(func, arg, calls: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        func(arg)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    cases = [
+        ("node", node, timed_node("bench", node), {}),
+        ("tool", bench_tool, timed_tool(bench_tool), 1),
+        ("histogram.observe", lambda v: None, DB_ACQUIRE.observe, 0.001),
+    ]
+    print(f"{'case':<18} {'raw ns':>8} {'timed ns':>9} {'overhead ns':>12}")
+    for name, raw, timed, arg in cases:
+        base = per_call_ns(raw, arg, args.calls)
+        wrapped = per_call_ns(timed, arg, args.calls)
+        print(f"{name:<18} {base:>8.0f} {wrapped:>9.0f} {wrapped - base:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Co-occurrence matrix build time, size and lookup latency on synthetic orders.
+
+Generates order_items rows for the given number of orders, with basket
+sizes of 1 + Poisson(--items - 1) and products drawn from a Zipf-like
+popularity curve, then builds the CSR matrix and times single-product and
+cart lookups and incremental order updates.
+
+    python benchmarks/bench_recommend.py --orders 10000000 --products 5000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils.recommend import CoOccurrence  # noqa: E402
+
+
+def synthetic_orders(orders: int, products: int, items: float, seed: int):
+    rng = np.random.default_rng(seed)
+    sizes = 1 + rng.poisson(items - 1, orders)
+    popularity = 1 / np.arange(1, products + 1) ** 0.8
+    product_ids = rng.choice(np.arange(1, products + 1, dtype=np.int32), sizes.sum(), p=popularity / popularity.sum())
+    order_ids = np.repeat(np.arange(orders, dtype=np.int64), sizes)
+    return order_ids, product_ids
+
+
+def per_call_us(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000_000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--items", type=float, default=3.0, help="mean products per order")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    order_ids, product_ids = synthetic_orders(args.orders, args.products, args.items, args.seed)
+    print(f"generated {args.orders:,} orders / {len(product_ids):,} lines in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    matrix = CoOccurrence.from_orders(order_ids, product_ids)
+    build = time.perf_counter() - start
+    del order_ids, product_ids
+    stats = matrix.metrics()
+    print(f"built {stats['pairs']:,} pairs in {build:.1f} s, {stats['bytes'] / 2**20:.1f} MiB")
+
+    rng = np.random.default_rng(args.seed + 1)
+    singles = [(int(p), 10) for p in rng.integers(1, args.products + 1, args.lookups)]
+    baskets = [(rng.integers(1, args.products + 1, 3).tolist(), 10) for _ in range(args.lookups // 10)]
+    new_orders = [(rng.integers(1, args.products + 1, 3).tolist(),) for _ in range(args.lookups // 10)]
+
+    print(f"related(product)     {per_call_us(matrix.related, singles):>8.1f} us/call")
+    print(f"for_basket(3 items)  {per_call_us(matrix.for_basket, baskets):>8.1f} us/call")
+    print(f"add_order(3 items)   {per_call_us(matrix.add_order, new_orders):>8.1f} us/call")
+    print(f"for_basket after updates {per_call_us(matrix.for_basket, baskets):>8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
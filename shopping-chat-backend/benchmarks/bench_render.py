@@ -0,0 +1,153 @@
+"""Output tokens and turn latency of backend/agent.py: model-written vs rendered tables.
+
+Replays the scripted session (benchmarks/fake_llm.SCRIPT) against the legacy
+create_react_agent graph twice:
+
+    before  the model copies every product list and cart into a Markdown
+            table after its summary, as the old prompt asked, and the graph
+            has no post-model hook
+    after   the model writes the summary only and render.attach_tables
+            appends the same tables
+
+The fake model takes --llm-latency-ms per call plus --ms-per-token per
+output token (tokens estimated as characters / 4), so the difference in
+turn latency is the decoding time the model no longer spends. The scratch
+catalog is padded to --products rows so list_products returns a realistic
+page; the tracked ecommerce_test.db is untouched.
+
+    python benchmarks/bench_render.py --products 50 --ms-per-token 12
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+LEGACY_DIR = BENCH_DIR.parent.parent / "backend"
+sys.path.insert(0, str(LEGACY_DIR))
+# backend/ takes its model tiering and metrics from the shopping_agent package
+sys.path.insert(1, str(BENCH_DIR.parent))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from fake_llm import SCRIPT, ScriptedChatModel  # noqa: E402
+
+
+class TableCopyingModel(ScriptedChatModel):
+    """The old behaviour: the final answer repeats the tool data as tables."""
+
+    def _next_message(self, messages):
+        import render
+
+        message = super()._next_message(messages)
+        tables = "" if message.tool_calls else render.render_turn(messages)
+        if tables:
+            message.content = f"{message.content}\n\n{tables}"
+        return message
+
+
+def pad_catalog(path: str, products: int) -> None:
+    conn = sqlite3.connect(path)
+    (count,) = conn.execute("SELECT COUNT(*) FROM products;").fetchone()
+    conn.executemany(
+        "INSERT INTO products (name, price, stock) VALUES (?, ?, ?);",
+        [(f"Sample Product {i}", 10 + i * 3.5, 5 + i % 40) for i in range(count, products)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run(graph, sessions: int) -> Dict[str, Dict[str, List[float]]]:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    results: Dict[str, Dict[str, List[float]]] = {}
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"render-{session}", "user_id": session + 1}}
+        for utterance, *_ in SCRIPT:
+            start = time.perf_counter()
+            # The cart tools print progress; keep it out of the report
+            with redirect_stdout(StringIO()):
+                state = graph.invoke({"messages": [HumanMessage(utterance)]}, config)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            turn = state["messages"][
+                max(i for i, m in enumerate(state["messages"]) if isinstance(m, HumanMessage)) :
+            ]
+            output_tokens = sum(
+                (m.usage_metadata or {}).get("output_tokens", 0) for m in turn if isinstance(m, AIMessage)
+            )
+            result = results.setdefault(utterance, {"tokens": [], "ms": []})
+            result["tokens"].append(output_tokens)
+            result["ms"].append(elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--products", type=int, default=50, help="pad the scratch catalog to this many rows")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="per call, e.g. time to first token")
+    parser.add_argument("--ms-per-token", type=float, default=12.0, help="decoding time per output token")
+    args = parser.parse_args()
+
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.prebuilt import create_react_agent
+
+    scratch = tempfile.mkdtemp(prefix="shopping-render-")
+    shutil.copy(LEGACY_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    try:
+        pad_catalog("ecommerce_test.db", args.products)
+
+        import agent as module
+
+        latency = {"latency": args.llm_latency_ms / 1000, "token_latency": args.ms_per_token / 1000}
+        before_model, after_model = TableCopyingModel(**latency), ScriptedChatModel(**latency)
+
+        module.get_llm = lambda *tier: before_model
+        module.get_llm_with_tools.cache_clear()
+        before_graph = create_react_agent(
+            model=module.select_model, tools=module.tools, prompt=module.shopping_prompt, checkpointer=InMemorySaver()
+        )
+        before = run(before_graph, args.sessions)
+
+        module.get_llm = lambda *tier: after_model
+        module.get_llm_with_tools.cache_clear()
+        after = run(module.agent.builder.compile(checkpointer=InMemorySaver()), args.sessions)
+    finally:
+        os.chdir(BENCH_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(
+        f"{args.sessions} sessions, {args.products} products, "
+        f"{args.llm_latency_ms:g} ms/call + {args.ms_per_token:g} ms/output token\n"
+    )
+    print(f"{'turn':<26} {'tokens before':>14} {'after':>7} {'p50 ms before':>14} {'after':>8}")
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for utterance, *_ in SCRIPT:
+        row = [
+            percentile(before[utterance]["tokens"], 0.5),
+            percentile(after[utterance]["tokens"], 0.5),
+            percentile(before[utterance]["ms"], 0.5),
+            percentile(after[utterance]["ms"], 0.5),
+        ]
+        totals = [t + v for t, v in zip(totals, row)]
+        print(f"{utterance:<26} {row[0]:>14.0f} {row[1]:>7.0f} {row[2]:>14.1f} {row[3]:>8.1f}")
+    print(f"{'session':<26} {totals[0]:>14.0f} {totals[1]:>7.0f} {totals[2]:>14.1f} {totals[3]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
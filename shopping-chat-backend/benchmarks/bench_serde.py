@@ -0,0 +1,127 @@
+"""Checkpoint size and encode/decode time: default vs compressed serializer.
+
+Builds synthetic shopping-thread states (list_products and view_cart tool
+results plus their UI messages), trains a zstd dictionary on part of them and
+measures the rest with the default JsonPlusSerializer, zstd without a
+dictionary and zstd with the trained dictionary.
+
+    python benchmarks/bench_serde.py
+    python benchmarks/bench_serde.py --write-dict dicts/shopping-2.zdict   # SERDE_DICT_PATH=dicts
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from shopping_agent.utils.serde import CompressedSerializer, train_dictionary  # noqa: E402
+
+NAMES = ["MacBook Air M2", "iPhone 14 Pro", "Sony WH-1000XM5", "MX Mechanical", "MX Master 3S", "Kindle Paperwhite"]
+
+
+def products(rng: random.Random):
+    return [
+        {
+            "product_id": i,
+            "image_url": f"{rng.choice(NAMES).lower().replace(' ', '-')}.jpg",
+            "name": rng.choice(NAMES),
+            "price": round(rng.uniform(50, 1500), 2),
+            "stock": rng.randint(0, 80),
+        }
+        for i in range(1, rng.randint(8, 40))
+    ]
+
+
+def cart(rng: random.Random):
+    items = [
+        {"name": rng.choice(NAMES), "quantity": q, "price": p, "subtotal": q * p}
+        for q, p in ((rng.randint(1, 3), round(rng.uniform(50, 1500), 2)) for _ in range(rng.randint(1, 6)))
+    ]
+    return {"items": items, "total": sum(i["subtotal"] for i in items)}
+
+
+def thread_state(rng: random.Random, turns: int):
+    messages, ui = [], []
+    for turn in range(turns):
+        tool, payload = rng.choice([("list_products", products(rng)), ("view_cart", cart(rng))])
+        call_id = f"call_{uuid.uuid4().hex}"
+        reply = AIMessage("Here you go.", id=str(uuid.uuid4()))
+        messages += [
+            HumanMessage(f"{tool.replace('_', ' ')} please ({turn})", id=str(uuid.uuid4())),
+            AIMessage("", id=str(uuid.uuid4()), tool_calls=[{"id": call_id, "name": tool, "args": {}}]),
+            ToolMessage(json.dumps(payload), tool_call_id=call_id, name=tool, id=str(uuid.uuid4())),
+            reply,
+        ]
+        ui.append(
+            {
+                "type": "ui",
+                "id": str(uuid.uuid4()),
+                "name": tool,
+                "props": {"products": payload} if tool == "list_products" else payload,
+                "metadata": {"merge": True, "message_id": reply.id},
+            }
+        )
+    return {"messages": messages, "ui": ui}
+
+
+def measure(serde, states, repeat: int):
+    sizes, encode, decode = [], [], []
+    for state in states:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            typed = serde.dumps_typed(state)
+        encode.append((time.perf_counter() - start) * 1000 / repeat)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serde.loads_typed(typed)
+        decode.append((time.perf_counter() - start) * 1000 / repeat)
+        sizes.append(len(typed[1]))
+    return statistics.mean(sizes) / 1024, statistics.median(encode), statistics.median(decode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dict-size", type=int, default=16 * 1024)
+    parser.add_argument("--write-dict", type=Path)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    states = [thread_state(rng, rng.randint(1, 25)) for _ in range(args.samples)]
+    train, test = states[: args.samples * 2 // 3], states[args.samples * 2 // 3 :]
+
+    start = time.perf_counter()
+    dictionary = train_dictionary(train, args.dict_size)
+    print(f"trained {len(dictionary) // 1024} KB dictionary in {time.perf_counter() - start:.2f}s")
+    if args.write_dict:
+        args.write_dict.write_bytes(dictionary)
+
+    candidates = {
+        "jsonplus (default)": JsonPlusSerializer(),
+        "zstd": CompressedSerializer(),
+        "zstd + dictionary": CompressedSerializer(dictionaries=[dictionary]),
+    }
+    print(f"{'serializer':<20} {'avg KB':>8} {'encode ms':>10} {'decode ms':>10}")
+    baseline = None
+    for name, serde in candidates.items():
+        size, enc, dec = measure(serde, test, args.repeat)
+        baseline = baseline or size
+        print(f"{name:<20} {size:>8.1f} {enc:>10.3f} {dec:>10.3f}   {size / baseline:.0%} of default")
+
+    # Data written before compression (or with the default serializer) must still load
+    legacy = JsonPlusSerializer().dumps_typed(test[0])
+    assert CompressedSerializer().loads_typed(legacy)["messages"] == test[0]["messages"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Cart write and checkout throughput against the number of user shards.
+
+Runs add_to_cart, then add_to_cart plus checkout, from concurrent worker
+processes, as a fleet of servers would, each for its own users. The scratch
+copy of the database lives under --dir (default: the temp dir; use a real
+disk, since commit latency is what sharding spreads). Runs with DB_SHARDS =
+0 (one file), 1, 2, 4 and 8, and reports committed writes and checkouts per
+second and failed (locked) calls. Checkouts run twice: with stock taken from
+the products row in the catalog (STOCK_SLOTS=0) and with the ten products
+promoted to per-shard stock slots up front (unsharded, slots stay off).
+
+    python benchmarks/bench_shards.py --workers 16 --writes 200 --dir .
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils import db, inventory  # noqa: E402
+from shopping_agent.utils.tools import add_to_cart, checkout  # noqa: E402
+
+# Enough stock that no checkout fails for want of it
+INITIAL_STOCK = 1_000_000
+
+
+def worker(index: int, workers: int, writes: int, checkouts: bool) -> int:
+    failed = 0
+    for i in range(writes):
+        # Spread each worker over a few users
+        user_id = index + workers * (i % 4) + 1
+        result = add_to_cart.invoke({"user_id": user_id, "product_id": i % 10 + 1, "quantity": 1})
+        if checkouts and not result.startswith("❌"):
+            result = checkout.invoke({"user_id": user_id})
+        failed += result.startswith("❌")
+    return failed
+
+
+def run(shards: int, workers: int, writes: int, directory: str, mode: str) -> tuple:
+    scratch = tempfile.mkdtemp(prefix="shopping-shards-", dir=directory)
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("UPDATE products SET stock = ?;", (INITIAL_STOCK,))
+    conn.commit()
+    conn.close()
+
+    db.DB_SHARDS = shards
+    db.STOCK_SLOTS = min(shards, 8) if mode == "reserved" else 0
+    db._schema_ready = False
+    db._shards_ready.clear()
+    db._slots_ready = False
+    inventory._hot_loaded_at = 0.0
+    if db.STOCK_SLOTS:
+        for product_id in range(1, 11):
+            inventory.promote(product_id)
+
+    # Create the shard files before timing; forked workers inherit the settings
+    for user_id in range(1, workers * 4 + 1):
+        db.get_db_connection(user_id)[0].close()
+
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        start = time.perf_counter()
+        failed = sum(pool.starmap(worker, [(i, workers, writes, mode != "cart") for i in range(workers)]))
+        elapsed = time.perf_counter() - start
+
+    os.chdir(APP_DIR)
+    shutil.rmtree(scratch, ignore_errors=True)
+    return (workers * writes - failed) / elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=100, help="add_to_cart (and checkout) calls per worker")
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--dir", default=None, help="where to put the scratch databases; use a real disk")
+    args = parser.parse_args()
+
+    modes = ("cart", "row", "reserved")
+    print(f"{'shards':>6} {'writes/s':>9} {'checkouts/s row':>16} {'checkouts/s reserved':>21} {'failed':>7}")
+    for shards in args.shards:
+        results = {mode: run(shards, args.workers, args.writes, args.dir, mode) for mode in modes}
+        failed = "/".join(str(results[mode][1]) for mode in modes)
+        print(
+            f"{shards or 'off':>6} {results['cart'][0]:>9.0f} {results['row'][0]:>16.0f} "
+            f"{results['reserved'][0]:>21.0f} {failed:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
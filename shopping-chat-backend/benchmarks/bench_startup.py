@@ -0,0 +1,89 @@
+"""Cold-start benchmark for the agent graph module.
+
+Measures, each in a fresh interpreter, how long ``shopping_agent.shopping_agent``
+takes to import, how long the first (routed, LLM-free) request takes, and how
+long the chat model takes to build on first use. Results are compared against
+``startup_baseline.json``.
+
+    python benchmarks/bench_startup.py            # compare with the baseline
+    python benchmarks/bench_startup.py --record   # overwrite the baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+
+_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import shopping_agent.shopping_agent as graph
+t1 = time.perf_counter()
+from langchain_core.messages import HumanMessage
+graph.agent.invoke({"messages": [HumanMessage("show product 1")]})
+t2 = time.perf_counter()
+if hasattr(graph, "get_llm_with_tools"):
+    graph.get_llm_with_tools()
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_request_ms": (t2 - t1) * 1000,
+    "model_build_ms": (t3 - t2) * 1000,
+}))
+"""
+
+
+def run_probe() -> dict:
+    env = {"OPENAI_API_KEY": "sk-benchmark", **os.environ}
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--record", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    result = {key: round(statistics.median(r[key] for r in runs), 1) for key in runs[0]}
+
+    if args.record:
+        BASELINE.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"baseline recorded: {result}")
+        return 0
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    regressed = False
+    for key, value in result.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:>18}: {value:8.1f} ms")
+            continue
+        change = (value - before) / before if before else 0.0
+        print(f"{key:>18}: {value:8.1f} ms  (baseline {before:8.1f} ms, {change:+.0%})")
+        if key == "import_ms" and change > args.tolerance:
+            regressed = True
+
+    if regressed:
+        print("import time regressed beyond tolerance")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Checkout throughput on one hot product, with and without stock slots.
+
+Worker processes each add the same product to their own cart and check out,
+over and over, against a scratch copy of the database with carts and orders
+sharded (DB_SHARDS) so the stock row is the shared point. Modes:
+
+    off    stock stays on the products row
+    slots  the product is promoted to STOCK_SLOTS counter files up front
+    auto   slots enabled; the product is promoted once its checkouts wait on
+           the catalog's write lock, and each shard then tops up its own slot
+           from the row
+
+With --shards 0 slots stay off, so all three modes measure the products row.
+
+Also checks that no stock was lost or oversold.
+
+    python benchmarks/bench_stock.py --workers 8 --checkouts 100 --dir .
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from shopping_agent.utils import db, inventory  # noqa: E402
+from shopping_agent.utils.tools import add_to_cart, checkout  # noqa: E402
+
+HOT_PRODUCT = 3
+INITIAL_STOCK = 1_000_000
+
+
+def worker(index: int, checkouts: int) -> int:
+    placed = 0
+    for _ in range(checkouts):
+        add_to_cart.invoke({"user_id": index + 1, "product_id": HOT_PRODUCT, "quantity": 1})
+        placed += checkout.invoke({"user_id": index + 1}).startswith("✅")
+    return placed
+
+
+def units_sold(shards: int) -> int:
+    sold = 0
+    for shard in range(shards) if shards else [None]:
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            cursor.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = ?;", (HOT_PRODUCT,))
+            sold += cursor.fetchone()[0]
+        finally:
+            conn.close()
+    return sold
+
+
+def stock_left() -> int:
+    conn, cursor = db.get_db_connection()
+    try:
+        cursor.execute("SELECT stock FROM products WHERE product_id = ?;", (HOT_PRODUCT,))
+        stock = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    return stock + inventory.slot_stock([HOT_PRODUCT]).get(HOT_PRODUCT, 0)
+
+
+def run(mode: str, args) -> tuple:
+    scratch = tempfile.mkdtemp(prefix="shopping-stock-", dir=args.dir)
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("UPDATE products SET stock = ? WHERE product_id = ?;", (INITIAL_STOCK, HOT_PRODUCT))
+    conn.commit()
+    conn.close()
+
+    db.DB_SHARDS = args.shards
+    db.STOCK_SLOTS = 0 if mode == "off" or not args.shards else args.slots
+    db._schema_ready = False
+    db._shards_ready.clear()
+    db._slots_ready = False
+    inventory._hot_loaded_at = 0.0
+    inventory.HOT_STOCK_PROMOTE_AFTER = 3
+    if mode == "slots" and db.STOCK_SLOTS:
+        inventory.promote(HOT_PRODUCT)
+
+    with multiprocessing.get_context("fork").Pool(args.workers) as pool:
+        start = time.perf_counter()
+        placed = sum(pool.starmap(worker, [(i, args.checkouts) for i in range(args.workers)]))
+        elapsed = time.perf_counter() - start
+
+    db.STOCK_SLOTS = args.slots if args.shards else 0
+    inventory._hot_loaded_at = 0.0
+    hot = HOT_PRODUCT in inventory.hot_products()
+    # Failed checkouts leave the cart behind, so an order can hold several units
+    consistent = stock_left() == INITIAL_STOCK - units_sold(args.shards)
+
+    os.chdir(APP_DIR)
+    shutil.rmtree(scratch, ignore_errors=True)
+    return placed / elapsed, args.workers * args.checkouts - placed, hot, consistent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--checkouts", type=int, default=100, help="checkouts per worker")
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--dir", default=None, help="where to put the scratch databases; use a real disk")
+    args = parser.parse_args()
+
+    status = 0
+    print(f"{'mode':<6} {'checkouts/s':>12} {'failed':>7} {'hot':>5} {'stock ok':>9}")
+    for mode in ("off", "slots", "auto"):
+        rate, failed, hot, consistent = run(mode, args)
+        print(f"{mode:<6} {rate:>12.0f} {failed:>7} {str(hot):>5} {str(consistent):>9}")
+        status |= not consistent
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Model tiering with fake models: per-tier latency, tokens and cost, and escalations.
+
+Replays --sessions conversations (the scripted shopping session from
+benchmarks/fake_llm.SCRIPT plus small talk and comparison questions)
+through the shopping-chat-backend graph twice:
+
+    large   MODEL_TIERING off: every call goes to the large model
+    tiered  easy turns go to the small model; the small model produces a
+            bad tool call (unknown tool or wrong argument type) on
+            --error-rate of its tool calls, which must be escalated
+
+Both fakes charge a per-call latency plus a per-output-token latency.
+Costs use tiering.PRICES for the configured SMALL_MODEL / LARGE_MODEL
+names and the fakes' estimated token counts. Exits non-zero unless every
+bad small-model call was escalated and no tool call failed.
+
+    python benchmarks/bench_tiering.py --sessions 20 --error-rate 0.3
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from pydantic import PrivateAttr
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(APP_DIR))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from fake_llm import SCRIPT, ScriptedChatModel  # noqa: E402
+
+CONVERSATION = [
+    "hi",
+    *(utterance for utterance, *_ in SCRIPT[:3]),
+    "which of these laptops should I get for video editing, and why?",
+    "thanks",
+    *(utterance for utterance, *_ in SCRIPT[3:]),
+]
+
+
+class FlakyModel(ScriptedChatModel):
+    """A small model that gets some tool calls wrong."""
+
+    error_rate: float = 0.0
+    seed: int = 0
+    broken: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, context) -> None:
+        super().model_post_init(context)
+        self._rng = random.Random(self.seed)
+
+    def _next_message(self, messages):
+        message = super()._next_message(messages)
+        for call in message.tool_calls:
+            if self._rng.random() < self.error_rate:
+                self.broken += 1
+                ints = [key for key, value in call["args"].items() if isinstance(value, int)]
+                if ints:
+                    call["args"][ints[0]] = "three"
+                else:
+                    call["name"] = call["name"].rstrip("s") + "_list"
+        return message
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run(module, sessions: int, prefix: str) -> Dict[str, object]:
+    from langchain_core.messages import HumanMessage, ToolMessage
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    graph = module.agent.builder.compile(checkpointer=InMemorySaver())
+    turn_ms, tool_errors = [], 0
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"{prefix}-{session}", "user_id": session + 1}}
+        for utterance in CONVERSATION:
+            start = time.perf_counter()
+            state = graph.invoke({"messages": [HumanMessage(utterance)]}, config)
+            turn_ms.append((time.perf_counter() - start) * 1000)
+            last_human = max(i for i, m in enumerate(state["messages"]) if isinstance(m, HumanMessage))
+            tool_errors += sum(
+                1 for m in state["messages"][last_human:] if isinstance(m, ToolMessage) and m.status == "error"
+            )
+    return {
+        "turn_ms": turn_ms,
+        "tool_errors": tool_errors,
+        "tiers": module.model_router.metrics(),
+        "broken": module.get_llm("small").broken,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--small-ms", type=float, default=250.0, help="small model latency per call")
+    parser.add_argument("--large-ms", type=float, default=700.0, help="large model latency per call")
+    parser.add_argument("--small-ms-per-token", type=float, default=5.0)
+    parser.add_argument("--large-ms-per-token", type=float, default=15.0)
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of small-model tool calls that are bad")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="shopping-tiering-")
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    try:
+        from shopping_agent import shopping_agent as module
+        from shopping_agent.utils import tiering
+        from shopping_agent.utils.cache import response_cache
+
+        models = {
+            "small": FlakyModel(
+                latency=args.small_ms / 1000,
+                token_latency=args.small_ms_per_token / 1000,
+                error_rate=args.error_rate,
+                seed=args.seed,
+            ),
+            "large": ScriptedChatModel(latency=args.large_ms / 1000, token_latency=args.large_ms_per_token / 1000),
+        }
+        module.get_llm = lambda tier="large": models[tier]
+        module.get_llm_with_tools.cache_clear()
+        # Every call should reach a model
+        response_cache.get = lambda key: None
+
+        results = {}
+        for mode, tiered in (("large", False), ("tiered", True)):
+            tiering.MODEL_TIERING = tiered
+            module.model_router = tiering.ModelRouter(module.tools)
+            models["small"].broken = 0
+            results[mode] = run(module, args.sessions, mode)
+    finally:
+        os.chdir(BENCH_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    turns = args.sessions * len(CONVERSATION)
+    print(f"{args.sessions} sessions, {turns} turns, small-model error rate {args.error_rate:g}\n")
+    print(f"{'mode':<8} {'tier':<6} {'model':<14} {'calls':>6} {'mean ms':>9} {'in tok':>8} {'out tok':>8} {'cost $':>9}")
+    for mode, result in results.items():
+        for tier in ("small", "large"):
+            stats = result["tiers"][tier]
+            if not stats["calls"]:
+                continue
+            print(
+                f"{mode:<8} {tier:<6} {stats['model']:<14} {stats['calls']:>6} {stats['mean_ms']:>9.1f} "
+                f"{stats['input_tokens']:>8} {stats['output_tokens']:>8} {stats['cost']:>9.4f}"
+            )
+
+    print(f"\n{'mode':<8} {'turn p50 ms':>12} {'turn p95 ms':>12} {'$ / 1k turns':>13} {'escalations':>24} {'tool errors':>12}")
+    for mode, result in results.items():
+        cost = sum(result["tiers"][tier]["cost"] for tier in ("small", "large"))
+        escalations = ", ".join(f"{k}={v}" for k, v in result["tiers"]["escalations"].items()) or "-"
+        print(
+            f"{mode:<8} {percentile(result['turn_ms'], 0.5):>12.1f} {percentile(result['turn_ms'], 0.95):>12.1f} "
+            f"{cost / turns * 1000:>13.3f} {escalations:>24} {result['tool_errors']:>12}"
+        )
+
+    tiered = results["tiered"]
+    problems = []
+    if sum(tiered["tiers"]["escalations"].values()) != tiered["broken"]:
+        problems.append(f"{tiered['broken']} bad small-model calls but escalations {tiered['tiers']['escalations']}")
+    if any(result["tool_errors"] for result in results.values()):
+        problems.append("tool calls failed")
+    if not tiered["tiers"]["small"]["calls"]:
+        problems.append("no call went to the small model")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Prompt tokens of tool schemas per turn: every tool bound vs the selected subset.
+
+Replays a conversation (small talk, the scripted shopping session from
+benchmarks/fake_llm.SCRIPT, follow-ups, weather) through the
+shopping-chat-backend graph with a fake model that records which tools
+each call had bound. For every turn it prints the model calls made, the
+tools bound and the schema tokens sent, against binding all of them, and
+flags any scripted tool call the selection would have made impossible.
+Schema tokens are estimated as the JSON schema's characters / 4.
+
+    python benchmarks/bench_tool_select.py
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, List, Sequence, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(APP_DIR))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from fake_llm import SCRIPT, ScriptedChatModel  # noqa: E402
+
+CONVERSATION = [
+    "hi there",
+    *(utterance for utterance, *_ in SCRIPT[:3]),
+    "add one more",
+    "yes, two of them",
+    *(utterance for utterance, *_ in SCRIPT[3:]),
+    "thanks!",
+    "what's the weather in Paris?",
+    "show me the cheapest headphones",
+    "good morning",
+]
+
+# Tool calls the fake model made that the bound subset did not offer
+MISSES: List[Tuple[str, Tuple[str, ...]]] = []
+
+
+class BindingModel(ScriptedChatModel):
+    """Remembers which tools a bound copy was given."""
+
+    bound: Tuple[str, ...] = ()
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "BindingModel":
+        return self.model_copy(update={"bound": tuple(tool.name for tool in tools)})
+
+    def _next_message(self, messages):
+        message = super()._next_message(messages)
+        for call in message.tool_calls:
+            if call["name"] not in self.bound:
+                MISSES.append((call["name"], self.bound))
+        return message
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    from langchain_core.messages import HumanMessage
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    scratch = tempfile.mkdtemp(prefix="shopping-tool-select-")
+    shutil.copy(APP_DIR / "ecommerce_test.db", scratch)
+    os.chdir(scratch)
+    try:
+        from shopping_agent import shopping_agent as module
+
+        fake = BindingModel()
+        module.get_llm = lambda *tier: fake
+        module.get_llm_with_tools.cache_clear()
+        graph = module.agent.builder.compile(checkpointer=InMemorySaver())
+        selector = module.tool_selector
+        all_tokens = selector.metrics()["all_tools_schema_tokens"]
+        config = {"configurable": {"thread_id": "tool-select", "user_id": args.user_id}}
+
+        print(f"{len(selector.names)} tools, ~{all_tokens} schema tokens when all are bound\n")
+        print(f"{'turn':<32} {'calls':>5} {'tools':>6} {'sent':>6} {'all':>6} {'saved':>6}")
+        totals = [0, 0, 0]
+        for utterance in CONVERSATION:
+            before = dict(selector.stats)
+            misses = len(MISSES)
+            graph.invoke({"messages": [HumanMessage(utterance)]}, config)
+            calls = selector.stats["calls"] - before["calls"]
+            bound = selector.stats["tools_bound"] - before["tools_bound"]
+            sent = selector.stats["schema_tokens"] - before["schema_tokens"]
+            totals = [totals[0] + calls, totals[1] + sent, totals[2] + calls * all_tokens]
+            flag = "  MISSED " + ", ".join(name for name, _ in MISSES[misses:]) if len(MISSES) > misses else ""
+            tools = f"{bound / calls:.0f}" if calls else "-"
+            print(
+                f"{utterance:<32} {calls:>5} {tools:>6} {sent:>6} {calls * all_tokens:>6} "
+                f"{calls * all_tokens - sent:>6}{flag}"
+            )
+        print(f"{'conversation':<32} {totals[0]:>5} {'':>6} {totals[1]:>6} {totals[2]:>6} {totals[2] - totals[1]:>6}")
+        print(f"\nbound variants built: {module.get_llm_with_tools.cache_info().currsize}, misses: {len(MISSES)}")
+    finally:
+        os.chdir(BENCH_DIR)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
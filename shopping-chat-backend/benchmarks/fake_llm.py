@@ -0,0 +1,103 @@
+"""Deterministic stand-in for the chat model, for offline benchmarks.
+
+ScriptedChatModel answers each user utterance in SCRIPT with a fixed tool
+call, and once that tool's result is in the history, with a short text
+reply. It keeps no per-conversation state: the next step is read from the
+messages, so one instance can serve any number of concurrent threads. Cart
+tools take the user id from ``configurable.user_id`` of the running graph.
+A call takes ``latency`` plus ``token_latency`` per output token, so longer
+answers cost time as they do when a real model decodes them.
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables.config import ensure_config
+from pydantic import PrivateAttr
+
+# One shopping session: utterance -> (tool, args, reply). "{user_id}" in the
+# args is filled from the graph config.
+SCRIPT: List[tuple] = [
+    ("browse the catalog", "list_products", {}, "Here's what we have in stock."),
+    ("search for apple", "search_products", {"query": "Apple"}, "These products match your search."),
+    (
+        "add product 3 to my cart",
+        "add_to_cart",
+        {"user_id": "{user_id}", "product_id": 3, "quantity": 1},
+        "Added it to your cart.",
+    ),
+    ("view my cart", "view_cart", {"user_id": "{user_id}"}, "Here's your cart."),
+    ("checkout", "checkout", {"user_id": "{user_id}"}, "Your order has been placed."),
+    # Checkout only runs once the user confirms it
+    ("yes", "checkout", {"user_id": "{user_id}"}, "Your order has been placed."),
+]
+
+_STEPS = {utterance: (tool, args, reply) for utterance, tool, args, reply in SCRIPT}
+
+
+def _fill(args: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    return {k: user_id if v == "{user_id}" else v for k, v in args.items()}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replays SCRIPT with a per-call and a per-output-token latency."""
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    calls: int = 0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        # Tool calls come from the script, so binding is a no-op
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        last_human = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1
+        )
+        utterance = str(messages[last_human].content).strip().lower() if last_human >= 0 else ""
+        step = _STEPS.get(utterance)
+        if step is None:
+            return AIMessage(content="How can I help with your shopping today?")
+
+        tool, args, reply = step
+        if any(isinstance(m, ToolMessage) for m in messages[last_human + 1 :]):
+            return AIMessage(content=reply)
+
+        user_id = ensure_config().get("configurable", {}).get("user_id", 1)
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": tool, "args": _fill(args, user_id), "id": f"call_{uuid.uuid4().hex[:12]}"}],
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._lock:
+            self.calls += 1
+
+        message = self._next_message(messages)
+        # Rough token counts, so the LLM token metrics move as they would live
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = max(1, len(str(message.content)) // 4)
+        if self.latency or self.token_latency:
+            time.sleep(self.latency + output_tokens * self.token_latency)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
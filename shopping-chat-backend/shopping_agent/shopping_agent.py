@@ -1,5 +1,7 @@
 import json
-from typing import Annotated
+import time
+from functools import lru_cache
+from typing import Annotated, FrozenSet, Optional
 import uuid
 from langchain_core.messages import BaseMessage, ToolMessage, AIMessage
 from typing_extensions import TypedDict, Sequence
@@ -9,38 +11,79 @@ from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.graph.ui import AnyUIMessage, ui_message_reducer, push_ui_message
 import os
-from langchain.chat_models import init_chat_model
 
 from shopping_agent.utils.tools import (
     get_weather,
     list_products,
     product_details,
+    product_details_batch,
     search_products,
+    filter_products,
+    recommend_products,
+    top_products,
     add_to_cart,
     view_cart,
+    checkout,
+)
+from shopping_agent.utils.cache import response_cache
+from shopping_agent.utils.checkpointer import get_checkpointer
+from shopping_agent.utils.history import trim_history
+from shopping_agent.utils.memo import MemoizedToolNode
+from shopping_agent.utils.metrics import start_metrics_server, timed_node
+from shopping_agent.utils.nodes import push_products_ui
+from shopping_agent.utils.state import State, supersede_ui
+from shopping_agent.utils.tiering import MODELS, ModelRouter
+from shopping_agent.utils.tool_select import ToolSelector
+from shopping_agent.utils.router import (
+    record_llm_latency,
+    require_confirmation,
+    route_after_router,
+    routed_result,
+    router,
 )
-
-llm = init_chat_model("openai:gpt-4.1")
-
-
-class State(MessagesState):
-    ui: Annotated[Sequence[AnyUIMessage], ui_message_reducer]
-
-
-graph_builder = StateGraph(State)
 
 tools = [
     get_weather,
     list_products,
     product_details,
+    product_details_batch,
     search_products,
+    filter_products,
+    recommend_products,
+    top_products,
     add_to_cart,
     view_cart,
+    checkout,
 ]
-llm_with_tools = llm.bind_tools(tools)
+
+
+@lru_cache(maxsize=None)
+def get_llm(tier: str = "large"):
+    """Builds a tier's chat model on first use and reuses it for the process."""
+    # Imported here: the langchain model registry is slow to import
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(f"openai:{MODELS[tier]}")
+
+
+@lru_cache(maxsize=None)
+def get_llm_with_tools(names: Optional[FrozenSet[str]] = None, tier: str = "large"):
+    """Returns a tier's chat model with the named shop tools bound (all of
+    them by default), built once per process for each subset."""
+    selected = tools if names is None else [tool for tool in tools if tool.name in names]
+    return get_llm(tier).bind_tools(selected) if selected else get_llm(tier)
+
+
+# Each model call only carries the schemas of the tools its turn can use
+tool_selector = ToolSelector(tools)
+# Easy turns are answered by the small model
+model_router = ModelRouter(tools)
 
 
 def chatbot(state: State):
+    routed = routed_result(state["messages"])
+    if routed is not None:
+        return {"messages": [routed]}
 
     if (
         isinstance(state["messages"][-1], ToolMessage)
@@ -52,6 +95,7 @@ def chatbot(state: State):
         )
 
         data = json.loads(str(state["messages"][-1].content))
+        supersede_ui(state.get("ui", []), "weather")
         push_ui_message(
             "weather",
             data,
@@ -68,56 +112,87 @@ def chatbot(state: State):
     ):
         message = AIMessage(
             id=str(uuid.uuid4()),
-            content=f"Here's the list of products form our shop:  {state['messages'][-1].content}",
+            content="Here's the list of products from our shop.",
         )
 
-        print(state['messages'][-1].content)
-        data = json.loads(str(state["messages"][-1].content))
-        print(data)
-        push_ui_message(
-            "list_products",
-            props={"products": data},
-            metadata={"message_id": message.id},
-            merge=True,
-            message=message,
-        )
+        # The tool's rows seed the list; the client pages through the rest from its cursor
+        try:
+            products = json.loads(str(state["messages"][-1].content))
+        except ValueError:
+            products = []
+        push_products_ui(message, products if isinstance(products, list) else [], state.get("ui", []))
 
     elif (
         isinstance(state["messages"][-1], ToolMessage)
         and state["messages"][-1].name == "view_cart"
     ):
-        message = AIMessage(
-            id=str(uuid.uuid4()),
-            content=f"Here's the list of products in your cart:  {state['messages'][-1].content}",
-        )
-
-        print(state['messages'][-1].content)
-        data = json.loads(str(state["messages"][-1].content))
-        print(data)
-        push_ui_message(
-            "view_cart",
-            props=data,
-            metadata={"message_id": message.id},
-            merge=True,
-            message=message,
-        )
+        content = str(state["messages"][-1].content)
+        try:
+            data = json.loads(content)
+        except ValueError:
+            # An empty or missing cart comes back as a plain sentence
+            data = None
+
+        if data is None:
+            message = AIMessage(id=str(uuid.uuid4()), content=content)
+        else:
+            message = AIMessage(
+                id=str(uuid.uuid4()),
+                content=f"Here's the list of products in your cart:  {content}",
+            )
+            supersede_ui(state.get("ui", []), "view_cart")
+            push_ui_message(
+                "view_cart",
+                props=data,
+                metadata={"message_id": message.id},
+                merge=True,
+                message=message,
+            )
 
     else:
-        return {"messages": [llm_with_tools.invoke(state["messages"])]}
+        cache_key = response_cache.key_for(state["messages"])
+        response = response_cache.get(cache_key) if cache_key else None
+        if response is None:
+            names = tool_selector.select(state["messages"])
+            start = time.perf_counter()
+            response = model_router.invoke(
+                state["messages"], trim_history(state["messages"]), names, get_llm_with_tools
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            record_llm_latency(elapsed_ms)
+            if cache_key:
+                response_cache.put(cache_key, response, elapsed_ms)
+        return {"messages": [require_confirmation(state["messages"], response)]}
 
     return {"messages": [message]}
 
 
-graph_builder.add_node("chatbot", chatbot)
+# Repeated read-only tool calls within a thread are served from a memo
+tool_node = MemoizedToolNode(ToolNode(tools=tools))
 
-tool_node = ToolNode(tools=tools)
-graph_builder.add_node("tools", tool_node)
 
-graph_builder.add_conditional_edges(
-    "chatbot",
-    tools_condition,
-)
-# Any time a tool is called, we return to the chatbot to decide the next step
-graph_builder.add_edge("tools", "chatbot")
-graph_builder.add_edge(START, "chatbot")
-agent = graph_builder.compile()
+def build_graph(checkpointer=None):
+    """Compiles the agent graph; the model itself is only built on first use."""
+    graph_builder = StateGraph(State)
+
+    graph_builder.add_node("router", timed_node("router", router))
+    graph_builder.add_node("chatbot", timed_node("chatbot", chatbot))
+    graph_builder.add_node("tools", timed_node("tools", tool_node))
+
+    graph_builder.add_conditional_edges(
+        "chatbot",
+        tools_condition,
+    )
+    # Any time a tool is called, we return to the chatbot to decide the next step
+    graph_builder.add_edge("tools", "chatbot")
+    # Simple commands are routed straight to the tools, skipping the LLM
+    # Checkout asks for confirmation first; that prompt ends the turn
+    graph_builder.add_conditional_edges("router", route_after_router, ["tools", "chatbot", END])
+    graph_builder.add_edge(START, "router")
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+# Persistent threads are opt-in via CHECKPOINT_DB; the LangGraph server
+# otherwise supplies its own checkpointer.
+agent = build_graph(checkpointer=get_checkpointer())
+start_metrics_server()
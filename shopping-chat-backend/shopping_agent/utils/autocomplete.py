@@ -0,0 +1,241 @@
+import bisect
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from shopping_agent.utils import db
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_K = int(os.getenv("AUTOCOMPLETE_K", "8"))
+AUTOCOMPLETE_MAX_K = 20
+# Catalog changes are picked up at most this many seconds after they commit.
+AUTOCOMPLETE_REFRESH = float(os.getenv("AUTOCOMPLETE_REFRESH", "1"))
+# Prefixes matching at most this many index entries are ranked by scanning
+# them; longer ranges are ranked from their sub-prefixes and memoized.
+SCAN_LIMIT = 256
+
+# An entry packs (product_id, offset of a word start in its normalized name).
+_OFFSET_BITS = 8
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Lowercases, strips accents and reduces punctuation to single spaces."""
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(_WORD.findall(text.casefold()))
+
+
+class PrefixIndex:
+    """Product names searchable by the prefix of any of their words.
+
+    Every word start of every normalized name is one entry in a sorted
+    array, keyed by the name from that word on, so "mx mas" finds
+    "Logitech MX Master 3S". Entries are packed ints rather than strings,
+    and keys are sliced from the names only while bisecting. Matches are
+    ranked by popularity; short prefixes that match many entries have their
+    ranking memoized. A memoized prefix is ranked by merging the rankings
+    of its one-character-longer prefixes, so all of them are built in about
+    one pass at load, and a change only re-ranks the prefixes of its keys.
+    """
+
+    def __init__(self, products: Iterable[Tuple[int, str, int]] = ()):
+        self._names: Dict[int, str] = {}
+        self._display: Dict[int, str] = {}
+        self._popularity: Dict[int, int] = {}
+        self._memo: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "memo_hits": 0, "updates": 0}
+
+        entries = []
+        for product_id, name, popularity in products:
+            entries.extend(self._store(product_id, name, popularity))
+        self._entries = array("q", sorted(entries, key=self._key))
+        self._top("", 0, len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _key(self, entry: int) -> str:
+        return self._names[entry >> _OFFSET_BITS][entry & _OFFSET_MASK :]
+
+    def _store(self, product_id: int, name: str, popularity: int) -> List[int]:
+        normalized = normalize(name)
+        self._names[product_id] = normalized
+        self._display[product_id] = name
+        self._popularity[product_id] = popularity or 0
+        starts = [0] + [i + 1 for i, c in enumerate(normalized) if c == " "]
+        return [product_id << _OFFSET_BITS | start for start in starts if start <= _OFFSET_MASK]
+
+    def _forget(self, product_id: int) -> None:
+        name = self._names.get(product_id)
+        if name is None:
+            return
+        starts = [0] + [i + 1 for i, c in enumerate(name) if c == " "]
+        for start in starts:
+            if start > _OFFSET_MASK:
+                continue
+            entry = product_id << _OFFSET_BITS | start
+            i = bisect.bisect_left(self._entries, name[start:], key=self._key)
+            # Several products can share a key; step to this one's entry
+            while self._entries[i] != entry:
+                i += 1
+            del self._entries[i]
+            self._invalidate(name[start:])
+        del self._names[product_id], self._display[product_id], self._popularity[product_id]
+
+    def _invalidate(self, key: str) -> None:
+        for end in range(len(key) + 1):
+            self._memo.pop(key[:end], None)
+
+    def upsert(self, product_id: int, name: str, popularity: int) -> None:
+        """Adds a product or applies a change to its name or popularity."""
+        with self._lock:
+            self._forget(product_id)
+            for entry in self._store(product_id, name, popularity):
+                bisect.insort(self._entries, entry, key=self._key)
+                self._invalidate(self._key(entry))
+            self.stats["updates"] += 1
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._forget(product_id)
+            self.stats["updates"] += 1
+
+    def _rank(self, product_ids: Iterable[int], k: int) -> List[int]:
+        # Most popular first; ties in name order
+        return heapq.nsmallest(k, set(product_ids), key=lambda p: (-self._popularity[p], self._names[p]))
+
+    def _top(self, prefix: str, lo: int, hi: int) -> List[int]:
+        """Ranks the products of entries[lo:hi], which all start with prefix."""
+        if hi - lo <= SCAN_LIMIT:
+            return self._rank((self._entries[i] >> _OFFSET_BITS for i in range(lo, hi)), AUTOCOMPLETE_MAX_K)
+
+        ranked = self._memo.get(prefix)
+        if ranked is not None:
+            return ranked
+
+        candidates = []
+        i = lo
+        while i < hi:
+            key = self._key(self._entries[i])
+            if len(key) == len(prefix):
+                # The key is the prefix itself; it sorts before its extensions
+                candidates.append(self._entries[i] >> _OFFSET_BITS)
+                i += 1
+                continue
+            child = key[: len(prefix) + 1]
+            end = bisect.bisect_left(self._entries, child + "\U0010ffff", i, hi, key=self._key)
+            candidates.extend(self._top(child, i, end))
+            i = end
+
+        ranked = self._memo[prefix] = self._rank(candidates, AUTOCOMPLETE_MAX_K)
+        return ranked
+
+    def suggest(self, prefix: str, k: int = AUTOCOMPLETE_K) -> List[Dict[str, object]]:
+        """Returns up to k products with a word starting with prefix, most popular first."""
+        query = normalize(prefix)
+        k = min(k, AUTOCOMPLETE_MAX_K)
+        if not query or k <= 0:
+            return []
+
+        with self._lock:
+            self.stats["queries"] += 1
+            lo = bisect.bisect_left(self._entries, query, key=self._key)
+            hi = bisect.bisect_left(self._entries, query + "\U0010ffff", key=self._key)
+            if query in self._memo:
+                self.stats["memo_hits"] += 1
+            ranked = self._top(query, lo, hi)
+            return [{"product_id": p, "name": self._display[p]} for p in ranked[:k]]
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns query and update counts and the index size."""
+        return {**self.stats, "products": len(self._names), "entries": len(self._entries), "memoized": len(self._memo)}
+
+
+_index: Optional[PrefixIndex] = None
+_seq = 0
+_checked_at = 0.0
+_load_lock = threading.Lock()
+
+
+def _load() -> None:
+    global _index, _seq, _checked_at
+
+    conn, cursor = db.get_db_connection()
+    try:
+        # One read transaction, so the change log position matches the rows
+        conn.execute("BEGIN;")
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM catalog_changes;")
+        (seq,) = cursor.fetchone()
+        cursor.execute("SELECT product_id, name, popularity FROM products;")
+        index = PrefixIndex(cursor.fetchall())
+        conn.rollback()
+    finally:
+        conn.close()
+
+    _index, _seq, _checked_at = index, seq, time.monotonic()
+    logger.info("autocomplete index loaded: %s", index.metrics())
+
+
+def _catch_up() -> None:
+    global _seq, _checked_at
+
+    conn, cursor = db.get_db_connection()
+    try:
+        conn.execute("BEGIN;")
+        cursor.execute("SELECT MIN(seq), MAX(seq) FROM catalog_changes;")
+        first, last = cursor.fetchone()
+        if last is None or last <= _seq:
+            _checked_at = time.monotonic()
+            return
+        if first > _seq + 1:
+            # Changes we have not seen were pruned from the log
+            conn.rollback()
+            _load()
+            return
+
+        cursor.execute("SELECT DISTINCT product_id FROM catalog_changes WHERE seq > ?;", (_seq,))
+        changed = [product_id for (product_id,) in cursor.fetchall()]
+        cursor.execute(
+            f"SELECT product_id, name, popularity FROM products WHERE product_id IN ({', '.join('?' * len(changed))});",
+            changed,
+        )
+        rows = {row[0]: row for row in cursor.fetchall()}
+        conn.rollback()
+    finally:
+        conn.close()
+
+    for product_id in changed:
+        if product_id in rows:
+            _index.upsert(*rows[product_id])
+        else:
+            _index.remove(product_id)
+    _seq, _checked_at = last, time.monotonic()
+
+
+def get_index() -> PrefixIndex:
+    """Returns the process's autocomplete index, loading it or catching up with the catalog."""
+    if _index is None or time.monotonic() - _checked_at > AUTOCOMPLETE_REFRESH:
+        # Whoever holds the lock refreshes; everyone else answers from the current index
+        if _load_lock.acquire(blocking=_index is None):
+            try:
+                if _index is None:
+                    _load()
+                elif time.monotonic() - _checked_at > AUTOCOMPLETE_REFRESH:
+                    _catch_up()
+            finally:
+                _load_lock.release()
+    return _index
+
+
+def suggest(prefix: str, k: int = AUTOCOMPLETE_K) -> List[Dict[str, object]]:
+    """Returns product suggestions for what the user has typed so far."""
+    return get_index().suggest(prefix, k)
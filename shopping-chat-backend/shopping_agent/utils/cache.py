@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+
+from shopping_agent.utils.db import catalog_version
+from shopping_agent.utils.router import normalize
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# Optional SQLite file that persists cached responses across restarts.
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB")
+
+# Tools whose results depend on the user; turns touching them are never cached.
+USER_SPECIFIC_TOOLS = {"add_to_cart", "view_cart", "checkout", "get_order_status", "recommend_products"}
+_USER_SPECIFIC_WORDS = {"my", "mine", "cart", "checkout", "order", "orders", "buy"}
+
+
+class ResponseCache:
+    """LRU cache of model responses with an optional SQLite tier.
+
+    Keys combine the normalized user message, the tool results already seen
+    this turn, the previous assistant reply and the catalog version, so any
+    product or stock change invalidates every entry.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        ttl: float = RESPONSE_CACHE_TTL,
+        db_path: Optional[str] = RESPONSE_CACHE_DB,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, llm_ms REAL NOT NULL, created_at REAL NOT NULL);"
+            )
+            self._db.commit()
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "lookup_ms": 0.0, "saved_ms": 0.0}
+
+    def key_for(self, messages: Sequence[BaseMessage]) -> Optional[str]:
+        """Returns the cache key for the next model call, or None to opt out."""
+        human_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)),
+            None,
+        )
+        if human_index is None or not isinstance(messages[human_index].content, str):
+            return None
+
+        text = normalize(messages[human_index].content)
+        turn = messages[human_index + 1 :]
+        if _USER_SPECIFIC_WORDS.intersection(text.split()) or any(
+            isinstance(m, ToolMessage) and m.name in USER_SPECIFIC_TOOLS for m in turn
+        ):
+            self.stats["skipped"] += 1
+            return None
+
+        previous_reply = next(
+            (m.content for m in reversed(messages[:human_index]) if isinstance(m, AIMessage)),
+            None,
+        )
+        payload = {
+            "message": text,
+            "previous_reply": previous_reply,
+            "tool_results": [[m.name, str(m.content)] for m in turn if isinstance(m, ToolMessage)],
+            "catalog_version": catalog_version(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        """Returns a fresh copy of the cached response, or None on a miss."""
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self._db is not None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, llm_ms, created_at FROM response_cache WHERE key = ?;", (key,)
+                ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1], row[2])
+                self._remember(key, entry)
+
+        if entry is None or time.time() - entry[2] > self.ttl:
+            self.stats["misses"] += 1
+            return None
+
+        value, llm_ms, _ = entry
+        message = messages_from_dict([json.loads(value)])[0]
+        # Tool-call and message ids must be unique within a thread.
+        message = message.model_copy(
+            update={
+                "id": str(uuid.uuid4()),
+                "tool_calls": [
+                    {**call, "id": f"call_{uuid.uuid4().hex}"} for call in message.tool_calls
+                ],
+            }
+        )
+        self.stats["hits"] += 1
+        self.stats["saved_ms"] += llm_ms
+        self.stats["lookup_ms"] += (time.perf_counter() - start) * 1000
+        return message
+
+    def put(self, key: str, message: AIMessage, llm_ms: float) -> None:
+        """Stores a model response unless it calls a user-specific tool."""
+        if any(call["name"] in USER_SPECIFIC_TOOLS for call in message.tool_calls):
+            self.stats["skipped"] += 1
+            return
+
+        entry = (json.dumps(message_to_dict(message)), llm_ms, time.time())
+        self._remember(key, entry)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, llm_ms, created_at) VALUES (?, ?, ?, ?);",
+                    (key, *entry),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def metrics(self) -> Dict[str, float]:
+        """Returns hit rate, average lookup latency and total LLM time saved."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "avg_hit_ms": self.stats["lookup_ms"] / self.stats["hits"] if self.stats["hits"] else 0.0,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,541 @@
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from shopping_agent.utils.serde import get_serializer
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: when set, the graph is compiled with a SqliteCheckpointSaver on this file.
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_IDLE_TTL = float(os.getenv("CHECKPOINT_IDLE_TTL", str(7 * 24 * 3600)))
+CHECKPOINT_BATCH_MS = float(os.getenv("CHECKPOINT_BATCH_MS", "2"))
+CHECKPOINT_COMPACT_INTERVAL = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "300"))
+# A batch that fails is retried this many times before its writes are dropped
+CHECKPOINT_RETRIES = int(os.getenv("CHECKPOINT_RETRIES", "3"))
+CHECKPOINT_FLUSH_TIMEOUT = float(os.getenv("CHECKPOINT_FLUSH_TIMEOUT", "30"))
+
+Operation = Callable[[sqlite3.Connection], None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_active REAL NOT NULL
+);
+"""
+
+
+class CheckpointWriteError(RuntimeError):
+    """Queued checkpoint writes were dropped after their batch kept failing."""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    # WAL + NORMAL only fsyncs at WAL checkpoints, not on every commit
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    return conn
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver backed by a dedicated WAL-mode SQLite file.
+
+    Writes are queued and committed by a single writer thread, which groups
+    everything that arrives within ``batch_ms`` into one transaction. A
+    failing batch is retried, then committed one write at a time; writes
+    that still fail are dropped and their thread's next flush raises
+    CheckpointWriteError. Reads flush the thread's queued writes first, so
+    a thread always sees its own writes. A
+    background pass keeps the last ``keep_last`` checkpoints per thread,
+    drops threads idle for longer than ``idle_ttl`` seconds and truncates
+    the WAL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        serde=None,
+        keep_last: int = CHECKPOINT_KEEP_LAST,
+        idle_ttl: float = CHECKPOINT_IDLE_TTL,
+        batch_ms: float = CHECKPOINT_BATCH_MS,
+        compact_interval: float = CHECKPOINT_COMPACT_INTERVAL,
+        retries: int = CHECKPOINT_RETRIES,
+        flush_timeout: float = CHECKPOINT_FLUSH_TIMEOUT,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        self.idle_ttl = idle_ttl
+        self.batch_ms = batch_ms
+        self.compact_interval = compact_interval
+        self.retries = retries
+        self.flush_timeout = flush_timeout
+
+        self._writer = _connect(path)
+        self._writer.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        self._writer.executescript(_SCHEMA)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+
+        # (thread_id, op) pairs; _pending counts each thread's queued and in-flight ops
+        self._queue: List[Tuple[str, Operation]] = []
+        self._pending: Dict[str, int] = {}
+        self._failed: Dict[str, BaseException] = {}
+        self._dirty_threads: set = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_compaction = time.monotonic()
+        self._thread = threading.Thread(target=self._run_writer, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    # -- writer ----------------------------------------------------------
+
+    def _submit(self, thread_id: str, op: Operation) -> None:
+        with self._cond:
+            self._queue.append((thread_id, op))
+            self._pending[thread_id] = self._pending.get(thread_id, 0) + 1
+            self._cond.notify_all()
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    if not self._cond.wait(timeout=self.compact_interval):
+                        break
+                if self._closed and not self._queue:
+                    return
+            # Give concurrent writers a moment to join this batch
+            time.sleep(self.batch_ms / 1000)
+            with self._cond:
+                batch, self._queue = self._queue, []
+
+            # Anything escaping here would kill the thread and hang every flush
+            failed: Dict[str, BaseException] = {}
+            try:
+                failed = self._commit_batch(batch)
+            except Exception as e:
+                logger.exception("checkpoint batch of %d writes failed", len(batch))
+                failed = {thread_id: e for thread_id, _ in batch}
+
+            with self._cond:
+                for thread_id, _ in batch:
+                    self._pending[thread_id] -= 1
+                    if not self._pending[thread_id]:
+                        del self._pending[thread_id]
+                self._failed.update(failed)
+                self._cond.notify_all()
+
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                try:
+                    self.compact()
+                except Exception:
+                    logger.exception("checkpoint compaction failed")
+
+    def _commit_batch(self, batch: List[Tuple[str, Operation]]) -> Dict[str, BaseException]:
+        """Commits a batch, retrying it and then its writes one by one; returns the threads whose writes failed."""
+        if not batch:
+            return {}
+        for attempt in range(self.retries + 1):
+            try:
+                self._commit([op for _, op in batch])
+                return {}
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(0.01 * 2**attempt)
+        if len(batch) == 1:
+            logger.error("checkpoint write for thread %s dropped: %s", batch[0][0], error)
+            return {batch[0][0]: error}
+
+        # One bad write should not take the rest of the batch with it
+        failed: Dict[str, BaseException] = {}
+        for thread_id, op in batch:
+            try:
+                self._commit([op])
+            except Exception as e:
+                logger.error("checkpoint write for thread %s dropped: %s", thread_id, e)
+                failed[thread_id] = e
+        return failed
+
+    def _commit(self, batch: List[Operation]) -> None:
+        conn = self._writer
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                for op in batch:
+                    op(conn)
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+
+    def flush(self, thread_id: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        """Blocks until the queued writes of thread_id (or of every thread) are committed.
+
+        Raises CheckpointWriteError if some of them were dropped since the
+        last flush, and TimeoutError if they are still queued after timeout
+        seconds (default: flush_timeout).
+        """
+        timeout = self.flush_timeout if timeout is None else timeout
+        with self._cond:
+            if thread_id is None:
+                done = self._cond.wait_for(lambda: not self._pending, timeout)
+                failed, self._failed = self._failed, {}
+            else:
+                done = self._cond.wait_for(lambda: thread_id not in self._pending, timeout)
+                failed = {thread_id: self._failed.pop(thread_id)} if thread_id in self._failed else {}
+        if failed:
+            thread, error = next(iter(failed.items()))
+            raise CheckpointWriteError(
+                f"checkpoint writes of {len(failed)} thread(s) were dropped, e.g. {thread!r}: {error}"
+            ) from error
+        if not done:
+            raise TimeoutError(f"checkpoint writes not committed after {timeout:g}s")
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._writer.close()
+
+    # -- retention -------------------------------------------------------
+
+    def compact(self) -> Dict[str, int]:
+        """Applies the retention policies and reclaims free pages."""
+        self._last_compaction = time.monotonic()
+        with self._cond:
+            dirty, self._dirty_threads = self._dirty_threads, set()
+
+        with self._write_lock:
+            return self._compact(self._writer, dirty)
+
+    def _compact(self, conn: sqlite3.Connection, dirty: set) -> Dict[str, int]:
+        stats = {"checkpoints": 0, "threads": 0}
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            for thread_id, checkpoint_ns in dirty:
+                stats["checkpoints"] += conn.execute(
+                    """
+                    DELETE FROM checkpoints
+                    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints
+                        WHERE thread_id = ? AND checkpoint_ns = ?
+                        ORDER BY checkpoint_id DESC LIMIT ?
+                    );
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last),
+                ).rowcount
+                conn.execute(
+                    """
+                    DELETE FROM writes
+                    WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    );
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+
+            idle = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_active < ?;",
+                    (time.time() - self.idle_ttl,),
+                )
+            ]
+            for thread_id in idle:
+                self._delete_thread(conn, thread_id)
+            stats["threads"] = len(idle)
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+        conn.execute("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        return stats
+
+    @staticmethod
+    def _delete_thread(conn: sqlite3.Connection, thread_id: str) -> None:
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ?;", (thread_id,))
+        conn.execute("DELETE FROM writes WHERE thread_id = ?;", (thread_id,))
+        conn.execute("DELETE FROM threads WHERE thread_id = ?;", (thread_id,))
+
+    # -- reads -----------------------------------------------------------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def _load_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._reader().execute(
+            """
+            SELECT task_id, channel, type, value FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_id, idx;
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        self.flush(thread_id)
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        if checkpoint_id := get_checkpoint_id(config):
+            row = self._reader().execute(
+                query + " AND checkpoint_id = ?;", (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchone()
+        else:
+            row = self._reader().execute(
+                query + " ORDER BY checkpoint_id DESC LIMIT 1;", (thread_id, checkpoint_ns)
+            ).fetchone()
+        return self._load_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        # Listing one thread only waits for that thread's writes
+        self.flush(config["configurable"]["thread_id"] if config is not None else None)
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._reader().execute(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC;",
+            params,
+        )
+        for row in rows:
+            item = self._load_tuple(row)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            yield item
+            if limit is not None:
+                limit -= 1
+                if limit <= 0:
+                    break
+
+    # -- writes ----------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, payload = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_payload = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            payload,
+            metadata_type,
+            metadata_payload,
+        )
+        now = time.time()
+
+        def op(conn: sqlite3.Connection) -> None:
+            conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?);", row)
+            conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?);", (thread_id, now))
+
+        with self._cond:
+            self._dirty_threads.add((thread_id, checkpoint_ns))
+        self._submit(thread_id, op)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels overwrite, regular writes are only stored once
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+                task_path,
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+
+        def op(conn: sqlite3.Connection) -> None:
+            conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);", rows)
+
+        self._submit(thread_id, op)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._submit(thread_id, lambda conn: self._delete_thread(conn, thread_id))
+        self.flush(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # -- async -----------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def get_checkpointer() -> Optional[SqliteCheckpointSaver]:
+    """Returns the persistent checkpointer when CHECKPOINT_DB is configured."""
+    return SqliteCheckpointSaver(CHECKPOINT_DB, serde=get_serializer()) if CHECKPOINT_DB else None
@@ -0,0 +1,305 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from shopping_agent.utils.metrics import DB_ACQUIRE, TX_RETRIES
+from shopping_agent.utils.profiler import SQL_PROFILE, ProfilingConnection
+
+DB_PATH = "ecommerce_test.db"
+
+# Carts and orders can be split by user_id across DB_SHARDS files, so cart and
+# checkout writes from different users stop contending on one write lock. The
+# catalog stays in DB_PATH and is attached to every shard connection.
+DB_SHARDS = int(os.getenv("DB_SHARDS", "0"))
+DB_SHARD_PATH = os.getenv("DB_SHARD_PATH", "ecommerce_shard_{}.db")
+SHARDED_TABLES = ("cart", "cart_items", "orders", "order_items", "product_sales", "sales_windows")
+# Sharded order ids carry their shard: order_id = local_id * ORDER_ID_BASE + shard
+ORDER_ID_BASE = 1000
+if DB_SHARDS >= ORDER_ID_BASE:
+    raise ValueError(f"DB_SHARDS must be below {ORDER_ID_BASE} for order ids to decode, got {DB_SHARDS}")
+
+# With sharding on, hot products can keep their stock in STOCK_SLOTS counter
+# files instead of the products row, so concurrent checkouts of one product
+# write different files; each shard checks out from its own slot (see
+# inventory.take_stock), so the slots default to one per shard. Unsharded,
+# every checkout holds the database's one write lock anyway and slots only
+# add writes, so they stay off. SQLite attaches at most 10 databases per
+# connection, hence the cap.
+STOCK_SLOTS = min(int(os.getenv("STOCK_SLOTS", str(DB_SHARDS))), 8) if DB_SHARDS else 0
+STOCK_SLOT_PATH = os.getenv("STOCK_SLOT_PATH", "stock_slot_{}.db")
+# Plain connections unless SQL_PROFILE is on, so profiling costs nothing when off
+_connection_factory = ProfilingConnection if SQL_PROFILE else sqlite3.Connection
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+_shards_ready = set()
+_slots_ready = False
+# Per-thread connections handed out by get_read_connection
+_readers = threading.local()
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Creates the bookkeeping tables and triggers the tools rely on."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(products);")}
+    if "popularity" not in columns:
+        # All-time units sold, copied from product_sales by sales.refresh_popularity
+        try:
+            conn.execute("ALTER TABLE products ADD COLUMN popularity INTEGER NOT NULL DEFAULT 0;")
+        except sqlite3.OperationalError as e:
+            # Another process added it since the check
+            if "duplicate column" not in str(e):
+                raise
+
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO catalog_meta (id, version) VALUES (1, 0);
+
+        -- Any change to the catalog (including stock) bumps its version.
+        CREATE TRIGGER IF NOT EXISTS catalog_version_insert AFTER INSERT ON products
+        BEGIN UPDATE catalog_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS catalog_version_update AFTER UPDATE ON products
+        BEGIN UPDATE catalog_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS catalog_version_delete AFTER DELETE ON products
+        BEGIN UPDATE catalog_meta SET version = version + 1 WHERE id = 1; END;
+
+        -- Changes to everything but stock, which catalog snapshots copy (stock
+        -- is always read live), so checkouts never make a snapshot stale.
+        CREATE TABLE IF NOT EXISTS listing_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO listing_meta (id, version) VALUES (1, 0);
+        CREATE TRIGGER IF NOT EXISTS listing_version_insert AFTER INSERT ON products
+        BEGIN UPDATE listing_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS listing_version_update
+        AFTER UPDATE OF name, description, price, image_url, popularity ON products
+        BEGIN UPDATE listing_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS listing_version_delete AFTER DELETE ON products
+        BEGIN UPDATE listing_meta SET version = version + 1 WHERE id = 1; END;
+
+        -- Products whose stock is split across the stock slot files.
+        CREATE TABLE IF NOT EXISTS hot_products (
+            product_id INTEGER PRIMARY KEY
+        );
+
+        -- Units and revenue per product and period, kept up to date by checkout.
+        -- period is 'day:YYYY-MM-DD', 'all', or 'week' / 'month': running
+        -- totals of the last 7 / 30 days, rebuilt from the day rows once a day
+        -- (sales.roll_windows). sales_windows records the day they cover up to.
+        CREATE TABLE IF NOT EXISTS product_sales (
+            period TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (period, product_id)
+        );
+        CREATE INDEX IF NOT EXISTS product_sales_rank ON product_sales (period, units DESC, product_id);
+        CREATE TABLE IF NOT EXISTS sales_windows (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rolled_to TEXT NOT NULL
+        );
+
+        -- Products whose name or popularity changed (or that were added or
+        -- removed), for in-memory indexes to catch up from. Only the last
+        -- 10000 changes are kept; a reader that fell further behind reloads.
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS catalog_changes_insert AFTER INSERT ON products
+        BEGIN INSERT INTO catalog_changes (product_id) VALUES (NEW.product_id); END;
+        CREATE TRIGGER IF NOT EXISTS catalog_changes_update AFTER UPDATE OF name, popularity ON products
+        BEGIN INSERT INTO catalog_changes (product_id) VALUES (NEW.product_id); END;
+        CREATE TRIGGER IF NOT EXISTS catalog_changes_delete AFTER DELETE ON products
+        BEGIN INSERT INTO catalog_changes (product_id) VALUES (OLD.product_id); END;
+        CREATE TRIGGER IF NOT EXISTS catalog_changes_prune AFTER INSERT ON catalog_changes
+        BEGIN DELETE FROM catalog_changes WHERE seq <= NEW.seq - 10000; END;
+
+        -- filter_products facets: one index per sort order, each carrying price
+        -- so a price range is checked in the index, plus a partial copy over
+        -- in-stock rows so in_stock filters stay a single range scan.
+        CREATE INDEX IF NOT EXISTS products_price ON products (price);
+        CREATE INDEX IF NOT EXISTS products_name ON products (name COLLATE NOCASE, price);
+        CREATE INDEX IF NOT EXISTS products_popularity ON products (popularity DESC, price);
+        CREATE INDEX IF NOT EXISTS products_in_stock_price ON products (price) WHERE stock > 0;
+        CREATE INDEX IF NOT EXISTS products_in_stock_name ON products (name COLLATE NOCASE, price) WHERE stock > 0;
+        CREATE INDEX IF NOT EXISTS products_in_stock_popularity ON products (popularity DESC, price) WHERE stock > 0;
+        """
+    )
+
+
+def ensure_slot_schema(conn: sqlite3.Connection, slot: int) -> None:
+    """Creates the counter table of one attached stock slot file."""
+    conn.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS slot_{slot}.stock_slots (
+            product_id INTEGER PRIMARY KEY,
+            stock INTEGER NOT NULL CHECK (stock >= 0)
+        );
+        CREATE TABLE IF NOT EXISTS slot_{slot}.slot_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO slot_{slot}.slot_meta (id, version) VALUES (1, 0);
+
+        -- Slot stock is part of the catalog version (see catalog_version).
+        CREATE TRIGGER IF NOT EXISTS slot_{slot}.slot_version_insert AFTER INSERT ON stock_slots
+        BEGIN UPDATE slot_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS slot_{slot}.slot_version_update AFTER UPDATE ON stock_slots
+        BEGIN UPDATE slot_meta SET version = version + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS slot_{slot}.slot_version_delete AFTER DELETE ON stock_slots
+        BEGIN UPDATE slot_meta SET version = version + 1 WHERE id = 1; END;
+        """
+    )
+
+
+def ensure_shard_schema(conn: sqlite3.Connection) -> None:
+    """Creates the sharded tables (and their indexes) as they are defined in the catalog."""
+    rows = conn.execute(
+        f"""
+        SELECT type, name, sql FROM catalog.sqlite_master
+        WHERE tbl_name IN ({", ".join("?" * len(SHARDED_TABLES))}) AND sql IS NOT NULL
+        ORDER BY type = 'index';
+        """,
+        SHARDED_TABLES,
+    ).fetchall()
+    existing = {name for (name,) in conn.execute("SELECT name FROM main.sqlite_master;")}
+    with conn:
+        for kind, name, sql in rows:
+            if name not in existing:
+                conn.execute(sql)
+
+
+def open_connection(path: str, uri: bool = False) -> sqlite3.Connection:
+    """Opens a connection with the configured factory, timing the acquire."""
+    start = time.perf_counter()
+    conn = sqlite3.connect(path, factory=_connection_factory, uri=uri)
+    DB_ACQUIRE.observe(time.perf_counter() - start)
+    return conn
+
+
+def attach(conn: sqlite3.Connection, path: str, name: str, attempts: int = 100) -> None:
+    """ATTACHes a database, retrying while a writer holds it locked.
+
+    ATTACH reads the file's schema and fails at once if another connection is
+    committing to it, without waiting on the busy timeout.
+    """
+    for attempt in range(attempts):
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {name};", (path,))
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts - 1:
+                raise
+            TX_RETRIES.labels(operation="attach").inc()
+            time.sleep(0.005)
+
+
+def shard_for(user_id: int) -> Optional[int]:
+    """Returns the shard holding a user's cart and orders, or None when unsharded."""
+    return user_id % DB_SHARDS if DB_SHARDS else None
+
+
+def encode_order_id(shard: Optional[int], local_id: int) -> int:
+    return local_id if shard is None else local_id * ORDER_ID_BASE + shard
+
+
+def decode_order_id(order_id: int) -> Tuple[Optional[int], int]:
+    """Splits a public order id into (shard, id within the shard)."""
+    if not DB_SHARDS:
+        return None, order_id
+    return order_id % ORDER_ID_BASE, order_id // ORDER_ID_BASE
+
+
+def get_db_connection(user_id: Optional[int] = None):
+    """Returns a new database connection and cursor.
+
+    With a user_id and sharding on, the connection opens that user's shard
+    with the catalog attached, so the same SQL (including joins against
+    products) runs unchanged.
+    """
+    if user_id is not None:
+        return get_shard_connection(shard_for(user_id))
+
+    global _schema_ready
+
+    conn = open_connection(DB_PATH)
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                ensure_schema(conn)
+                _schema_ready = True
+    return conn, conn.cursor()
+
+
+def get_shard_connection(shard: Optional[int]):
+    """Returns a connection and cursor for one shard; the catalog when shard is None."""
+    if shard is None:
+        return get_db_connection()
+
+    if not _schema_ready:
+        get_db_connection()[0].close()
+    conn = open_connection(DB_SHARD_PATH.format(shard))
+    # Unqualified names resolve to main first, then to the attached catalog
+    attach(conn, DB_PATH, "catalog")
+    if shard not in _shards_ready:
+        with _schema_lock:
+            if shard not in _shards_ready:
+                ensure_shard_schema(conn)
+                _shards_ready.add(shard)
+    return conn, conn.cursor()
+
+
+def attach_stock_slots(conn: sqlite3.Connection) -> None:
+    """Attaches the stock slot files as slot_0..slot_<K-1>; call before BEGIN.
+
+    Attaching takes no locks: a transaction only locks the slot files it
+    actually writes.
+    """
+    global _slots_ready
+
+    for slot in range(STOCK_SLOTS):
+        attach(conn, STOCK_SLOT_PATH.format(slot), f"slot_{slot}")
+    if STOCK_SLOTS and not _slots_ready:
+        with _schema_lock:
+            if not _slots_ready:
+                for slot in range(STOCK_SLOTS):
+                    ensure_slot_schema(conn, slot)
+                _slots_ready = True
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """Returns this thread's long-lived catalog connection, stock slots attached.
+
+    For short reads that would otherwise open (and attach) a connection per
+    call. Do not close it or write through it, and read results with
+    fetchall: a statement left unfinished holds its read lock and would keep
+    writers from committing. It is reopened when DB_PATH resolves to another
+    file or the slot count changes.
+    """
+    key = (os.path.abspath(DB_PATH), STOCK_SLOTS)
+    conn = getattr(_readers, "conn", None)
+    if conn is None or _readers.key != key:
+        if conn is not None:
+            conn.close()
+        conn, _ = get_db_connection()
+        attach_stock_slots(conn)
+        _readers.conn, _readers.key = conn, key
+    return conn
+
+
+def catalog_version() -> int:
+    """Returns the current catalog version; it changes whenever products change.
+
+    One query on this thread's read connection, so callers on hot paths (the
+    response cache, the tool memo) do not open and attach a connection each.
+    """
+    versions = ["(SELECT version FROM catalog_meta WHERE id = 1)"]
+    versions += [f"(SELECT version FROM slot_{slot}.slot_meta)" for slot in range(STOCK_SLOTS)]
+    return get_read_connection().execute(f"SELECT {' + '.join(versions)};").fetchall()[0][0]
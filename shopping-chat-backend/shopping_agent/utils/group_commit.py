@@ -0,0 +1,201 @@
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from shopping_agent.utils.db import get_shard_connection
+from shopping_agent.utils.metrics import GROUP_COMMIT_BATCH, TX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: with CART_GROUP_COMMIT set, cart writes from concurrent callers are
+# committed together, paying one fsync per batch instead of one per call.
+CART_GROUP_COMMIT = os.getenv("CART_GROUP_COMMIT", "").lower() in ("1", "true", "yes")
+CART_COMMIT_WINDOW_MS = float(os.getenv("CART_COMMIT_WINDOW_MS", "2"))
+CART_COMMIT_MAX_BATCH = int(os.getenv("CART_COMMIT_MAX_BATCH", "64"))
+CART_COMMIT_RETRIES = int(os.getenv("CART_COMMIT_RETRIES", "5"))
+CART_COMMIT_TIMEOUT = float(os.getenv("CART_COMMIT_TIMEOUT", "10"))
+
+TIMED_OUT = "❌ Updating your cart timed out before it started. Your cart is unchanged; please try again."
+STILL_RUNNING = "⏳ Your cart is still being updated. Check your cart in a moment."
+
+Operation = Callable[[sqlite3.Cursor], str]
+
+
+class GroupCommitter:
+    """Commits operations from many threads in shared transactions.
+
+    A batch is closed ``window_ms`` after its first operation arrives, or
+    as soon as ``max_batch`` operations are queued. Each operation runs
+    under its own savepoint, so one that raises is rolled back alone and
+    only its caller sees the error. A batch that hits "database is locked"
+    is rolled back and replayed as a whole. If the writer thread stops,
+    every queued and later operation fails with the error that stopped it.
+    """
+
+    def __init__(
+        self,
+        shard: Optional[int] = None,
+        window_ms: float = CART_COMMIT_WINDOW_MS,
+        max_batch: int = CART_COMMIT_MAX_BATCH,
+        retries: int = CART_COMMIT_RETRIES,
+        timeout: float = CART_COMMIT_TIMEOUT,
+    ):
+        self.shard = shard
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.retries = retries
+        self.timeout = timeout
+        # Set once the writer thread has stopped; guarded by _lock with the queue puts
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[Operation, Future]]" = queue.Queue()
+        self.stats = {"operations": 0, "batches": 0, "retries": 0}
+        self._thread = threading.Thread(target=self._run, name=f"group-commit-{shard}", daemon=True)
+        self._thread.start()
+
+    def run(self, op: Operation, timeout: Optional[float] = None) -> str:
+        """Queues an operation and blocks until its batch has committed."""
+        future: Future = Future()
+        with self._lock:
+            if self.error is not None:
+                raise self.error
+            self._queue.put((op, future))
+
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            # Only an operation that is not in a batch yet can be withdrawn
+            return TIMED_OUT if future.cancel() else STILL_RUNNING
+
+    def _next_batch(self) -> List[Tuple[Operation, Future]]:
+        batch: List[Tuple[Operation, Future]] = []
+        deadline = None
+        while len(batch) < self.max_batch:
+            if deadline is None:
+                item = self._queue.get()
+            else:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # Skip operations whose callers gave up waiting
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.perf_counter() + self.window_ms / 1000
+        return batch
+
+    def _run(self) -> None:
+        batch: List[Tuple[Operation, Future]] = []
+        conn = None
+        try:
+            conn, cursor = get_shard_connection(self.shard)
+            # Transactions are managed here, not by the sqlite3 module
+            conn.isolation_level = None
+            while True:
+                batch = self._next_batch()
+                try:
+                    results = self._commit(conn, cursor, [op for op, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+
+                for (_, future), (ok, value) in zip(batch, results):
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+        except BaseException as e:
+            logger.exception("group committer for shard %s stopped", self.shard)
+            self._fail_pending(batch, e)
+        finally:
+            # Closing rolls back a batch cut short, releasing its write lock
+            if conn is not None:
+                conn.close()
+
+    def _fail_pending(self, batch: List[Tuple[Operation, Future]], error: BaseException) -> None:
+        """Fails the batch in hand and everything queued, and refuses new operations."""
+        with self._lock:
+            self.error = error
+        futures = [future for _, future in batch]
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            futures.append(future)
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _commit(self, conn: sqlite3.Connection, cursor: sqlite3.Cursor, ops: List[Operation]) -> list:
+        # Cart operations read before they write, and a deferred transaction
+        # that has read fails at once on the upgrade when another writer holds
+        # the lock, with no busy wait; so unsharded the batch takes the lock up
+        # front. Sharded, BEGIN IMMEDIATE would also lock the attached catalog.
+        begin = "BEGIN;" if self.shard is not None else "BEGIN IMMEDIATE;"
+        for attempt in range(self.retries + 1):
+            results = []
+            try:
+                conn.execute(begin)
+                for op in ops:
+                    conn.execute("SAVEPOINT op;")
+                    try:
+                        results.append((True, op(cursor)))
+                    except sqlite3.OperationalError as e:
+                        if "locked" in str(e):
+                            raise
+                        conn.execute("ROLLBACK TO op;")
+                        results.append((False, e))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO op;")
+                        results.append((False, e))
+                    conn.execute("RELEASE op;")
+                conn.execute("COMMIT;")
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK;")
+                if "locked" not in str(e) or attempt == self.retries:
+                    raise
+                self.stats["retries"] += 1
+                TX_RETRIES.labels(operation="cart").inc()
+                time.sleep(random.uniform(0.001, 0.005) * (attempt + 1))
+                continue
+
+            self.stats["operations"] += len(ops)
+            self.stats["batches"] += 1
+            GROUP_COMMIT_BATCH.observe(len(ops))
+            return results
+
+    def metrics(self) -> Dict[str, float]:
+        """Returns operation and commit counts and the average batch size."""
+        return {
+            **self.stats,
+            "avg_batch": self.stats["operations"] / self.stats["batches"] if self.stats["batches"] else 0.0,
+        }
+
+
+_committers: Dict[Optional[int], GroupCommitter] = {}
+_committers_lock = threading.Lock()
+
+
+def cart_committer(shard: Optional[int]) -> GroupCommitter:
+    """Returns the group committer for one shard's cart tables, starting it on first use."""
+    committer = _committers.get(shard)
+    if committer is None or committer.error is not None:
+        with _committers_lock:
+            committer = _committers.get(shard)
+            # A committer whose writer stopped is replaced by a fresh one
+            if committer is None or committer.error is not None:
+                committer = _committers[shard] = GroupCommitter(shard)
+    return committer
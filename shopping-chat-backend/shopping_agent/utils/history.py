@@ -0,0 +1,123 @@
+import json
+import os
+from collections import OrderedDict
+from typing import List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+
+# Token budget for the history sent to the model on each turn.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+# Number of most recent blocks (a message, or an AI tool call with its results)
+# whose tool results are never stubbed. They still count against the budget
+# and are dropped like older blocks once it runs out; only the newest block
+# is always sent.
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+# Older ToolMessages larger than this are replaced by a short stub.
+TOOL_STUB_TOKENS = int(os.getenv("HISTORY_TOOL_STUB_TOKENS", "200"))
+
+# Rough per-message overhead (role, separators) added by the chat format.
+_MESSAGE_OVERHEAD = 4
+_TOKEN_CACHE_SIZE = 10_000
+
+_token_cache: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _estimate_tokens(message: BaseMessage) -> int:
+    """Cheap token estimate (~4 characters per token) for a single message."""
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    chars = len(content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        chars += len(json.dumps(message.tool_calls, default=str))
+    return chars // 4 + _MESSAGE_OVERHEAD
+
+
+def count_tokens(message: BaseMessage) -> int:
+    """Returns the token estimate for a message, cached by message id."""
+    if message.id is None:
+        return _estimate_tokens(message)
+
+    cached = _token_cache.get(message.id)
+    if cached is not None:
+        _token_cache.move_to_end(message.id)
+        return cached
+
+    tokens = _estimate_tokens(message)
+    _token_cache[message.id] = tokens
+    if len(_token_cache) > _TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return tokens
+
+
+def _group_blocks(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups messages so an AI tool call always travels with its ToolMessages."""
+    blocks: List[List[BaseMessage]] = []
+    pending_ids: set = set()
+
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.tool_call_id in pending_ids:
+            blocks[-1].append(message)
+            pending_ids.discard(message.tool_call_id)
+            continue
+
+        if isinstance(message, ToolMessage):
+            # Orphaned result whose tool call is gone: never send it alone.
+            continue
+
+        blocks.append([message])
+        pending_ids = (
+            {call["id"] for call in message.tool_calls}
+            if isinstance(message, AIMessage)
+            else set()
+        )
+
+    return blocks
+
+
+def _stub_tool_message(message: ToolMessage) -> ToolMessage:
+    tokens = count_tokens(message)
+    return message.model_copy(
+        update={
+            "content": f"[{message.name} result omitted from history (~{tokens} tokens)]",
+            "id": f"{message.id}:stub" if message.id else None,
+        }
+    )
+
+
+def trim_history(
+    messages: Sequence[BaseMessage],
+    max_tokens: int = HISTORY_TOKEN_BUDGET,
+    keep_recent: int = HISTORY_KEEP_RECENT,
+) -> List[BaseMessage]:
+    """Returns the part of the conversation that fits in the token budget.
+
+    System messages and the newest block are always kept. Bulky tool results
+    older than the ``keep_recent`` newest blocks are stubbed, and blocks,
+    recent ones included, are dropped oldest first once the budget is
+    exhausted. A tool call is never separated from its results.
+    """
+    system = [m for m in messages if isinstance(m, SystemMessage)]
+    blocks = _group_blocks([m for m in messages if not isinstance(m, SystemMessage)])
+
+    budget = max_tokens - sum(count_tokens(m) for m in system)
+    kept: List[List[BaseMessage]] = []
+
+    for age, block in enumerate(reversed(blocks)):
+        if age >= keep_recent:
+            block = [
+                _stub_tool_message(m)
+                if isinstance(m, ToolMessage) and count_tokens(m) > TOOL_STUB_TOKENS
+                else m
+                for m in block
+            ]
+
+        cost = sum(count_tokens(m) for m in block)
+        # The newest block is always sent, even if it alone exceeds the budget.
+        if kept and cost > budget:
+            break
+
+        kept.append(block)
+        budget -= cost
+
+    return system + [m for block in reversed(kept) for m in block]
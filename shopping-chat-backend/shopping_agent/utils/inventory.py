@@ -0,0 +1,265 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from shopping_agent.utils import db
+from shopping_agent.utils.metrics import STOCK_CONTENDED
+
+logger = logging.getLogger(__name__)
+
+# Sharded, a checkout whose products row UPDATE finds the catalog's write lock
+# held counts as contended for that product only; a product with
+# HOT_STOCK_PROMOTE_AFTER of them within HOT_STOCK_WINDOW seconds is promoted
+# to slot counters. The window keeps products that merely sell now and then
+# during busy spells from adding up to a promotion.
+HOT_STOCK_PROMOTE_AFTER = int(os.getenv("HOT_STOCK_PROMOTE_AFTER", "20"))
+HOT_STOCK_WINDOW = float(os.getenv("HOT_STOCK_WINDOW", "60"))
+# Promotions made by other processes are picked up within this many seconds.
+HOT_STOCK_REFRESH = float(os.getenv("HOT_STOCK_REFRESH", "5"))
+# A shard moves a hot product's stock from the products row into its own
+# slot this many units at a time, so most checkouts never write the catalog.
+STOCK_RESERVE = int(os.getenv("STOCK_RESERVE", "50"))
+
+_lock = threading.Lock()
+_hot: Set[int] = set()
+_hot_loaded_at = 0.0
+_contended: Dict[int, int] = {}
+_window_started = 0.0
+_promoting: Set[int] = set()
+
+
+def hot_products(refresh: bool = False) -> Set[int]:
+    """Returns the ids of products whose stock lives in the slot files."""
+    global _hot, _hot_loaded_at
+
+    if not db.STOCK_SLOTS:
+        return set()
+    if refresh or time.monotonic() - _hot_loaded_at > HOT_STOCK_REFRESH:
+        conn, cursor = db.get_db_connection()
+        try:
+            cursor.execute("SELECT product_id FROM hot_products;")
+            _hot = {product_id for (product_id,) in cursor.fetchall()}
+            _hot_loaded_at = time.monotonic()
+        finally:
+            conn.close()
+    return _hot
+
+
+def take_stock(cursor: sqlite3.Cursor, product_id: int, quantity: int, shard: Optional[int] = None) -> bool:
+    """Decrements stock inside the caller's transaction; False if there is not enough.
+
+    The cursor's connection must have the slot files attached. Hot products
+    are taken from the shard's own slot (a random one without a shard), see
+    _take_reserved; the others from their products row.
+    """
+    if product_id in hot_products():
+        slot = random.randrange(db.STOCK_SLOTS) if shard is None else shard % db.STOCK_SLOTS
+        return _take_reserved(cursor, product_id, quantity, slot)
+
+    # Unsharded, place_order already holds the database's write lock. Sharded,
+    # this is usually the checkout's first write to the catalog after reading
+    # it, so SQLite fails it at once, without a busy wait, if another writer
+    # holds the catalog's lock; that counts against this product only.
+    try:
+        cursor.execute(
+            "UPDATE products SET stock = stock - ? WHERE product_id = ? AND stock >= ?;",
+            (quantity, product_id, quantity),
+        )
+    except sqlite3.OperationalError:
+        if shard is not None:
+            _record_contention(product_id)
+        raise
+    if cursor.rowcount == 1:
+        return True
+    # Another process may have promoted it since we last looked
+    if product_id in hot_products(refresh=True):
+        return take_stock(cursor, product_id, quantity, shard)
+    return False
+
+
+def _take_reserved(cursor: sqlite3.Cursor, product_id: int, quantity: int, slot: int) -> bool:
+    """Takes a hot product's stock from one slot, topping it up from the products row.
+
+    The top-up moves up to STOCK_RESERVE units. Only top-ups write the
+    catalog; the other checkouts lock just their shard and its slot file.
+    """
+    take = f"UPDATE slot_{slot}.stock_slots SET stock = stock - ? WHERE product_id = ? AND stock >= ?;"
+    cursor.execute(take, (quantity, product_id, quantity))
+    if cursor.rowcount:
+        return True
+
+    cursor.execute("SELECT stock FROM products WHERE product_id = ?;", (product_id,))
+    row = cursor.fetchone()
+    reserve = min(row[0] if row else 0, max(STOCK_RESERVE, quantity))
+    if reserve:
+        cursor.execute(
+            "UPDATE products SET stock = stock - ? WHERE product_id = ? AND stock >= ?;",
+            (reserve, product_id, reserve),
+        )
+    if reserve and cursor.rowcount:
+        cursor.execute(
+            f"""
+            INSERT INTO slot_{slot}.stock_slots (product_id, stock) VALUES (?, ?)
+            ON CONFLICT (product_id) DO UPDATE SET stock = stock + excluded.stock;
+            """,
+            (product_id, reserve),
+        )
+        cursor.execute(take, (quantity, product_id, quantity))
+        if cursor.rowcount:
+            return True
+
+    # What is left is spread over the row and the other shards' slots
+    others = [other for other in range(db.STOCK_SLOTS) if other != slot]
+    return _take_spread(cursor, product_id, quantity, [slot, *others])
+
+
+def _take_spread(cursor: sqlite3.Cursor, product_id: int, quantity: int, slots) -> bool:
+    cursor.execute("SELECT stock FROM products WHERE product_id = ?;", (product_id,))
+    row = cursor.fetchone()
+    sources = [("products", row[0] if row else 0)]
+    for slot in slots:
+        cursor.execute(f"SELECT stock FROM slot_{slot}.stock_slots WHERE product_id = ?;", (product_id,))
+        row = cursor.fetchone()
+        sources.append((f"slot_{slot}.stock_slots", row[0] if row else 0))
+
+    if sum(stock for _, stock in sources) < quantity:
+        return False
+    for table, stock in sources:
+        take = min(stock, quantity)
+        if take:
+            cursor.execute(
+                f"UPDATE {table} SET stock = stock - ? WHERE product_id = ?;", (take, product_id)
+            )
+            quantity -= take
+        if not quantity:
+            break
+    return True
+
+
+def slot_stock(product_ids: Iterable[int]) -> Dict[int, int]:
+    """Returns the stock held in slot files for those of the products that are hot."""
+    hot = [product_id for product_id in dict.fromkeys(product_ids) if product_id in hot_products()]
+    if not hot:
+        return {}
+
+    conn = db.get_read_connection()
+    placeholders = ", ".join("?" * len(hot))
+    totals = dict.fromkeys(hot, 0)
+    for slot in range(db.STOCK_SLOTS):
+        rows = conn.execute(
+            f"SELECT product_id, stock FROM slot_{slot}.stock_slots WHERE product_id IN ({placeholders});",
+            hot,
+        ).fetchall()
+        for product_id, stock in rows:
+            totals[product_id] += stock
+    return totals
+
+
+def stock_with_slots(product_id: int, row_stock: int, needed: int = 0) -> int:
+    """Returns a product's total stock given the stock on its products row.
+
+    If the total is short of ``needed``, the hot list is re-read first: right
+    after another process promotes a product, its products row is near empty.
+    """
+    total = row_stock + slot_stock([product_id]).get(product_id, 0)
+    if total < needed and product_id not in hot_products():
+        hot_products(refresh=True)
+        total = row_stock + slot_stock([product_id]).get(product_id, 0)
+    return total
+
+
+def promote(product_id: int) -> None:
+    """Spreads a product's stock evenly over the slot files."""
+    conn, cursor = db.get_db_connection()
+
+    try:
+        db.attach_stock_slots(conn)
+        conn.execute("BEGIN IMMEDIATE;")
+        cursor.execute("SELECT stock FROM products WHERE product_id = ?;", (product_id,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return
+
+        share = row[0] // db.STOCK_SLOTS
+        for slot in range(db.STOCK_SLOTS):
+            cursor.execute(
+                f"""
+                INSERT INTO slot_{slot}.stock_slots (product_id, stock) VALUES (?, ?)
+                ON CONFLICT (product_id) DO UPDATE SET stock = stock + excluded.stock;
+                """,
+                (product_id, share),
+            )
+        # The remainder stays on the products row and is used as a fallback
+        cursor.execute(
+            "UPDATE products SET stock = stock - ? WHERE product_id = ?;",
+            (share * db.STOCK_SLOTS, product_id),
+        )
+        cursor.execute("INSERT OR IGNORE INTO hot_products (product_id) VALUES (?);", (product_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    hot_products(refresh=True)
+    logger.info("product %s promoted to %d stock slots", product_id, db.STOCK_SLOTS)
+
+
+def demote(product_id: int) -> None:
+    """Folds a hot product's slot stock back into its products row."""
+    conn, cursor = db.get_db_connection()
+
+    try:
+        db.attach_stock_slots(conn)
+        conn.execute("BEGIN IMMEDIATE;")
+        for slot in range(db.STOCK_SLOTS):
+            cursor.execute(
+                f"""
+                UPDATE products SET stock = stock + COALESCE(
+                    (SELECT stock FROM slot_{slot}.stock_slots WHERE product_id = ?), 0
+                ) WHERE product_id = ?;
+                """,
+                (product_id, product_id),
+            )
+            cursor.execute(f"DELETE FROM slot_{slot}.stock_slots WHERE product_id = ?;", (product_id,))
+        cursor.execute("DELETE FROM hot_products WHERE product_id = ?;", (product_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    hot_products(refresh=True)
+
+
+def _record_contention(product_id: int) -> None:
+    global _window_started
+
+    if not db.STOCK_SLOTS:
+        return
+
+    STOCK_CONTENDED.inc()
+    with _lock:
+        if time.monotonic() - _window_started > HOT_STOCK_WINDOW:
+            _contended.clear()
+            _window_started = time.monotonic()
+        _contended[product_id] = _contended.get(product_id, 0) + 1
+        if _contended[product_id] < HOT_STOCK_PROMOTE_AFTER or product_id in _promoting:
+            return
+        _promoting.add(product_id)
+
+    # The caller still holds the write lock, so promote once it has committed
+    threading.Thread(target=_promote_later, args=(product_id,), daemon=True).start()
+
+
+def _promote_later(product_id: int) -> None:
+    try:
+        if product_id not in hot_products(refresh=True):
+            promote(product_id)
+    except sqlite3.Error:
+        logger.exception("promoting product %s to stock slots failed", product_id)
+    finally:
+        with _lock:
+            _promoting.discard(product_id)
+            _contended.pop(product_id, None)
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import ToolNode
+
+from shopping_agent.utils.db import catalog_version
+
+TOOL_MEMO_TTL = float(os.getenv("TOOL_MEMO_TTL", "120"))
+TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "64"))
+TOOL_MEMO_MAX_THREADS = int(os.getenv("TOOL_MEMO_MAX_THREADS", "1024"))
+
+# Read-only tools whose results are reused across calls in a thread; they are
+# keyed by the catalog version so stock changes are never served stale.
+CATALOG_TOOLS = {
+    "list_products",
+    "product_details",
+    "product_details_batch",
+    "search_products",
+    "filter_products",
+    "recommend_products",
+    "top_products",
+}
+# Reads with no version to key on: carts and orders also change from other
+# threads and processes, and weather with time. Only repeats within one batch
+# share a result; nothing is kept for later calls.
+BATCH_ONLY_TOOLS = {"view_cart", "get_order_status", "get_weather"}
+READ_ONLY_TOOLS = CATALOG_TOOLS | BATCH_ONLY_TOOLS
+
+# Write tools and the cached results they invalidate.
+INVALIDATES = {
+    # Cart-based recommendations change with the cart
+    "add_to_cart": {"recommend_products"},
+    "checkout": CATALOG_TOOLS,
+}
+
+
+class MemoizedToolNode:
+    """Wraps a ToolNode so repeated read-only tool calls in a thread run once.
+
+    Catalog reads are reused until the catalog changes or ``ttl`` passes;
+    other reads are only deduplicated within one batch of tool calls.
+    """
+
+    def __init__(
+        self,
+        tool_node: ToolNode,
+        ttl: float = TOOL_MEMO_TTL,
+        max_entries: int = TOOL_MEMO_MAX_ENTRIES,
+        max_threads: int = TOOL_MEMO_MAX_THREADS,
+    ):
+        self.tool_node = tool_node
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, OrderedDict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "deduplicated": 0}
+
+    def _key(self, call: dict, version: int) -> Tuple[str, str, int]:
+        return call["name"], json.dumps(call["args"], sort_keys=True), (version if call["name"] in CATALOG_TOOLS else 0)
+
+    def _thread_cache(self, thread_id: str) -> "OrderedDict":
+        with self._lock:
+            cache = self._threads.pop(thread_id, None) or OrderedDict()
+            self._threads[thread_id] = cache
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+            return cache
+
+    def _lookup(self, cache: "OrderedDict", key: tuple):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl:
+            del cache[key]
+            return None
+        return entry[0]
+
+    def __call__(self, state, config: RunnableConfig):
+        calls = [
+            call
+            for message in state["messages"][-1:]
+            if isinstance(message, AIMessage)
+            for call in message.tool_calls
+        ]
+        thread_id = str((config.get("configurable") or {}).get("thread_id", "default"))
+        cache = self._thread_cache(thread_id)
+
+        writes = {call["name"] for call in calls if call["name"] in INVALIDATES}
+        stale = set().union(*(INVALIDATES[name] for name in writes))
+        for key in [key for key in cache if key[0] in stale]:
+            del cache[key]
+
+        # One read for the whole batch, and none when it has no catalog tool
+        version = catalog_version() if any(call["name"] in CATALOG_TOOLS for call in calls) else 0
+        results: Dict[str, ToolMessage] = {}
+        pending: List[dict] = []
+        pending_keys: Dict[tuple, str] = {}
+        duplicates: Dict[str, str] = {}
+        for call in calls:
+            if call["name"] not in READ_ONLY_TOOLS:
+                pending.append(call)
+                continue
+
+            key = self._key(call, version)
+            cached = self._lookup(cache, key)
+            if cached is not None:
+                results[call["id"]] = cached.model_copy(update={"tool_call_id": call["id"], "id": None})
+                self.stats["deduplicated"] += 1
+            elif key in pending_keys:
+                # Same read issued twice in one batch: run it once.
+                duplicates[call["id"]] = pending_keys[key]
+                self.stats["deduplicated"] += 1
+            else:
+                pending_keys[key] = call["id"]
+                pending.append(call)
+
+        if pending:
+            self.stats["executed"] += len(pending)
+            output = self.tool_node.invoke(pending, config)
+            for message in output["messages"]:
+                results[message.tool_call_id] = message
+
+        # Results read alongside a write in the same batch may predate it.
+        if not writes:
+            now = time.monotonic()
+            for key, call_id in pending_keys.items():
+                message = results.get(call_id)
+                if key[0] in CATALOG_TOOLS and message is not None and message.status == "success":
+                    cache[key] = (message, now)
+                    cache.move_to_end(key)
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+
+        for call_id, source_id in duplicates.items():
+            results[call_id] = results[source_id].model_copy(update={"tool_call_id": call_id, "id": None})
+
+        return {"messages": [results[call["id"]] for call in calls if call["id"] in results]}
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns how many tool executions ran and how many were deduplicated."""
+        return dict(self.stats)
@@ -0,0 +1,125 @@
+import functools
+import os
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from prometheus_client import multiprocess
+
+# Serve /metrics on this port when set. With PROMETHEUS_MULTIPROC_DIR set,
+# every worker writes to that directory and the endpoint aggregates them.
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Nodes and tools run from well under a millisecond (a routed turn, a cached
+# lookup) to tens of seconds (a node waiting on the model)
+_STEP_BUCKETS = _FAST_BUCKETS + (2.0, 4.0, 8.0, 16.0, 32.0)
+_LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+_QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+NODE_LATENCY = Histogram(
+    "shopping_node_duration_seconds", "Graph node execution time.", ["node"], buckets=_STEP_BUCKETS
+)
+TOOL_LATENCY = Histogram(
+    "shopping_tool_duration_seconds", "Tool execution time.", ["tool", "status"], buckets=_STEP_BUCKETS
+)
+LLM_LATENCY = Histogram(
+    "shopping_llm_duration_seconds", "Chat model call latency.", ["model"], buckets=_LLM_BUCKETS
+)
+LLM_TOKENS = Counter("shopping_llm_tokens", "Chat model tokens.", ["model", "kind"])
+LLM_COST = Counter("shopping_llm_cost_dollars", "Estimated chat model spend at list prices.", ["tier", "model"])
+LLM_ESCALATIONS = Counter(
+    "shopping_llm_escalations", "Small-model answers redone by the large model.", ["reason"]
+)
+DB_ACQUIRE = Histogram(
+    "shopping_db_acquire_seconds", "Time to open a database connection.", buckets=_FAST_BUCKETS
+)
+TX_RETRIES = Counter("shopping_db_transaction_retries", "Database transactions retried.", ["operation"])
+STOCK_CONTENDED = Counter(
+    "shopping_stock_contended", "Stock decrements that waited on or failed to get the write lock."
+)
+CHECKOUT_QUEUE_DEPTH = Gauge(
+    "shopping_checkout_queue_depth", "Checkouts waiting for the order writer.", multiprocess_mode="livesum"
+)
+CHECKOUT_QUEUE_WAIT = Histogram(
+    "shopping_checkout_queue_wait_seconds", "Time a checkout waited in the admission queue.", buckets=_QUEUE_BUCKETS
+)
+CHECKOUT_REJECTED = Counter("shopping_checkout_rejected", "Checkouts rejected by a full admission queue.")
+GROUP_COMMIT_BATCH = Histogram(
+    "shopping_group_commit_batch_size",
+    "Cart writes committed per transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """Wraps a graph node so its run time lands in NODE_LATENCY."""
+    histogram = NODE_LATENCY.labels(node=name)
+
+    if isinstance(node, Runnable):
+        # e.g. a ToolNode: keep it a runnable so it still receives the config
+        def run(state, config: RunnableConfig):
+            start = time.perf_counter()
+            try:
+                return node.invoke(state, config)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return run
+
+    @functools.wraps(node)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return node(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def timed_tool(func: Callable) -> Callable:
+    """Records TOOL_LATENCY for a tool function; apply it under @tool."""
+    ok = TOOL_LATENCY.labels(tool=func.__name__, status="ok")
+    error = TOOL_LATENCY.labels(tool=func.__name__, status="error")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        histogram = error
+        try:
+            result = func(*args, **kwargs)
+            # Tools report failures as "❌ ..." strings rather than raising
+            if not (isinstance(result, str) and result.startswith("❌")):
+                histogram = ok
+            return result
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def observe_llm_call(model: str, elapsed: float, response: Any) -> None:
+    """Records latency and token usage of one chat model call."""
+    LLM_LATENCY.labels(model=model).observe(elapsed)
+    usage: Optional[dict] = getattr(response, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.labels(model=model, kind="input").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels(model=model, kind="output").inc(usage.get("output_tokens", 0))
+
+
+def start_metrics_server(port: Optional[str] = METRICS_PORT) -> None:
+    """Starts the scrape endpoint if METRICS_PORT is configured."""
+    if not port:
+        return
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        try:
+            start_http_server(int(port), registry=registry)
+        except OSError:
+            # Another worker already serves the aggregated registry
+            pass
+    else:
+        start_http_server(int(port))
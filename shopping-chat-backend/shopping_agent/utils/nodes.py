@@ -0,0 +1,33 @@
+import uuid
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.messages import AIMessage
+from langgraph.graph.ui import AnyUIMessage, push_ui_message
+
+from shopping_agent.utils.state import supersede_ui
+from shopping_agent.utils.tools import LIST_PRODUCTS_INLINE_LIMIT, PRODUCT_CHUNK_SIZE
+
+
+def push_products_ui(
+    message: AIMessage, products: List[Dict[str, Any]], ui: Sequence[AnyUIMessage] = ()
+) -> None:
+    """Shows the catalog in the list_products component without keeping it in state.
+
+    ``products`` is what the list_products tool returned. Only its first page
+    goes into the UI message, with ``cursor`` set to the last product id on
+    that page while more follow; the client fetches later pages from the
+    cursor through GET /products (see webapp.py), so a reloaded thread can
+    page through the whole catalog too. State and checkpoints therefore hold
+    one page per list, however big the catalog is.
+    """
+    supersede_ui(ui, "list_products")
+    first, rest = products[:PRODUCT_CHUNK_SIZE], products[PRODUCT_CHUNK_SIZE:]
+    more = bool(rest) or len(products) >= LIST_PRODUCTS_INLINE_LIMIT
+
+    push_ui_message(
+        "list_products",
+        props={"products": first, "cursor": first[-1]["product_id"] if more else None},
+        id=str(uuid.uuid4()),
+        metadata={"message_id": message.id},
+        message=message,
+    )
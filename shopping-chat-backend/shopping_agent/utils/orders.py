@@ -0,0 +1,130 @@
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, Optional
+
+from shopping_agent.utils.metrics import (
+    CHECKOUT_QUEUE_DEPTH,
+    CHECKOUT_QUEUE_WAIT,
+    CHECKOUT_REJECTED,
+    TX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: with CHECKOUT_PIPELINE set, checkouts are placed one at a time by a
+# single writer thread instead of racing each other for the write lock.
+CHECKOUT_PIPELINE = os.getenv("CHECKOUT_PIPELINE", "").lower() in ("1", "true", "yes")
+CHECKOUT_QUEUE_SIZE = int(os.getenv("CHECKOUT_QUEUE_SIZE", "256"))
+CHECKOUT_TIMEOUT = float(os.getenv("CHECKOUT_TIMEOUT", "10"))
+# Other writers (cart updates, other processes) can still hold the lock, so
+# the writer retries an order that hit "database is locked".
+CHECKOUT_RETRIES = int(os.getenv("CHECKOUT_RETRIES", "5"))
+
+QUEUE_FULL = "❌ We're handling a lot of orders right now. Please try again in a moment."
+TIMED_OUT = "❌ Checkout timed out before it started. Your cart is unchanged; please try again."
+STILL_RUNNING = "⏳ Your order is still being placed. Check your order status in a moment."
+
+
+class OrderPipeline:
+    """Bounded FIFO admission queue in front of one order-writing thread.
+
+    Callers block on a future for their own result. When the queue is full a
+    checkout is rejected at once instead of piling onto the database.
+    ``place_order`` runs one order transaction and raises sqlite3.Error on
+    failure.
+    """
+
+    def __init__(
+        self,
+        place_order: Callable[[int], str],
+        maxsize: int = CHECKOUT_QUEUE_SIZE,
+        timeout: float = CHECKOUT_TIMEOUT,
+        retries: int = CHECKOUT_RETRIES,
+    ):
+        self.place_order = place_order
+        self.timeout = timeout
+        self.retries = retries
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"placed": 0, "rejected": 0, "timed_out": 0, "failed": 0, "wait_ms": 0.0}
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, user_id: int) -> Future:
+        """Queues a checkout; raises queue.Full when admission is closed."""
+        self._ensure_worker()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((user_id, future, time.perf_counter()))
+        except queue.Full:
+            self.stats["rejected"] += 1
+            CHECKOUT_REJECTED.inc()
+            raise
+        CHECKOUT_QUEUE_DEPTH.set(self._queue.qsize())
+        return future
+
+    def checkout(self, user_id: int, timeout: Optional[float] = None) -> str:
+        """Places the order through the queue and returns the tool's message."""
+        try:
+            future = self.submit(user_id)
+        except queue.Full:
+            return QUEUE_FULL
+
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            self.stats["timed_out"] += 1
+            # Only a checkout that has not started can be withdrawn
+            return TIMED_OUT if future.cancel() else STILL_RUNNING
+        except sqlite3.Error as e:
+            return f"❌ An error occurred: {e}"
+
+    def _run(self) -> None:
+        while True:
+            user_id, future, queued_at = self._queue.get()
+            CHECKOUT_QUEUE_DEPTH.set(self._queue.qsize())
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            waited = time.perf_counter() - queued_at
+            CHECKOUT_QUEUE_WAIT.observe(waited)
+            self.stats["wait_ms"] += waited * 1000
+            try:
+                future.set_result(self._place(user_id))
+                self.stats["placed"] += 1
+            except Exception as e:
+                if not isinstance(e, sqlite3.Error):
+                    logger.exception("checkout for user %s failed", user_id)
+                self.stats["failed"] += 1
+                future.set_exception(e)
+
+    def _place(self, user_id: int) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return self.place_order(user_id)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == self.retries:
+                    raise
+                TX_RETRIES.labels(operation="checkout").inc()
+                time.sleep(random.uniform(0.001, 0.005) * (attempt + 1))
+
+    def metrics(self) -> Dict[str, float]:
+        """Returns queue depth, outcome counts and the average queue wait."""
+        started = self.stats["placed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "depth": self._queue.qsize(),
+            "avg_wait_ms": self.stats["wait_ms"] / started if started else 0.0,
+        }
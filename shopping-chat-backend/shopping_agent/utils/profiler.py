@@ -0,0 +1,160 @@
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: connections are only wrapped when SQL_PROFILE is set.
+SQL_PROFILE = os.getenv("SQL_PROFILE", "").lower() in ("1", "true", "yes")
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "50"))
+SQL_REPORT_TOP = int(os.getenv("SQL_REPORT_TOP", "10"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalizes a statement so executions that differ only in literals aggregate together."""
+    sql = _LITERALS.sub("?", sql)
+    sql = _IN_LIST.sub("(?+)", sql)
+    return _SPACES.sub(" ", sql).strip().rstrip(";")
+
+
+class QueryProfiler:
+    """Aggregates statement timings by fingerprint and logs slow statements."""
+
+    def __init__(self, slow_ms: float = SQL_SLOW_MS):
+        self.slow_ms = slow_ms
+        self._stats: Dict[str, List[float]] = {}
+        self._plans: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn: sqlite3.Connection, sql: str, params, elapsed_ms: float) -> None:
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed_ms
+            stats[2] = max(stats[2], elapsed_ms)
+
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(
+                "slow query (%.1f ms): %s\n%s", elapsed_ms, key, self._plan(conn, key, sql, params)
+            )
+
+    def add_fetch_time(self, sql: str, elapsed_ms: float) -> None:
+        key = fingerprint(sql)
+        with self._lock:
+            if key in self._stats:
+                self._stats[key][1] += elapsed_ms
+
+    def _plan(self, conn: sqlite3.Connection, key: str, sql: str, params) -> str:
+        if key in self._plans:
+            return self._plans[key]
+        plan = ""
+        if sql.lstrip().lower().startswith(_EXPLAINABLE):
+            try:
+                # A plain cursor, so the EXPLAIN itself is not profiled
+                rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+                plan = "\n".join(f"  {row[-1]}" for row in rows)
+            except sqlite3.Error as e:
+                plan = f"  (no plan: {e})"
+        self._plans[key] = plan
+        return plan
+
+    def top(self, n: int = SQL_REPORT_TOP, by: str = "total") -> List[dict]:
+        """Returns the n heaviest fingerprints by total, max or count."""
+        with self._lock:
+            rows = [
+                {"sql": key, "count": s[0], "total_ms": s[1], "avg_ms": s[1] / s[0], "max_ms": s[2]}
+                for key, s in self._stats.items()
+            ]
+        sort_key = {"total": "total_ms", "max": "max_ms", "count": "count"}[by]
+        return sorted(rows, key=lambda r: r[sort_key], reverse=True)[:n]
+
+    def report(self, n: int = SQL_REPORT_TOP) -> str:
+        lines = [f"{'count':>7} {'total ms':>10} {'avg ms':>8} {'max ms':>8}  statement"]
+        for row in self.top(n):
+            lines.append(
+                f"{row['count']:>7} {row['total_ms']:>10.2f} {row['avg_ms']:>8.3f} {row['max_ms']:>8.2f}  {row['sql'][:120]}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+
+
+sql_profiler = QueryProfiler()
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times every statement, including the fetches that follow it."""
+
+    _last_sql: Optional[str] = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._last_sql = sql
+            sql_profiler.record(self.connection, sql, parameters, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._last_sql = None
+            sql_profiler.record(self.connection, sql, None, (time.perf_counter() - start) * 1000)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._last_sql is not None:
+                sql_profiler.add_fetch_time(self._last_sql, (time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are profiled."""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute bypasses cursor(), so route it explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _dump_report() -> None:
+    if sql_profiler.top(1):
+        logger.info("SQL profile (top %d by total time):\n%s", SQL_REPORT_TOP, sql_profiler.report())
+
+
+if SQL_PROFILE:
+    atexit.register(_dump_report)
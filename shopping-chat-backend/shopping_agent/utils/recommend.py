@@ -0,0 +1,351 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from shopping_agent.utils import db
+
+logger = logging.getLogger(__name__)
+
+# Related products kept per product for constant-time lookups.
+RECOMMEND_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "20"))
+# Optional: load the matrix saved at this path instead of building it from
+# order_items at startup (python -m shopping_agent.utils.recommend writes it).
+RECOMMEND_MATRIX = os.getenv("RECOMMEND_MATRIX")
+# Orders placed by any worker are merged in at most this many seconds after they commit.
+RECOMMEND_REFRESH = float(os.getenv("RECOMMEND_REFRESH", "1"))
+# Incremental pair updates held outside the CSR arrays before they are folded in.
+RECOMMEND_COMPACT_AFTER = int(os.getenv("RECOMMEND_COMPACT_AFTER", "50000"))
+# Bounds the temporary pair arrays while building: 4M pairs is about 100 MB.
+BUILD_CHUNK_PAIRS = 4_000_000
+FETCH_CHUNK_ROWS = 100_000
+
+
+def _merge_counts(keys: np.ndarray, counts: np.ndarray):
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+class CoOccurrence:
+    """How often two products were bought in the same order.
+
+    Counts are a symmetric sparse matrix in CSR form: row p's columns are
+    ``indices[indptr[p]:indptr[p + 1]]`` with their counts alongside, int32
+    throughout, so a million distinct pairs take about 8 MB. ``top`` holds
+    each product's RECOMMEND_TOP_K most co-bought products, best first and
+    padded with -1, so a single-product lookup is one row read.
+
+    Orders placed after the build are added with add_order: their pairs go
+    to a small delta that is merged into each affected product's top row at
+    once, and folded into the CSR arrays every RECOMMEND_COMPACT_AFTER pairs.
+    ``last_items`` holds, per shard, the highest order_item_id counted.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray, top_k: int = RECOMMEND_TOP_K):
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.top_k = top_k
+        self.top = self._top_table()
+        self._delta: Dict[int, Dict[int, int]] = {}
+        self._delta_pairs = 0
+        self._lock = threading.Lock()
+        self.last_items: List[int] = []
+        self.stats = {"orders_added": 0, "compactions": 0}
+
+    @property
+    def n_products(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_orders(cls, order_ids: np.ndarray, product_ids: np.ndarray, top_k: int = RECOMMEND_TOP_K) -> "CoOccurrence":
+        """Builds the matrix from parallel arrays of order_items rows."""
+        order_ids = np.asarray(order_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids, dtype=np.int32)
+        n = int(product_ids.max()) + 1 if len(product_ids) else 0
+
+        order = np.lexsort((product_ids, order_ids))
+        orders, products = order_ids[order], product_ids[order]
+        # The same product on two lines of one order counts once
+        keep = np.ones(len(orders), dtype=bool)
+        keep[1:] = (orders[1:] != orders[:-1]) | (products[1:] != products[:-1])
+        orders, products = orders[keep], products[keep]
+
+        starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]]) if len(orders) else np.empty(0, np.int64)
+        sizes = np.diff(np.r_[starts, len(orders)])
+        multi = sizes > 1
+        starts, sizes = starts[multi], sizes[multi]
+
+        # Each order expands to sizes**2 candidate pairs; build them in chunks of orders
+        ends = np.cumsum(sizes.astype(np.int64) ** 2)
+        keys, counts = np.empty(0, np.int64), np.empty(0, np.int64)
+        lo = 0
+        while lo < len(sizes):
+            done = ends[lo - 1] if lo else 0
+            hi = max(lo + 1, int(np.searchsorted(ends, done + BUILD_CHUNK_PAIRS, side="right")))
+            chunk_keys, chunk_counts = np.unique(_upper_pairs(products, starts[lo:hi], sizes[lo:hi], n), return_counts=True)
+            keys, counts = _merge_counts(np.r_[keys, chunk_keys], np.r_[counts, chunk_counts])
+            lo = hi
+
+        left, right = np.divmod(keys, n) if n else (keys, keys)
+        return cls(*_to_csr(np.r_[left, right], np.r_[right, left], np.r_[counts, counts], n), top_k=top_k)
+
+    def _top_table(self) -> np.ndarray:
+        rows = np.repeat(np.arange(self.n_products, dtype=np.int32), np.diff(self.indptr))
+        # Highest count first; ties go to the lower product id
+        order = np.lexsort((self.indices, -self.counts.astype(np.int64), rows))
+        rank = np.arange(len(order)) - self.indptr[rows[order]]
+        keep = rank < self.top_k
+        top = np.full((self.n_products, self.top_k), -1, dtype=np.int32)
+        top[rows[order][keep], rank[keep]] = self.indices[order][keep]
+        return top
+
+    def _scores(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Sums the given products' rows into one dense vector over all products."""
+        scores = np.zeros(len(self.top), dtype=np.int64)
+        for product_id in product_ids:
+            if product_id < self.n_products:
+                start, end = self.indptr[product_id], self.indptr[product_id + 1]
+                # Column ids within a row are unique, so this adds every count
+                scores[self.indices[start:end]] += self.counts[start:end]
+            for other, count in self._delta.get(product_id, {}).items():
+                scores[other] += count
+        return scores
+
+    def _best(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            # argpartition cuts ties at the boundary arbitrarily; widen to all tied products
+            candidates = np.flatnonzero(scores >= scores[candidates].min())
+        # Highest count first; ties go to the lower product id
+        return candidates[np.lexsort((candidates, -scores[candidates]))][:limit]
+
+    def related(self, product_id: int, limit: int = 5) -> List[int]:
+        """Returns the products most often bought with product_id, best first."""
+        if not 0 <= product_id < len(self.top):
+            return []
+        row = self.top[product_id]
+        return row[row >= 0][:limit].tolist()
+
+    def for_basket(self, product_ids: Iterable[int], limit: int = 5) -> List[int]:
+        """Returns the products most often bought with any of product_ids, excluding them."""
+        product_ids = list(dict.fromkeys(product_ids))
+        if len(product_ids) == 1:
+            return self.related(product_ids[0], limit)
+
+        with self._lock:
+            scores = self._scores(product_ids)
+        scores[[p for p in product_ids if 0 <= p < len(scores)]] = 0
+        return self._best(scores, limit).tolist()
+
+    def add_order(self, product_ids: Iterable[int]) -> None:
+        """Counts one newly placed order."""
+        product_ids = sorted(set(product_ids))
+        if len(product_ids) < 2:
+            return
+
+        with self._lock:
+            if product_ids[-1] >= len(self.top):
+                grow = product_ids[-1] + 1 - len(self.top)
+                self.top = np.vstack([self.top, np.full((grow, self.top_k), -1, dtype=np.int32)])
+            for a in product_ids:
+                row = self._delta.setdefault(a, {})
+                for b in product_ids:
+                    if a != b:
+                        row[b] = row.get(b, 0) + 1
+                        self._delta_pairs += 1
+
+            for product_id in product_ids:
+                best = self._best(self._scores([product_id]), self.top_k)
+                self.top[product_id] = np.r_[best, np.full(self.top_k - len(best), -1, dtype=np.int32)]
+
+            self.stats["orders_added"] += 1
+            if self._delta_pairs >= RECOMMEND_COMPACT_AFTER:
+                self._compact()
+
+    def _compact(self) -> None:
+        rows = np.repeat(np.arange(self.n_products, dtype=np.int32), np.diff(self.indptr))
+        delta = [(a, b, count) for a, row in self._delta.items() for b, count in row.items()]
+        extra = np.array(delta, dtype=np.int64).reshape(-1, 3)
+        n = max(self.n_products, len(self.top))
+        self.indptr, self.indices, self.counts = _to_csr(
+            np.r_[rows, extra[:, 0]], np.r_[self.indices, extra[:, 1]], np.r_[self.counts, extra[:, 2]], n
+        )
+        self._delta, self._delta_pairs = {}, 0
+        self.stats["compactions"] += 1
+
+    def save(self, path: str) -> None:
+        """Writes the matrix to an .npz file; pending increments are folded in first."""
+        with self._lock:
+            if self._delta:
+                self._compact()
+            np.savez(
+                path,
+                indptr=self.indptr,
+                indices=self.indices,
+                counts=self.counts,
+                last_items=np.array(self.last_items, dtype=np.int64),
+            )
+
+    @classmethod
+    def load(cls, path: str, top_k: int = RECOMMEND_TOP_K) -> "CoOccurrence":
+        with np.load(path) as data:
+            matrix = cls(data["indptr"], data["indices"], data["counts"], top_k=top_k)
+            if "last_items" in data:
+                matrix.last_items = data["last_items"].tolist()
+        return matrix
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns matrix size, memory footprint and incremental update counts."""
+        return {
+            **self.stats,
+            "products": len(self.top),
+            "pairs": len(self.indices),
+            "pending_pairs": self._delta_pairs,
+            "bytes": self.indptr.nbytes + self.indices.nbytes + self.counts.nbytes + self.top.nbytes,
+        }
+
+
+def _upper_pairs(products: np.ndarray, starts: np.ndarray, sizes: np.ndarray, n: int) -> np.ndarray:
+    """Encodes every (a, b) with a < b bought together in the given orders as a * n + b."""
+    squares = sizes.astype(np.int64) ** 2
+    group = np.repeat(np.arange(len(sizes)), squares)
+    offset = np.arange(squares.sum()) - np.repeat(np.cumsum(squares) - squares, squares)
+    size = sizes[group]
+    left = products[starts[group] + offset // size].astype(np.int64)
+    right = products[starts[group] + offset % size].astype(np.int64)
+    # Products are sorted within an order, so this keeps each pair once
+    upper = left < right
+    return left[upper] * n + right[upper]
+
+
+def _to_csr(rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, n: int):
+    keys, counts = _merge_counts(rows.astype(np.int64) * max(n, 1) + cols, counts)
+    rows, cols = np.divmod(keys, max(n, 1))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols.astype(np.int32), counts.astype(np.int32)
+
+
+def _shards() -> List[Optional[int]]:
+    return list(range(db.DB_SHARDS)) if db.DB_SHARDS else [None]
+
+
+def last_order_items() -> List[int]:
+    """Returns each shard's highest order_item_id.
+
+    Orders commit one at a time per file and ids only grow, so every order
+    with items up to this id is already complete.
+    """
+    last = []
+    for shard in _shards():
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            cursor.execute("SELECT COALESCE(MAX(order_item_id), 0) FROM order_items;")
+            last.append(cursor.fetchone()[0])
+        finally:
+            conn.close()
+    return last
+
+
+def load_order_items(last_items: List[int]):
+    """Reads (order, product) pairs from every shard's order_items, up to last_items."""
+    order_ids, product_ids = [], []
+    for shard, last in zip(_shards(), last_items):
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            cursor.execute("SELECT order_id, product_id FROM order_items WHERE order_item_id <= ?;", (last,))
+            while rows := cursor.fetchmany(FETCH_CHUNK_ROWS):
+                chunk = np.array(rows, dtype=np.int64).reshape(-1, 2)
+                # Local order ids repeat across shards; the global id does not
+                order_ids.append(chunk[:, 0] * db.ORDER_ID_BASE + shard if shard is not None else chunk[:, 0])
+                product_ids.append(chunk[:, 1])
+        finally:
+            conn.close()
+
+    if not order_ids:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(order_ids), np.concatenate(product_ids)
+
+
+def build() -> CoOccurrence:
+    """Builds the matrix from every order placed so far."""
+    last = last_order_items()
+    matrix = CoOccurrence.from_orders(*load_order_items(last))
+    matrix.last_items = last
+    return matrix
+
+
+_recommender: Optional[CoOccurrence] = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def _load() -> None:
+    global _recommender
+
+    if RECOMMEND_MATRIX and os.path.exists(RECOMMEND_MATRIX):
+        matrix = CoOccurrence.load(RECOMMEND_MATRIX)
+        if len(matrix.last_items) != len(_shards()):
+            # Saved without its position, or for another shard layout: count from now on
+            logger.warning("%s does not say which orders it counts; merging only new ones", RECOMMEND_MATRIX)
+            matrix.last_items = last_order_items()
+    else:
+        matrix = build()
+    _recommender = matrix
+    # Orders placed since the file was saved or while the matrix was built
+    _catch_up()
+    logger.info("co-occurrence matrix ready: %s", _recommender.metrics())
+
+
+def _catch_up() -> None:
+    """Adds the orders every worker placed since the last check."""
+    global _checked_at
+
+    for position, shard in enumerate(_shards()):
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            # A range of the rowid, so this reads only the new rows
+            cursor.execute(
+                "SELECT order_item_id, order_id, product_id FROM order_items WHERE order_item_id > ? ORDER BY order_item_id;",
+                (_recommender.last_items[position],),
+            )
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        orders: Dict[int, List[int]] = {}
+        for _, order_id, product_id in rows:
+            orders.setdefault(order_id, []).append(product_id)
+        for product_ids in orders.values():
+            _recommender.add_order(product_ids)
+        if rows:
+            _recommender.last_items[position] = rows[-1][0]
+    _checked_at = time.monotonic()
+
+
+def get_recommender() -> CoOccurrence:
+    """Returns the process's co-occurrence matrix, loading it or catching up with new orders."""
+    if _recommender is None or time.monotonic() - _checked_at > RECOMMEND_REFRESH:
+        # Whoever holds the lock refreshes; everyone else answers from the current matrix
+        if _build_lock.acquire(blocking=_recommender is None):
+            try:
+                if _recommender is None:
+                    _load()
+                elif time.monotonic() - _checked_at > RECOMMEND_REFRESH:
+                    _catch_up()
+            finally:
+                _build_lock.release()
+    return _recommender
+
+
+if __name__ == "__main__":
+    # python -m shopping_agent.utils.recommend rebuilds the saved matrix
+    logging.basicConfig(level=logging.INFO)
+    path = RECOMMEND_MATRIX or "recommend_matrix.npz"
+    build().save(path)
+    logger.info("saved co-occurrence matrix to %s", path)
@@ -0,0 +1,225 @@
+import logging
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END
+
+logger = logging.getLogger(__name__)
+
+# Name stamped on the AIMessages the router emits, so the chatbot node can
+# recognise routed turns and answer them from a template.
+ROUTER_NAME = "router"
+
+_POLITE = re.compile(r"^(please|pls|can you|could you)\s+|\s+(please|pls|now)$")
+_PUNCT = re.compile(r"[^\w\s#]")
+
+ArgsBuilder = Callable[[re.Match, Optional[int]], Optional[Dict[str, Any]]]
+
+
+def _no_args(match: re.Match, user_id: Optional[int]) -> Dict[str, Any]:
+    return {}
+
+
+def _user_args(match: re.Match, user_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    # Cart tools are only routed when the caller supplied the user id.
+    return None if user_id is None else {"user_id": user_id}
+
+
+def _product_args(match: re.Match, user_id: Optional[int]) -> Dict[str, Any]:
+    return {"product_id": int(match.group("id"))}
+
+
+# High-precision rules: each pattern must match the whole normalized message.
+_RULES: List[Tuple[re.Pattern, str, ArgsBuilder]] = [
+    (
+        re.compile(r"(show|list|view|see|browse)( me)?( all)?( the| your)? products"),
+        "list_products",
+        _no_args,
+    ),
+    (re.compile(r"what (products )?do you (sell|have)"), "list_products", _no_args),
+    (
+        re.compile(
+            r"((show|view|get)( me)? )?(details (for|of) )?product #?(?P<id>\d+)( details)?"
+        ),
+        "product_details",
+        _product_args,
+    ),
+    (
+        re.compile(r"(view|show|see|open)( me)?( my| the)? (shopping )?cart|whats in my cart"),
+        "view_cart",
+        _user_args,
+    ),
+    (
+        re.compile(r"((continue|proceed|go) to )?check ?out( my( shopping)? cart)?"),
+        "checkout",
+        _user_args,
+    ),
+]
+
+# Tools with side effects the user must confirm first: the call is replaced by
+# this prompt, and only a confirming reply to it runs the tool.
+_CONFIRM: Dict[str, str] = {
+    "checkout": 'Ready to place your order? Reply "yes" to check out your cart.',
+}
+_CONFIRMATION = re.compile(
+    r"(yes|yeah|yep|y|ok|okay|sure|confirm|confirmed|go ahead|do it|place( the| my)? order)"
+    r"( (please|confirm|go ahead|place( the| my)? order))?"
+)
+
+# Templates for routed tool results that have no UI component of their own.
+_TEMPLATES: Dict[str, Callable[[str], str]] = {
+    "product_details": lambda content: f"Here are the product details: {content}",
+    "checkout": lambda content: content,
+}
+
+_stats = {"turns": 0, "routed": 0, "saved_ms": 0.0}
+# Moving average of a tool-selecting LLM call, used to estimate time saved.
+_llm_latency_ms = 0.0
+
+
+def normalize(text: str) -> str:
+    """Lowercases the message and strips punctuation and polite filler."""
+    text = _PUNCT.sub("", text.lower()).strip()
+    text = re.sub(r"\s+", " ", text)
+    return _POLITE.sub("", text).strip()
+
+
+def classify(text: str, user_id: Optional[int] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Returns (tool_name, args) for an unambiguous command, otherwise None."""
+    normalized = normalize(text)
+    for pattern, tool_name, build_args in _RULES:
+        match = pattern.fullmatch(normalized)
+        if match:
+            args = build_args(match, user_id)
+            return None if args is None else (tool_name, args)
+    return None
+
+
+def pending_confirmation(messages) -> Optional[str]:
+    """Returns the tool the user is confirming with their latest message, if any."""
+    last_human = next(
+        (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)),
+        None,
+    )
+    if last_human is None or last_human == 0 or not isinstance(messages[last_human].content, str):
+        return None
+    prompt = messages[last_human - 1]
+    if not isinstance(prompt, AIMessage) or prompt.response_metadata.get("confirm") not in _CONFIRM:
+        return None
+    if not _CONFIRMATION.fullmatch(normalize(messages[last_human].content)):
+        return None
+    return prompt.response_metadata["confirm"]
+
+
+def confirmation_prompt(tool_name: str) -> AIMessage:
+    """The message that asks the user to confirm a call to ``tool_name``."""
+    return AIMessage(
+        id=str(uuid.uuid4()),
+        name=ROUTER_NAME,
+        content=_CONFIRM[tool_name],
+        response_metadata={"confirm": tool_name},
+    )
+
+
+def require_confirmation(messages, response: AIMessage) -> AIMessage:
+    """Swaps a model's unconfirmed checkout call for the confirmation prompt."""
+    for call in response.tool_calls:
+        if call["name"] in _CONFIRM and pending_confirmation(messages) != call["name"]:
+            return confirmation_prompt(call["name"])
+    return response
+
+
+def record_llm_latency(elapsed_ms: float) -> None:
+    """Feeds an observed LLM call latency into the moving average."""
+    global _llm_latency_ms
+    if _llm_latency_ms == 0.0:
+        _llm_latency_ms = elapsed_ms
+    else:
+        _llm_latency_ms = 0.9 * _llm_latency_ms + 0.1 * elapsed_ms
+
+
+def router_stats() -> Dict[str, float]:
+    """Returns the routed-turn hit rate and the estimated LLM time saved."""
+    turns = _stats["turns"]
+    return {
+        "turns": turns,
+        "routed": _stats["routed"],
+        "hit_rate": _stats["routed"] / turns if turns else 0.0,
+        "saved_ms": _stats["saved_ms"],
+    }
+
+
+def router(state, config: RunnableConfig):
+    """Answers simple commands with a direct tool call, skipping the LLM."""
+    last = state["messages"][-1]
+    if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+        return {}
+
+    start = time.perf_counter()
+    user_id = (config.get("configurable") or {}).get("user_id")
+    _stats["turns"] += 1
+
+    confirmed = pending_confirmation(state["messages"])
+    if confirmed is not None:
+        args = _user_args(None, user_id)
+        route = None if args is None else (confirmed, args)
+    else:
+        route = classify(last.content, user_id)
+    if route is None:
+        return {}
+
+    tool_name, args = route
+    _stats["routed"] += 1
+    saved_ms = max(_llm_latency_ms - (time.perf_counter() - start) * 1000, 0.0)
+    _stats["saved_ms"] += saved_ms
+    stats = router_stats()
+    logger.info(
+        "router: %s(%s) routed, ~%.0f ms saved, hit rate %.1f%% over %d turns",
+        tool_name,
+        args,
+        saved_ms,
+        stats["hit_rate"] * 100,
+        stats["turns"],
+    )
+
+    if tool_name in _CONFIRM and confirmed is None:
+        return {"messages": [confirmation_prompt(tool_name)]}
+
+    message = AIMessage(
+        id=str(uuid.uuid4()),
+        name=ROUTER_NAME,
+        content="",
+        tool_calls=[{"id": f"call_{uuid.uuid4().hex}", "name": tool_name, "args": args}],
+    )
+    return {"messages": [message]}
+
+
+def route_after_router(state) -> str:
+    """Sends routed turns straight to the tools, everything else to the LLM.
+
+    A confirmation prompt from the router is the whole answer and ends the turn.
+    """
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage) and last.name == ROUTER_NAME:
+        return "tools" if last.tool_calls else END
+    return "chatbot"
+
+
+def routed_result(messages) -> Optional[AIMessage]:
+    """Builds the templated answer for a routed tool result, if there is one."""
+    last = messages[-1]
+    if not isinstance(last, ToolMessage) or last.name not in _TEMPLATES:
+        return None
+
+    caller = next(
+        (m for m in reversed(messages) if isinstance(m, AIMessage) and m.tool_calls),
+        None,
+    )
+    if caller is None or caller.name != ROUTER_NAME:
+        return None
+
+    return AIMessage(id=str(uuid.uuid4()), content=_TEMPLATES[last.name](str(last.content)))
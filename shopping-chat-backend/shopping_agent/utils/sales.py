@@ -0,0 +1,289 @@
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from shopping_agent.utils import db
+
+logger = logging.getLogger(__name__)
+
+# Windows roll: each is the last N days up to and including today (UTC), so
+# "week" never resets on a Monday. Sales are bucketed per day, plus running
+# "week" and "month" totals and one all-time bucket, so every window is one
+# range of the product_sales_rank index whose top N is read directly.
+# Checkout adds to the running totals; on the first read of a new day they
+# are rebuilt from the day rows (roll_windows), dropping the day that left.
+WINDOWS = {"day": 1, "week": 7, "month": 30, "all": None}
+# Period key and the order lines it counts; {date} is the order date, :today the UTC date.
+_PERIODS = (
+    ("'day:' || date({date})", "1"),
+    ("'week'", "date({date}) >= date(:today, '-6 days')"),
+    ("'month'", "date({date}) >= date(:today, '-29 days')"),
+    ("'all'", "1"),
+)
+
+# products.popularity (the filter_products sort key) is refreshed from the
+# all-time aggregates at most this often, in the background.
+POPULARITY_REFRESH = float(os.getenv("POPULARITY_REFRESH", "300"))
+
+_popularity_lock = threading.Lock()
+_popularity_refreshed_at = 0.0
+# (catalog path, shard) -> the day this process last saw its windows rolled to
+_rolled_to: Dict[Tuple[str, Optional[int]], str] = {}
+
+# Every window's rows for the matching order lines; shared by checkout, rebuild and check.
+_SALES_SELECT = """
+    SELECT period, product_id, SUM(quantity) AS units, SUM(quantity * price) AS revenue
+    FROM ({lines})
+    GROUP BY period, product_id
+"""
+_LINES = """
+    SELECT {period} AS period, oi.product_id, oi.quantity, oi.price
+    FROM order_items oi JOIN orders o ON o.order_id = oi.order_id
+    WHERE {where}
+"""
+
+
+def _sales_select(where: str) -> str:
+    lines = " UNION ALL ".join(
+        _LINES.format(period=period.format(date="o.order_date"), where=f"({where}) AND {within.format(date='o.order_date')}")
+        for period, within in _PERIODS
+    )
+    return _SALES_SELECT.format(lines=lines)
+
+
+def _today() -> str:
+    # Orders are dated with SQLite's date('now'), which is UTC
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def record_sales(cursor: sqlite3.Cursor, order_id: int) -> None:
+    """Adds an order's lines to the aggregates inside the caller's checkout transaction."""
+    cursor.execute(
+        f"""
+        INSERT INTO product_sales (period, product_id, units, revenue)
+        {_sales_select("o.order_id = :order_id")}
+        ON CONFLICT (period, product_id) DO UPDATE
+        SET units = units + excluded.units, revenue = revenue + excluded.revenue;
+        """,
+        {"order_id": order_id, "today": _today()},
+    )
+
+
+def _shards() -> List[Optional[int]]:
+    return list(range(db.DB_SHARDS)) if db.DB_SHARDS else [None]
+
+
+def window_period(window: str, today: str) -> str:
+    """Returns the period key holding a window's totals, e.g. 'day:2025-08-17' or 'week'."""
+    if window not in WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+    return f"day:{today}" if window == "day" else window
+
+
+def roll_windows(conn: sqlite3.Connection, shard: Optional[int], today: str) -> None:
+    """Rebuilds a shard's week and month totals from its day rows, once per day.
+
+    The first write claims the day, so the transaction waits for the shard's
+    write lock instead of failing on an upgrade; every other process and
+    every later call that day finds it claimed and does nothing. Checkouts
+    committed before or after add to the same totals the rebuild computes.
+    """
+    key = (os.path.abspath(db.DB_PATH), shard)
+    if _rolled_to.get(key) == today:
+        return
+
+    cursor = conn.cursor()
+    with conn:
+        cursor.execute(
+            """
+            INSERT INTO sales_windows (id, rolled_to) VALUES (1, :today)
+            ON CONFLICT (id) DO UPDATE SET rolled_to = excluded.rolled_to WHERE rolled_to < excluded.rolled_to;
+            """,
+            {"today": today},
+        )
+        if cursor.rowcount:
+            cursor.execute("DELETE FROM product_sales WHERE period IN ('week', 'month');")
+            for window in ("week", "month"):
+                cursor.execute(
+                    """
+                    INSERT INTO product_sales (period, product_id, units, revenue)
+                    SELECT :window, product_id, SUM(units), SUM(revenue) FROM product_sales
+                    WHERE period BETWEEN 'day:' || date(:today, :back) AND 'day:' || :today
+                    GROUP BY product_id;
+                    """,
+                    {"window": window, "today": today, "back": f"-{WINDOWS[window] - 1} days"},
+                )
+    _rolled_to[key] = today
+
+
+def best_sellers(window: str, limit: int = 10) -> List[Dict[str, float]]:
+    """Returns the window's top products by units sold, with units and revenue.
+
+    Every window is one period, so unsharded this is one index range scan
+    of ``limit`` rows (plus, on the first read of a day, the roll_windows
+    rebuild). With shards, each shard's top rows are read and their exact
+    totals summed, reading deeper only while a product outside the
+    candidates could still rank: its total is at most the sum of the
+    smallest units seen per shard.
+    """
+    today = _today()
+    period = window_period(window, today)
+    top = "SELECT product_id, units FROM product_sales WHERE period = :period ORDER BY units DESC, product_id LIMIT :depth;"
+    connections = [db.get_shard_connection(shard) for shard in _shards()]
+
+    try:
+        if window in ("week", "month"):
+            for shard, (conn, _) in zip(_shards(), connections):
+                roll_windows(conn, shard, today)
+        depth = limit
+        while True:
+            candidates, bound, exhausted = set(), 0, True
+            for _, cursor in connections:
+                cursor.execute(top, {"period": period, "depth": depth})
+                rows = cursor.fetchall()
+                candidates.update(product_id for product_id, _ in rows)
+                if len(rows) == depth:
+                    bound += rows[-1][1]
+                    exhausted = False
+
+            if not candidates:
+                return []
+
+            totals: Dict[int, List[float]] = {}
+            for _, cursor in connections:
+                cursor.execute(
+                    f"""
+                    SELECT product_id, units, revenue FROM product_sales
+                    WHERE period = ? AND product_id IN ({", ".join("?" * len(candidates))});
+                    """,
+                    (period, *candidates),
+                )
+                for product_id, units, revenue in cursor.fetchall():
+                    total = totals.setdefault(product_id, [0, 0.0])
+                    total[0] += units
+                    total[1] += revenue
+
+            ranked = sorted(totals.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+            if exhausted or len(connections) == 1 or (len(ranked) == limit and ranked[-1][1][0] >= bound):
+                return [
+                    {"product_id": product_id, "units": units, "revenue": round(revenue, 2)}
+                    for product_id, (units, revenue) in ranked
+                ]
+            depth *= 2
+    finally:
+        for conn, _ in connections:
+            conn.close()
+
+
+def rebuild() -> int:
+    """Recomputes every shard's aggregates from orders and order_items; returns rows written."""
+    today = _today()
+    written = 0
+    for shard in _shards():
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            with conn:
+                cursor.execute("DELETE FROM product_sales;")
+                cursor.execute(
+                    f"INSERT INTO product_sales (period, product_id, units, revenue) {_sales_select('1')};",
+                    {"today": today},
+                )
+                written += cursor.rowcount
+                cursor.execute(
+                    "INSERT INTO sales_windows (id, rolled_to) VALUES (1, ?) ON CONFLICT (id) DO UPDATE SET rolled_to = excluded.rolled_to;",
+                    (today,),
+                )
+            _rolled_to[(os.path.abspath(db.DB_PATH), shard)] = today
+        finally:
+            conn.close()
+    return written
+
+
+def check() -> List[tuple]:
+    """Compares the aggregates with the raw order tables; returns the rows that differ.
+
+    The week and month totals are rolled to today first, as a read would.
+    """
+    today = _today()
+    mismatches = []
+    for shard in _shards():
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            roll_windows(conn, shard, today)
+            stored = "SELECT period, product_id, units, ROUND(revenue, 2) FROM product_sales"
+            expected = f"SELECT period, product_id, units, ROUND(revenue, 2) FROM ({_sales_select('1')})"
+            for label, query in (("stored", f"{stored} EXCEPT {expected}"), ("expected", f"{expected} EXCEPT {stored}")):
+                cursor.execute(f"{query};", {"today": today})
+                mismatches += [(shard, label, *row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    return mismatches
+
+
+def refresh_popularity() -> int:
+    """Copies all-time units sold per product into products.popularity; returns rows changed."""
+    totals: Dict[int, int] = {}
+    for shard in _shards():
+        conn, cursor = db.get_shard_connection(shard)
+        try:
+            cursor.execute("SELECT product_id, units FROM product_sales WHERE period = 'all';")
+            for product_id, units in cursor.fetchall():
+                totals[product_id] = totals.get(product_id, 0) + units
+        finally:
+            conn.close()
+
+    conn, cursor = db.get_db_connection()
+    try:
+        with conn:
+            # Unchanged rows are skipped so they do not bump the catalog version
+            cursor.executemany(
+                "UPDATE products SET popularity = ? WHERE product_id = ? AND popularity != ?;",
+                [(units, product_id, units) for product_id, units in totals.items()],
+            )
+            return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def maybe_refresh_popularity() -> None:
+    """Starts a background popularity refresh if the last one is older than POPULARITY_REFRESH."""
+    global _popularity_refreshed_at
+
+    with _popularity_lock:
+        if time.monotonic() - _popularity_refreshed_at < POPULARITY_REFRESH:
+            return
+        _popularity_refreshed_at = time.monotonic()
+    threading.Thread(target=_refresh_popularity_quietly, name="popularity-refresh", daemon=True).start()
+
+
+def _refresh_popularity_quietly() -> None:
+    try:
+        refresh_popularity()
+    except sqlite3.Error:
+        logger.exception("popularity refresh failed")
+
+
+if __name__ == "__main__":
+    # python -m shopping_agent.utils.sales rebuild|check|popularity
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain the product_sales aggregates.")
+    parser.add_argument("command", choices=["rebuild", "check", "popularity"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        logger.info("rebuilt product_sales: %d rows", rebuild())
+        logger.info("updated popularity of %d products", refresh_popularity())
+    elif args.command == "popularity":
+        logger.info("updated popularity of %d products", refresh_popularity())
+    else:
+        differences = check()
+        for row in differences:
+            logger.error("mismatch %s", row)
+        logger.info("product_sales %s", "differs from order_items" if differences else "is consistent")
+        sys.exit(1 if differences else 0)
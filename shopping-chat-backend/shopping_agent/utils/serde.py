@@ -0,0 +1,122 @@
+import os
+import struct
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Type tag prefix for compressed payloads; anything else is passed straight to
+# the inner serializer, so checkpoints written before compression still load.
+ZSTD_TYPE_PREFIX = "zstd+"
+# Header: magic, format version, id of the dictionary used (0 = none).
+_HEADER = struct.Struct(">2sBI")
+_MAGIC = b"SZ"
+FORMAT_VERSION = 1
+
+# Payloads smaller than this are stored uncompressed.
+SERDE_MIN_SIZE = int(os.getenv("SERDE_MIN_SIZE", "256"))
+SERDE_LEVEL = int(os.getenv("SERDE_LEVEL", "3"))
+# Optional trained dictionaries (see train_dictionary): a file, a directory of
+# them, or several paths joined with os.pathsep. New payloads use the most
+# recently modified one; the others are kept so older payloads still decode.
+SERDE_DICT_PATH = os.getenv("SERDE_DICT_PATH")
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Zstandard-compressed wrapper around the msgpack checkpoint serializer.
+
+    The inner JsonPlusSerializer encodes state with ormsgpack; the result is
+    compressed with zstandard, optionally using a dictionary trained on
+    typical shopping payloads. The first dictionary compresses new payloads;
+    older ones can follow it so data written with them keeps decoding after a
+    retrain. Each payload's header names its dictionary by dict_id.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[SerializerProtocol] = None,
+        dictionaries: Iterable[bytes] = (),
+        level: int = SERDE_LEVEL,
+        min_size: int = SERDE_MIN_SIZE,
+    ):
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_size = min_size
+        dicts = [zstandard.ZstdCompressionDict(data) for data in dictionaries]
+        self._dict = dicts[0] if dicts else None
+        self._dicts_by_id = {d.dict_id(): d for d in dicts}
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        # zstandard contexts are not thread-safe; keep one per thread
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._dict)
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        cache = getattr(self._local, "decompressors", None)
+        if cache is None:
+            cache = self._local.decompressors = {}
+        if dict_id not in cache:
+            if dict_id and dict_id not in self._dicts_by_id:
+                raise ValueError(f"checkpoint was compressed with unknown dictionary {dict_id}")
+            cache[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dicts_by_id.get(dict_id))
+        return cache[dict_id]
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+
+        dict_id = self._dict.dict_id() if self._dict is not None else 0
+        header = _HEADER.pack(_MAGIC, FORMAT_VERSION, dict_id)
+        return ZSTD_TYPE_PREFIX + type_, header + self._compressor().compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if not type_.startswith(ZSTD_TYPE_PREFIX):
+            return self.inner.loads_typed(data)
+
+        magic, version, dict_id = _HEADER.unpack_from(payload)
+        if magic != _MAGIC or version > FORMAT_VERSION:
+            raise ValueError(f"unsupported checkpoint encoding (version {version})")
+        raw = self._decompressor(dict_id).decompress(payload[_HEADER.size :])
+        return self.inner.loads_typed((type_[len(ZSTD_TYPE_PREFIX) :], raw))
+
+
+def train_dictionary(samples: List[Any], dict_size: int = 16 * 1024, inner: Optional[SerializerProtocol] = None) -> bytes:
+    """Trains a zstd dictionary on serialized sample states and returns it."""
+    inner = inner or JsonPlusSerializer()
+    encoded = [inner.dumps_typed(sample)[1] for sample in samples]
+    return zstandard.train_dictionary(dict_size, encoded).as_bytes()
+
+
+def dictionary_files(path: Optional[str]) -> List[str]:
+    """Returns the dictionary files named by a SERDE_DICT_PATH value, newest first."""
+    files = []
+    for entry in (path or "").split(os.pathsep):
+        if os.path.isdir(entry):
+            files += [os.path.join(entry, name) for name in os.listdir(entry)]
+        elif entry:
+            files.append(entry)
+    files = [f for f in files if os.path.isfile(f)]
+    return sorted(files, key=lambda f: (os.path.getmtime(f), f), reverse=True)
+
+
+def get_serializer(path: Optional[str] = None) -> CompressedSerializer:
+    """Returns the checkpoint serializer, with the trained dictionaries if configured."""
+    dictionaries = []
+    for name in dictionary_files(path or SERDE_DICT_PATH):
+        with open(name, "rb") as f:
+            dictionaries.append(f.read())
+    return CompressedSerializer(dictionaries=dictionaries)
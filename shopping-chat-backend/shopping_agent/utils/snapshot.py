@@ -0,0 +1,181 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from shopping_agent.utils import db
+from shopping_agent.utils.inventory import slot_stock
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: with CATALOG_SNAPSHOT set, product reads come from an immutable copy
+# of the products table at that path instead of the transactional database.
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT")
+CATALOG_MMAP_SIZE = int(os.getenv("CATALOG_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Readers compare the snapshot's listing version (every product change but
+# stock) with the live one at most this often, and republish it in the
+# background when they differ.
+CATALOG_SNAPSHOT_REFRESH = float(os.getenv("CATALOG_SNAPSHOT_REFRESH", "30"))
+
+_publish_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_checked_at = 0.0
+
+
+def publish_snapshot(path: str = CATALOG_SNAPSHOT) -> str:
+    """Writes the current products table to a new snapshot file and swaps it in.
+
+    The file is built next to the target and renamed over it, so readers see
+    either the old or the new snapshot, never a partial one. Connections that
+    are already open keep reading the old file until they close.
+    """
+    # Copies the live schema, so make sure it is up to date first
+    db.get_db_connection()[0].close()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("ATTACH DATABASE ? AS live;", (db.DB_PATH,))
+        # Read before the copy: a change in between only causes one more publish
+        (version,) = conn.execute("SELECT version FROM live.listing_meta WHERE id = 1;").fetchone()
+        conn.execute("CREATE TABLE snapshot_meta (version INTEGER NOT NULL);")
+        conn.execute("INSERT INTO snapshot_meta (version) VALUES (?);", (version,))
+        (schema,) = conn.execute(
+            "SELECT sql FROM live.sqlite_master WHERE type = 'table' AND name = 'products';"
+        ).fetchone()
+        conn.execute(schema)
+        # One statement, so the copy is a consistent read of the live table
+        conn.execute("INSERT INTO main.products SELECT * FROM live.products;")
+        # Built after the copy, which is faster than maintaining them row by row
+        for (index,) in conn.execute(
+            "SELECT sql FROM live.sqlite_master WHERE type = 'index' AND tbl_name = 'products' AND sql IS NOT NULL;"
+        ).fetchall():
+            conn.execute(index)
+        conn.commit()
+        conn.execute("DETACH DATABASE live;")
+        conn.execute("VACUUM;")
+    finally:
+        conn.close()
+
+    os.replace(tmp, path)
+    logger.info("published catalog snapshot %s at version %d", path, version)
+    return path
+
+
+def maybe_republish_snapshot(conn: sqlite3.Connection, path: str = CATALOG_SNAPSHOT) -> None:
+    """Starts a background publish if the listings changed since ``conn``'s snapshot was built.
+
+    Stock changes do not count: snapshot rows always get live stock. Checked
+    at most every CATALOG_SNAPSHOT_REFRESH seconds per process.
+    """
+    global _checked_at
+
+    with _refresh_lock:
+        if time.monotonic() - _checked_at < CATALOG_SNAPSHOT_REFRESH:
+            return
+        _checked_at = time.monotonic()
+
+    try:
+        (published,) = conn.execute("SELECT version FROM snapshot_meta;").fetchone()
+    except sqlite3.OperationalError:
+        # Published before snapshots carried their version
+        published = None
+    (live,) = db.get_read_connection().execute("SELECT version FROM listing_meta WHERE id = 1;").fetchall()[0]
+    if published != live:
+        threading.Thread(target=_republish_quietly, args=(path,), name="snapshot-publish", daemon=True).start()
+
+
+def _republish_quietly(path: str) -> None:
+    # One publish at a time per process; a reader that finds one running moves on
+    if not _publish_lock.acquire(blocking=False):
+        return
+    try:
+        publish_snapshot(path)
+    except (sqlite3.Error, OSError):
+        logger.exception("catalog snapshot publish failed")
+    finally:
+        _publish_lock.release()
+
+
+def snapshot_in_use() -> bool:
+    """Says whether product reads come from a snapshot, whose stock column is as of publishing."""
+    return bool(CATALOG_SNAPSHOT)
+
+
+def get_catalog_connection():
+    """Returns a connection and cursor for product reads.
+
+    Without a snapshot this is the transactional database. With one, the
+    snapshot is opened read-only and immutable, so SQLite takes no locks and
+    reads pages through mmap from the OS page cache. It is republished once
+    a listing has changed (see maybe_republish_snapshot), and its stock
+    column is as of publishing; pass rows through with_live_stock for
+    current values.
+    """
+    if not CATALOG_SNAPSHOT:
+        return db.get_db_connection()
+
+    if not os.path.exists(CATALOG_SNAPSHOT):
+        with _publish_lock:
+            if not os.path.exists(CATALOG_SNAPSHOT):
+                publish_snapshot(CATALOG_SNAPSHOT)
+
+    uri = f"{Path(CATALOG_SNAPSHOT).resolve().as_uri()}?mode=ro&immutable=1"
+    conn = db.open_connection(uri, uri=True)
+    conn.execute(f"PRAGMA mmap_size = {CATALOG_MMAP_SIZE};")
+    maybe_republish_snapshot(conn, CATALOG_SNAPSHOT)
+    return conn, conn.cursor()
+
+
+def live_stock(product_ids: Iterable[int]) -> Dict[int, int]:
+    """Reads current stock for the given products from the transactional store.
+
+    Runs on this thread's read connection rather than opening one per call.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return {}
+
+    stock = dict(
+        db.get_read_connection()
+        .execute(
+            f"SELECT product_id, stock FROM products WHERE product_id IN ({', '.join('?' * len(product_ids))});",
+            product_ids,
+        )
+        .fetchall()
+    )
+    for product_id, extra in slot_stock(product_ids).items():
+        stock[product_id] = stock.get(product_id, 0) + extra
+    return stock
+
+
+def with_live_stock(rows: List[dict]) -> List[dict]:
+    """Sets product rows' stock to the live value.
+
+    Snapshot rows get it from the transactional store. Rows already read
+    from it only need the stock that hot products keep in slot files.
+    """
+    if not rows:
+        return rows
+
+    if CATALOG_SNAPSHOT:
+        stock = live_stock(row["product_id"] for row in rows)
+        for row in rows:
+            row["stock"] = stock.get(row["product_id"], 0)
+    else:
+        for product_id, extra in slot_stock(row["product_id"] for row in rows).items():
+            for row in rows:
+                if row["product_id"] == product_id:
+                    row["stock"] += extra
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m shopping_agent.utils.snapshot publishes a new version
+    logging.basicConfig(level=logging.INFO)
+    publish_snapshot(CATALOG_SNAPSHOT or "catalog_snapshot.db")
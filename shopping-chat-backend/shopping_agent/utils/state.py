@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+from typing import Annotated, Dict, List, Optional, Sequence, Union
+
+from langgraph.graph import MessagesState
+from langgraph.graph.ui import AnyUIMessage, delete_ui_message, ui_message_reducer
+
+logger = logging.getLogger(__name__)
+
+# Components where only the latest render is worth keeping in state.
+UI_SINGLETONS = {"list_products", "view_cart", "weather"}
+UI_MAX_MESSAGES = int(os.getenv("UI_MAX_MESSAGES", "20"))
+UI_MAX_BYTES = int(os.getenv("UI_MAX_BYTES", str(256 * 1024)))
+
+
+def _entry_size(message: AnyUIMessage) -> int:
+    metadata = {k: v for k, v in message.get("metadata", {}).items() if k != "bytes"}
+    return len(json.dumps({**message, "metadata": metadata}, default=str))
+
+
+def _with_size(message: AnyUIMessage, size: Optional[int] = None) -> Optional[AnyUIMessage]:
+    """Stamps the entry's serialized size into its metadata, trimming it to fit UI_MAX_BYTES.
+
+    An entry over the cap has its longest list props halved until it fits
+    and is flagged ``truncated``; one that still does not fit is dropped.
+    """
+    if size is None:
+        size = _entry_size(message)
+    if size > UI_MAX_BYTES:
+        props = dict(message.get("props") or {})
+        if "truncated" not in props:
+            size += _prop_size("truncated", True)
+            props["truncated"] = True
+        while size > UI_MAX_BYTES:
+            lists = [key for key, value in props.items() if isinstance(value, list) and len(value) > 1]
+            if not lists:
+                logger.warning("dropping %s UI message of %d bytes, over UI_MAX_BYTES", message.get("name"), size)
+                return None
+            longest = max(lists, key=lambda key: len(props[key]))
+            before = _prop_size(longest, props[longest])
+            props[longest] = props[longest][: len(props[longest]) // 2]
+            size += _prop_size(longest, props[longest]) - before
+        message = {**message, "props": props}
+    return {**message, "metadata": {**message.get("metadata", {}), "bytes": size}}
+
+
+def _prop_size(key: str, value) -> int:
+    # '"key": value, ' inside the props object
+    return len(json.dumps({key: value}, default=str))
+
+
+def _merged_sizes(left: List[AnyUIMessage], right: List[AnyUIMessage]) -> Dict[str, int]:
+    """Sizes of entries that merge props into an already sized entry, from
+    the old size and the changed props alone, so a list that grows page by
+    page is not re-serialized on every page."""
+    sized = {m.get("id"): m for m in left if "bytes" in m.get("metadata", {})}
+    sizes: Dict[str, int] = {}
+    for message in right:
+        previous = sized.get(message.get("id"))
+        if message.get("type") != "ui" or previous is None or not message.get("metadata", {}).get("merge"):
+            continue
+        old_props = previous.get("props") or {}
+        size = sizes.get(message["id"], previous["metadata"]["bytes"])
+        for key, value in (message.get("props") or {}).items():
+            size += _prop_size(key, value) - (_prop_size(key, old_props[key]) if key in old_props else 0)
+        sizes[message["id"]] = size
+    return sizes
+
+
+def bounded_ui_reducer(
+    left: Union[List[AnyUIMessage], AnyUIMessage],
+    right: Union[List[AnyUIMessage], AnyUIMessage],
+) -> List[AnyUIMessage]:
+    """ui_message_reducer that keeps the UI state bounded.
+
+    Only the latest render of each singleton component is kept, then the
+    oldest entries are evicted until the count and size caps are met.
+    Removals of entries that were already evicted are ignored. Each entry
+    carries its size in ``metadata.bytes``: new entries are serialized once,
+    and merges into an entry only measure the props they change.
+    """
+    left = left if isinstance(left, list) else [left]
+    right = right if isinstance(right, list) else [right]
+    known = {m.get("id") for m in left} | {m.get("id") for m in right if m.get("type") == "ui"}
+    right = [m for m in right if m.get("type") != "remove-ui" or m.get("id") in known]
+    changed = {m.get("id") for m in right}
+    grown = _merged_sizes(left, right)
+
+    merged = []
+    for message in ui_message_reducer(left, right):
+        if message.get("id") in grown:
+            message = _with_size(message, grown[message.get("id")])
+        elif message.get("id") in changed or "bytes" not in message.get("metadata", {}):
+            message = _with_size(message)
+        if message is not None:
+            merged.append(message)
+
+    latest = {m.get("name"): m.get("id") for m in merged if m.get("name") in UI_SINGLETONS}
+    merged = [m for m in merged if m.get("name") not in UI_SINGLETONS or latest[m.get("name")] == m.get("id")]
+
+    total = sum(m["metadata"]["bytes"] for m in merged)
+    evict = 0
+    while len(merged) - evict > UI_MAX_MESSAGES or total > UI_MAX_BYTES:
+        total -= merged[evict]["metadata"]["bytes"]
+        evict += 1
+    return merged[evict:]
+
+
+def supersede_ui(ui: Sequence[AnyUIMessage], name: str) -> None:
+    """Tells the client to drop earlier renders of a component about to be re-pushed."""
+    for message in ui:
+        if message.get("name") == name and message.get("type") == "ui":
+            delete_ui_message(message["id"])
+
+
+class State(MessagesState):
+    ui: Annotated[Sequence[AnyUIMessage], bounded_ui_reducer]
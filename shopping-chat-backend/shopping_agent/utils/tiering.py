@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from pydantic import ValidationError
+
+from shopping_agent.utils.metrics import LLM_COST, LLM_ESCALATIONS, observe_llm_call
+from shopping_agent.utils.router import normalize
+
+logger = logging.getLogger(__name__)
+
+# Easy turns go to the small model; "0" sends every turn to the large one.
+MODEL_TIERING = os.getenv("MODEL_TIERING", "1").lower() in ("1", "true", "yes")
+MODELS = {
+    "small": os.getenv("SMALL_MODEL", "gpt-4.1-mini"),
+    "large": os.getenv("LARGE_MODEL", "gpt-4.1"),
+}
+# USD per million input and output tokens (list prices), for the cost metrics.
+PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Messages longer than this many words go to the large model.
+LARGE_TURN_WORDS = 25
+# After this many tool-calling rounds in one turn the large model takes over.
+LARGE_AFTER_ROUNDS = 2
+
+# Requests that need weighing options or several dependent steps.
+_HARD = re.compile(
+    r"\b(compare|comparison|which|why|should|difference|versus|vs|explain|instead|between|best for"
+    r"|budget|gift|recommend\w*|checkout|check out|refund|return|cancel)\b"
+    r"|\b(and|then) (add|buy|remove|checkout|check out)\b"
+)
+
+
+class ModelRouter:
+    """Sends each chatbot call to the small or the large model.
+
+    A turn is classified from the latest user message and the turn so far:
+    long or comparative requests, checkout, a failed tool call and long
+    tool chains go to the large model, everything else to the small one.
+    Once a turn has used the large model it stays there. A small-model
+    answer whose tool calls are malformed, name a tool that was not bound
+    or fail the tool's argument schema is redone by the large model.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool]):
+        self._tools = {tool.name: tool for tool in tools}
+        self._lock = threading.Lock()
+        self.stats = {
+            tier: {"calls": 0, "ms": 0.0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0} for tier in MODELS
+        }
+        self.escalations: Dict[str, int] = {}
+
+    def classify(self, messages: Sequence[BaseMessage]) -> str:
+        """Returns "small" or "large" for the next call on these messages."""
+        if not MODEL_TIERING:
+            return "large"
+
+        human_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None
+        )
+        if human_index is None or not isinstance(messages[human_index].content, str):
+            return "large"
+
+        turn = messages[human_index + 1 :]
+        calls = [m for m in turn if isinstance(m, AIMessage)]
+        if any(m.response_metadata.get("tier") == "large" for m in calls):
+            return "large"
+        if sum(1 for m in calls if m.tool_calls) >= LARGE_AFTER_ROUNDS:
+            return "large"
+        if any(
+            isinstance(m, ToolMessage) and (m.status == "error" or str(m.content).startswith("❌")) for m in turn
+        ):
+            return "large"
+
+        text = normalize(messages[human_index].content)
+        if len(text.split()) > LARGE_TURN_WORDS or _HARD.search(text):
+            return "large"
+        return "small"
+
+    def problem(self, response: AIMessage, names: FrozenSet[str]) -> Optional[str]:
+        """Returns why a response's tool calls cannot be run, or None if they can."""
+        if response.invalid_tool_calls:
+            return "malformed"
+        for call in response.tool_calls:
+            tool = self._tools.get(call["name"])
+            if tool is None or call["name"] not in names:
+                return "unknown_tool"
+            try:
+                tool.tool_call_schema.model_validate(call["args"])
+            except ValidationError:
+                return "bad_args"
+        return None
+
+    def _call(self, tier: str, llm: Runnable, history: Sequence[BaseMessage]) -> AIMessage:
+        start = time.perf_counter()
+        response = llm.invoke(history)
+        elapsed = time.perf_counter() - start
+        model = MODELS[tier]
+        observe_llm_call(model, elapsed, response)
+
+        usage = response.usage_metadata or {}
+        input_price, output_price = PRICES.get(model, (0.0, 0.0))
+        cost = (usage.get("input_tokens", 0) * input_price + usage.get("output_tokens", 0) * output_price) / 1e6
+        LLM_COST.labels(tier=tier, model=model).inc(cost)
+        with self._lock:
+            stats = self.stats[tier]
+            stats["calls"] += 1
+            stats["ms"] += elapsed * 1000
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["output_tokens"] += usage.get("output_tokens", 0)
+            stats["cost"] += cost
+
+        response.response_metadata["tier"] = tier
+        return response
+
+    def invoke(
+        self,
+        messages: Sequence[BaseMessage],
+        history: Sequence[BaseMessage],
+        names: FrozenSet[str],
+        bound: Callable[[FrozenSet[str], str], Runnable],
+    ) -> AIMessage:
+        """Answers from the tier chosen for messages, sending it history with
+        the named tools bound via bound(names, tier)."""
+        tier = self.classify(messages)
+        response = self._call(tier, bound(names, tier), history)
+        if tier == "small":
+            reason = self.problem(response, names)
+            if reason is not None:
+                logger.info("tiering: escalating to %s, small model made a %s tool call", MODELS["large"], reason)
+                LLM_ESCALATIONS.labels(reason=reason).inc()
+                with self._lock:
+                    self.escalations[reason] = self.escalations.get(reason, 0) + 1
+                response = self._call("large", bound(names, "large"), history)
+        return response
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Returns calls, mean latency, tokens and estimated cost per tier, plus escalations."""
+        result: Dict[str, Dict[str, float]] = {}
+        for tier, stats in self.stats.items():
+            result[tier] = {
+                **stats,
+                "model": MODELS[tier],
+                "mean_ms": stats["ms"] / stats["calls"] if stats["calls"] else 0.0,
+            }
+        result["escalations"] = dict(self.escalations)
+        return result
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, FrozenSet, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from shopping_agent.utils.router import normalize
+
+logger = logging.getLogger(__name__)
+
+# Bind only the tools a turn can plausibly need; "0" binds every tool on every call.
+TOOL_SELECTION = os.getenv("TOOL_SELECTION", "1").lower() in ("1", "true", "yes")
+
+# Tools that serve one kind of request. Cart requests usually name a product
+# rather than its id, so the cart group can look products up as well.
+TOOL_GROUPS: Dict[str, FrozenSet[str]] = {
+    "catalog": frozenset(
+        {
+            "list_products",
+            "product_details",
+            "product_details_batch",
+            "search_products",
+            "filter_products",
+            "recommend_products",
+            "top_products",
+        }
+    ),
+    "cart": frozenset({"add_to_cart", "view_cart", "checkout", "search_products", "product_details"}),
+    "weather": frozenset({"get_weather"}),
+}
+# Groups a message with no intent of its own can carry on from. Replies to a
+# cart or catalog answer ("yes, two", "the red one") tend to stay there; after
+# other tools the next message is as likely to be a new shopping request.
+FOLLOW_UP_GROUPS = ("cart", "catalog")
+
+_INTENTS = [
+    ("weather", re.compile(r"\b(weather|temperature|forecast|rain\w*|sunny|snow\w*|wind\w*)\b")),
+    ("cart", re.compile(r"\b(cart|basket|add|buy|checkout|check out|order\w*|purchase|remove|one more|another)\b")),
+    (
+        "catalog",
+        re.compile(
+            r"\b(products?|items?|catalog|browse|shop|show|list|find|search|looking|price\w*|cheap\w*|under|over|stock|details?"
+            r"|best|sellers?|popular|top|recommend\w*|suggest\w*|similar|brand|sell|have|compare)\b|\d"
+        ),
+    ),
+]
+
+# Whole messages that need no tool at all.
+_SMALL_TALK = re.compile(
+    r"(hi|hello|hey|yo|thanks|thank you|thx|ok|okay|cool|great|nice|bye|goodbye"
+    r"|good (morning|afternoon|evening)|how are you( doing)?|whats up)( there| so much| a lot| again)?"
+)
+
+
+class ToolSelector:
+    """Picks the tools to bind for the next model call.
+
+    The groups come from the intents of the latest user message, plus any
+    tool already called this turn. A message with no recognisable intent
+    falls back to the group of the thread's most recent tool call when that
+    is a cart or catalog tool (e.g. "yes, two" after an add_to_cart), small
+    talk gets no tools, and anything else gets all of them.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool]):
+        self.names = frozenset(tool.name for tool in tools)
+        self._tools = list(tools)
+        self._schema_tokens: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "tools_bound": 0, "schema_tokens": 0, "schema_tokens_saved": 0}
+
+    def _tokens(self) -> Dict[str, int]:
+        # Built on first use: converting the schemas imports the pydantic models
+        if self._schema_tokens is None:
+            self._schema_tokens = {
+                tool.name: len(json.dumps(convert_to_openai_tool(tool))) // 4 for tool in self._tools
+            }
+        return self._schema_tokens
+
+    def _groups_of(self, tool_name: str) -> FrozenSet[str]:
+        return frozenset().union(
+            *(TOOL_GROUPS[group] for group in FOLLOW_UP_GROUPS if tool_name in TOOL_GROUPS[group])
+        )
+
+    def select(self, messages: Sequence[BaseMessage]) -> FrozenSet[str]:
+        """Returns the names of the tools to bind for a call on these messages."""
+        if not TOOL_SELECTION:
+            return self.names
+
+        human_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None
+        )
+        if human_index is None or not isinstance(messages[human_index].content, str):
+            return self._record(self.names)
+
+        text = normalize(messages[human_index].content)
+        selected = frozenset().union(*(TOOL_GROUPS[group] for group, pattern in _INTENTS if pattern.search(text)))
+        # Keep whatever this turn has already called, e.g. a routed tool
+        selected |= {
+            call["name"] for m in messages[human_index + 1 :] if isinstance(m, AIMessage) for call in m.tool_calls
+        }
+
+        if not selected:
+            if _SMALL_TALK.fullmatch(text):
+                return self._record(frozenset())
+            previous = next(
+                (
+                    m.tool_calls[-1]["name"]
+                    for m in reversed(messages[:human_index])
+                    if isinstance(m, AIMessage) and m.tool_calls
+                ),
+                None,
+            )
+            selected = (self._groups_of(previous) if previous else None) or self.names
+
+        return self._record(selected & self.names)
+
+    def _record(self, selected: FrozenSet[str]) -> FrozenSet[str]:
+        tokens = self._tokens()
+        sent = sum(tokens[name] for name in selected)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["tools_bound"] += len(selected)
+            self.stats["schema_tokens"] += sent
+            self.stats["schema_tokens_saved"] += sum(tokens.values()) - sent
+        logger.debug("tool_select: %d/%d tools, ~%d schema tokens", len(selected), len(self.names), sent)
+        return selected
+
+    def metrics(self) -> Dict[str, float]:
+        """Returns call counts and the prompt tokens of tool schemas sent and saved."""
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "all_tools_schema_tokens": sum(self._tokens().values()),
+            "saved_per_call": self.stats["schema_tokens_saved"] / calls if calls else 0.0,
+        }
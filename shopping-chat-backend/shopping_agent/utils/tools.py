@@ -1,17 +1,28 @@
 # 1. Connect to SQLite DB
+import json
 import sqlite3
-from typing import List, Dict, Union, Annotated, Sequence
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union, Annotated, Sequence
 import uuid
 from langchain_core.tools import tool
 from langgraph.graph.ui import AnyUIMessage, ui_message_reducer, push_ui_message, delete_ui_message
 from langchain_core.messages import AIMessage, BaseMessage
 from pydantic import BaseModel
 
-
-def get_db_connection():
-    """Returns a new database connection and cursor."""
-    conn = sqlite3.connect("ecommerce_test.db")
-    return conn, conn.cursor()
+from shopping_agent.utils.db import (
+    attach_stock_slots,
+    decode_order_id,
+    encode_order_id,
+    get_db_connection,
+    get_shard_connection,
+    shard_for,
+)
+from shopping_agent.utils.group_commit import CART_GROUP_COMMIT, cart_committer
+from shopping_agent.utils.inventory import hot_products, stock_with_slots, take_stock
+from shopping_agent.utils.metrics import timed_tool
+from shopping_agent.utils.orders import CHECKOUT_PIPELINE, OrderPipeline
+from shopping_agent.utils.recommend import get_recommender
+from shopping_agent.utils.sales import WINDOWS, best_sellers, maybe_refresh_popularity, record_sales
+from shopping_agent.utils.snapshot import get_catalog_connection, snapshot_in_use, with_live_stock
 
 
 # 2. Define tools for the agent
@@ -19,6 +30,7 @@ class WeatherOutput(BaseModel):
         location: str
         
 @tool(args_schema = WeatherOutput)
+@timed_tool
 def get_weather(location: str) -> str:
     """Get the current weather for a location."""
     # Simulate weather API call
@@ -33,29 +45,66 @@ def get_weather(location: str) -> str:
     return weather_data # type: ignore
 
 
-@tool
-def list_products() -> List[Dict[str, Union[int, str, float]]]:
-    """Lists all available products with id, name, price, and stock."""
-    # Create a new connection and cursor within the tool's execution context
-    conn, cursor = get_db_connection()
+# Rows fetched from the cursor per step, and per page of a product list in the UI.
+PRODUCT_CHUNK_SIZE = 50
+# Upper bound on rows list_products returns inline to the model; the UI
+# pages through the full catalog instead (see product_page).
+LIST_PRODUCTS_INLINE_LIMIT = 200
 
-    try:
-        cursor.execute("SELECT product_id, image_url, name, price, stock FROM products;")
-        products = cursor.fetchall()
 
+def iter_products(
+    chunk_size: int = PRODUCT_CHUNK_SIZE, after: Optional[int] = None
+) -> Iterator[List[Dict[str, Union[int, str, float]]]]:
+    """Yields the catalog in product_id order, in chunks straight from the
+    cursor, never holding it all. ``after`` resumes past a product id."""
+    conn, cursor = get_catalog_connection()
+
+    try:
+        cursor.execute(
+            "SELECT product_id, image_url, name, price, stock FROM products WHERE product_id > ? ORDER BY product_id;",
+            (after if after is not None else -1,),
+        )
         columns = [desc[0] for desc in cursor.description]
-        product_list = [dict(zip(columns, row)) for row in products]
 
-        return product_list
+        while rows := cursor.fetchmany(chunk_size):
+            yield with_live_stock([dict(zip(columns, row)) for row in rows])
     finally:
-        # Always close the connection
+        # Always close the connection, even if the consumer stops early
         conn.close()
 
 
+def product_page(
+    after: Optional[int] = None, limit: int = PRODUCT_CHUNK_SIZE
+) -> Tuple[List[Dict[str, Union[int, str, float]]], Optional[int]]:
+    """Returns up to ``limit`` products past ``after`` in product_id order, and
+    the cursor for the next page (None on the last one)."""
+    chunks = iter_products(limit + 1, after)
+    try:
+        rows = next(chunks, [])
+    finally:
+        chunks.close()
+    page = rows[:limit]
+    return page, page[-1]["product_id"] if len(rows) > limit else None
+
+
+@tool
+@timed_tool
+def list_products() -> List[Dict[str, Union[int, str, float]]]:
+    """Lists all available products with id, name, price, and stock."""
+    product_list = []
+    for chunk in iter_products():
+        product_list.extend(chunk)
+        if len(product_list) >= LIST_PRODUCTS_INLINE_LIMIT:
+            break
+
+    return product_list[:LIST_PRODUCTS_INLINE_LIMIT]
+
+
 @tool
+@timed_tool
 def product_details(product_id: int) -> Union[Dict[str, Union[int, str, float]], str]:
     """Gets details of a specific product by its ID."""
-    conn, cursor = get_db_connection()
+    conn, cursor = get_catalog_connection()
 
     try:
         cursor.execute(
@@ -70,15 +119,30 @@ def product_details(product_id: int) -> Union[Dict[str, Union[int, str, float]],
         columns = [desc[0] for desc in cursor.description]
         product_dict = dict(zip(columns, product))
 
-        return product_dict
+        return with_live_stock([product_dict])[0]
     finally:
         conn.close()
 
 
 @tool
+@timed_tool
+def product_details_batch(product_ids: List[int]) -> Union[List[Dict[str, Union[int, str, float]]], str]:
+    """Gets details of several products by their IDs in one call, e.g. to compare them.
+
+    Results are in the order given; an ID with no product has an "error" entry.
+    """
+    if len(product_ids) > LIST_PRODUCTS_INLINE_LIMIT:
+        return f"❌ Ask for at most {LIST_PRODUCTS_INLINE_LIMIT} products at a time."
+
+    products = fetch_products(product_ids)
+    return [products.get(p, {"product_id": p, "error": "❌ Product not found."}) for p in product_ids]
+
+
+@tool
+@timed_tool
 def search_products(query: str) -> List[Dict[str, Union[int, str, float]]]:
     """Searches for products by name using a keyword."""
-    conn, cursor = get_db_connection()
+    conn, cursor = get_catalog_connection()
 
     try:
         cursor.execute(
@@ -93,66 +157,329 @@ def search_products(query: str) -> List[Dict[str, Union[int, str, float]]]:
         columns = [desc[0] for desc in cursor.description]
         product_list = [dict(zip(columns, row)) for row in products]
 
-        return product_list
+        return with_live_stock(product_list)
     finally:
         conn.close()
 
 
+# filter_products sort orders. Each matches one facet index, down to the
+# implicit product_id at its end, so rows come out of the index presorted.
+FILTER_SORTS = {
+    "price": ["price", "product_id"],
+    "name": ["name COLLATE NOCASE", "price", "product_id"],
+    "popularity": ["popularity DESC", "price", "product_id"],
+}
+# With a price range and another sort, a range holding fewer rows than this
+# is read from the price index and sorted; a wider one is found faster by
+# walking the sort order's index, which carries price, until limit rows match.
+FILTER_RANGE_SCAN_ROWS = 5000
+FILTER_SORT_KEYS = {
+    "price": lambda row: (row["price"], row["product_id"]),
+    "name": lambda row: (row["name"].lower(), row["price"], row["product_id"]),
+    "popularity": lambda row: (-row["popularity"], row["price"], row["product_id"]),
+}
+
+
+def filter_sql(
+    keyword: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    in_stock: bool,
+    sort: str,
+    limit: int,
+    product_ids: Optional[Iterable[int]] = None,
+    range_first: Optional[bool] = None,
+    offset: int = 0,
+) -> Tuple[str, list]:
+    """Builds the filter_products query; only the facets given become conditions.
+
+    range_first pins the plan: True reads the price range then sorts, False
+    walks the sort index. A unary + on a column keeps SQLite from using an
+    index on it, so the other one is chosen.
+    """
+    price = "+price" if range_first is False else "price"
+    conditions, params = [], []
+    if keyword:
+        conditions.append("name LIKE ?")
+        params.append(f"%{keyword}%")
+    if min_price is not None:
+        conditions.append(f"{price} >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append(f"{price} <= ?")
+        params.append(max_price)
+    if in_stock:
+        # Written exactly as in the partial indexes' WHERE so they qualify
+        conditions.append("stock > 0")
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        conditions.append(f"product_id IN ({', '.join('?' * len(product_ids))})")
+        params.extend(product_ids)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = ", ".join(f"+{term}" if range_first else term for term in FILTER_SORTS[sort])
+    sql = f"SELECT product_id, name, price, stock, popularity FROM products {where} ORDER BY {order} LIMIT ? OFFSET ?;"
+    return sql, params + [limit, offset]
+
+
+def narrow_price_range(cursor: sqlite3.Cursor, min_price: Optional[float], max_price: Optional[float], in_stock: bool) -> bool:
+    """Says whether fewer than FILTER_RANGE_SCAN_ROWS products fall in the price range.
+
+    Counts entries of the price index only, stopping at the threshold.
+    """
+    conditions = ["price >= ?", "price <= ?"] + (["stock > 0"] if in_stock else [])
+    cursor.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM products WHERE {' AND '.join(conditions)} LIMIT ?);",
+        (
+            float("-inf") if min_price is None else min_price,
+            float("inf") if max_price is None else max_price,
+            FILTER_RANGE_SCAN_ROWS,
+        ),
+    )
+    return cursor.fetchone()[0] < FILTER_RANGE_SCAN_ROWS
+
+
+def filter_queries(
+    cursor: sqlite3.Cursor,
+    keyword: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    in_stock: bool,
+    sort: str,
+    limit: int,
+) -> List[Tuple[str, list]]:
+    """Returns the queries filter_products runs, with the plan for a price range chosen."""
+    range_first = None
+    if sort != "price" and (min_price is not None or max_price is not None):
+        range_first = narrow_price_range(cursor, min_price, max_price, in_stock)
+
+    queries = [filter_sql(keyword, min_price, max_price, in_stock, sort, limit, range_first=range_first)]
+    hot = hot_products() if in_stock else set()
+    if hot:
+        # A hot product's row holds only part of its stock, so it may show 0 there
+        queries.append(filter_sql(keyword, min_price, max_price, False, sort, limit, product_ids=hot))
+    return queries
+
+
+def filter_live_in_stock(
+    cursor: sqlite3.Cursor,
+    keyword: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort: str,
+    limit: int,
+) -> List[Dict[str, Union[int, str, float]]]:
+    """Applies the in_stock facet to snapshot rows using live stock.
+
+    The snapshot's stock column is as of publishing, so the other facets are
+    run against it a page of ``limit`` rows at a time and each page is kept
+    to the rows whose live stock is above zero, until ``limit`` are found.
+    """
+    ((sql, params),) = filter_queries(cursor, keyword, min_price, max_price, False, sort, limit)
+    products: List[Dict[str, Union[int, str, float]]] = []
+    offset = 0
+    while len(products) < limit:
+        cursor.execute(sql, params[:-1] + [offset])
+        columns = [desc[0] for desc in cursor.description]
+        page = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        products.extend(product for product in with_live_stock(page) if product["stock"] > 0)
+        if len(page) < limit:
+            break
+        offset += limit
+    return products[:limit]
+
+
 @tool
-def add_to_cart(user_id: int, product_id: int, quantity: int) -> str:
-    """Adds a product to the user's cart."""
-    conn, cursor = get_db_connection()
+@timed_tool
+def filter_products(
+    keyword: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    sort: str = "price",
+    limit: int = 20,
+) -> Union[List[Dict[str, Union[int, str, float]]], str]:
+    """Finds products by name keyword, price range and stock.
+
+    sort is "price" (cheapest first), "name" or "popularity" (best-selling first).
+    """
+    if sort not in FILTER_SORTS:
+        return f"❌ Unknown sort {sort!r}; use one of: {', '.join(FILTER_SORTS)}."
+    limit = max(1, min(limit, LIST_PRODUCTS_INLINE_LIMIT))
+    if sort == "popularity":
+        maybe_refresh_popularity()
+
+    conn, cursor = get_catalog_connection()
 
     try:
-        # Get product details
-        cursor.execute(
-            "SELECT product_id, name, stock FROM products WHERE product_id=?;",
-            (product_id,),
-        )
-        product = cursor.fetchone()
+        if in_stock and snapshot_in_use():
+            return filter_live_in_stock(cursor, keyword, min_price, max_price, sort, limit)
+        queries = filter_queries(cursor, keyword, min_price, max_price, in_stock, sort, limit)
+        rows = {}
+        for sql, params in queries:
+            cursor.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            for row in cursor.fetchall():
+                rows[row[0]] = dict(zip(columns, row))
+    finally:
+        conn.close()
 
-        if not product:
-            return "❌ Product not found."
+    products = with_live_stock(list(rows.values()))
+    if in_stock:
+        products = [product for product in products if product["stock"] > 0]
+    if len(queries) > 1:
+        products.sort(key=FILTER_SORT_KEYS[sort])
+    return products[:limit]
 
-        product_stock = product[2]
-        product_name = product[1]
 
-        if product_stock < quantity:
-            return f"❌ Only {product_stock} units of {product_name} available."
+def fetch_products(product_ids: Iterable[int]) -> Dict[int, Dict[str, Union[int, str, float]]]:
+    """Fetches product rows by id in one query; ids that do not exist are left out.
 
-        # Get or create cart
-        cursor.execute("SELECT cart_id FROM cart WHERE user_id=?;", (user_id,))
-        cart = cursor.fetchone()
+    The ids are bound as one JSON array and expanded by json_each, so the
+    statement text (and its cached plan) is the same for any number of ids.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return {}
 
-        if not cart:
-            print("Creating new cart for user.")
-            cursor.execute("INSERT INTO cart (user_id) VALUES (?);", (user_id,))
-            cart_id = cursor.lastrowid
-        else:
-            print("Using existing cart for user.")
-            cart_id = cart[0]
-
-        # Check if item already exists in cart
+    conn, cursor = get_catalog_connection()
+
+    try:
         cursor.execute(
-            "SELECT cart_item_id, quantity FROM cart_items WHERE cart_id=? AND product_id=?;",
-            (cart_id, product_id),
+            "SELECT product_id, name, price, stock FROM products WHERE product_id IN (SELECT value FROM json_each(?));",
+            (json.dumps(product_ids),),
         )
-        existing_item = cursor.fetchone()
+        columns = [desc[0] for desc in cursor.description]
+        products = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        conn.close()
 
-        if existing_item:
-            new_qty = existing_item[1] + quantity
-            cursor.execute(
-                "UPDATE cart_items SET quantity=? WHERE cart_item_id=?;",
-                (new_qty, existing_item[0]),
-            )
-        else:
+    return {product["product_id"]: product for product in with_live_stock(products)}
+
+
+def products_by_id(product_ids: List[int]) -> List[Dict[str, Union[int, str, float]]]:
+    """Fetches product rows in the order given, skipping ids that do not exist."""
+    products = fetch_products(product_ids)
+    return [products[p] for p in product_ids if p in products]
+
+
+@tool
+@timed_tool
+def recommend_products(
+    product_id: Optional[int] = None, user_id: Optional[int] = None, limit: int = 5
+) -> Union[List[Dict[str, Union[int, str, float]]], str]:
+    """Recommends products often bought together with a product, or with everything in the user's cart.
+
+    Pass product_id for one product, or user_id to use the user's cart.
+    """
+    if product_id is not None:
+        recommended = get_recommender().related(product_id, limit)
+    elif user_id is not None:
+        conn, cursor = get_db_connection(user_id)
+        try:
             cursor.execute(
-                "INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (?, ?, ?);",
-                (cart_id, product_id, quantity),
+                "SELECT ci.product_id FROM cart_items ci JOIN cart c ON ci.cart_id = c.cart_id WHERE c.user_id=?;",
+                (user_id,),
             )
+            cart_products = [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        if not cart_products:
+            return "🛒 Cart is empty."
+        recommended = get_recommender().for_basket(cart_products, limit)
+    else:
+        return "❌ Give a product_id or a user_id."
+
+    return products_by_id(recommended)
+
+
+@tool
+@timed_tool
+def top_products(window: str = "week", limit: int = 10) -> Union[List[Dict[str, Union[int, str, float]]], str]:
+    """Lists the best-selling products of today, the last 7 days, the last 30 days, or of all time.
+
+    window is "day" (today), "week" (last 7 days), "month" (last 30 days) or "all".
+    """
+    if window not in WINDOWS:
+        return f"❌ Unknown window {window!r}; use one of: {', '.join(WINDOWS)}."
+
+    sales = best_sellers(window, limit)
+    products = {product["product_id"]: product for product in products_by_id([s["product_id"] for s in sales])}
+    return [{**products[s["product_id"]], **s} for s in sales if s["product_id"] in products]
+
+
+def add_cart_item(cursor: sqlite3.Cursor, user_id: int, product_id: int, quantity: int) -> str:
+    """Writes a cart line inside the caller's transaction; the caller commits."""
+    # Get product details
+    cursor.execute(
+        "SELECT product_id, name, stock FROM products WHERE product_id=?;",
+        (product_id,),
+    )
+    product = cursor.fetchone()
+
+    if not product:
+        return "❌ Product not found."
+
+    # Hot products keep most of their stock in the slot files
+    product_stock = stock_with_slots(product_id, product[2], quantity)
+    product_name = product[1]
+
+    if product_stock < quantity:
+        return f"❌ Only {product_stock} units of {product_name} available."
+
+    # Get or create cart
+    cursor.execute("SELECT cart_id FROM cart WHERE user_id=?;", (user_id,))
+    cart = cursor.fetchone()
+
+    if not cart:
+        cursor.execute("INSERT INTO cart (user_id) VALUES (?);", (user_id,))
+        cart_id = cursor.lastrowid
+    else:
+        cart_id = cart[0]
+
+    # Check if item already exists in cart
+    cursor.execute(
+        "SELECT cart_item_id, quantity FROM cart_items WHERE cart_id=? AND product_id=?;",
+        (cart_id, product_id),
+    )
+    existing_item = cursor.fetchone()
+
+    if existing_item:
+        new_qty = existing_item[1] + quantity
+        cursor.execute(
+            "UPDATE cart_items SET quantity=? WHERE cart_item_id=?;",
+            (new_qty, existing_item[0]),
+        )
+    else:
+        cursor.execute(
+            "INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (?, ?, ?);",
+            (cart_id, product_id, quantity),
+        )
+
+    return f"🛒 Added {quantity} x {product_name} to cart."
+
+
+@tool
+@timed_tool
+def add_to_cart(user_id: int, product_id: int, quantity: int) -> str:
+    """Adds a product to the user's cart."""
+
+    def write(cursor: sqlite3.Cursor) -> str:
+        return add_cart_item(cursor, user_id, product_id, quantity)
+
+    if CART_GROUP_COMMIT:
+        try:
+            return cart_committer(shard_for(user_id)).run(write)
+        except sqlite3.Error as e:
+            return f"❌ An error occurred: {e}"
 
+    conn, cursor = get_db_connection(user_id)
+
+    try:
+        result = write(cursor)
         conn.commit()
-        return f"🛒 Added {quantity} x {product_name} to cart."
+        return result
 
     except sqlite3.Error as e:
         conn.rollback()
@@ -162,9 +489,10 @@ def add_to_cart(user_id: int, product_id: int, quantity: int) -> str:
 
 
 @tool
+@timed_tool
 def view_cart(user_id: int) -> Union[Dict, str]:
     """Views items in the user's cart with totals."""
-    conn, cursor = get_db_connection()
+    conn, cursor = get_db_connection(user_id)
 
     try:
         cursor.execute("SELECT cart_id FROM cart WHERE user_id=?;", (user_id,))
@@ -203,14 +531,18 @@ def view_cart(user_id: int) -> Union[Dict, str]:
         conn.close()
 
 
-@tool
-def checkout(user_id: int) -> str:
-    """Checks out the cart: creates an order and clears cart."""
-    conn, cursor = get_db_connection()
+def place_order(user_id: int) -> str:
+    """Turns the user's cart into an order in one transaction; raises sqlite3.Error."""
+    conn, cursor = get_db_connection(user_id)
+    attach_stock_slots(conn)
 
     try:
-        # Begin transaction
-        conn.execute("BEGIN;")
+        # Unsharded, every checkout needs the database's one write lock, so it
+        # is taken up front: a deferred transaction that has already read
+        # fails at once when another writer holds it, without a busy wait.
+        # Sharded, BEGIN IMMEDIATE would also lock the attached catalog.
+        sharded = shard_for(user_id) is not None
+        conn.execute("BEGIN;" if sharded else "BEGIN IMMEDIATE;")
 
         # Check for cart and items
         cursor.execute("SELECT cart_id FROM cart WHERE user_id=?;", (user_id,))
@@ -239,10 +571,6 @@ def checkout(user_id: int) -> str:
         columns = [desc[0] for desc in cursor.description]
         cart_items_list = [dict(zip(columns, row)) for row in items]
 
-        for item in cart_items_list:
-            if item["stock"] < item["quantity"]:
-                return f"❌ Not enough stock for {item['name']}."
-
         total = sum(item["price"] * item["quantity"] for item in cart_items_list)
 
         # Create order
@@ -258,33 +586,56 @@ def checkout(user_id: int) -> str:
                 "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?);",
                 (order_id, item["product_id"], item["quantity"], item["price"]),
             )
-            cursor.execute(
-                "UPDATE products SET stock = stock - ? WHERE product_id=?;",
-                (item["quantity"], item["product_id"]),
-            )
+            # Checked as it is taken: a hot product's row only holds part of its stock
+            if not take_stock(cursor, item["product_id"], item["quantity"], shard_for(user_id)):
+                conn.rollback()
+                return f"❌ Not enough stock for {item['name']}."
+
+        # Bestseller aggregates move with the order, in the same transaction
+        record_sales(cursor, order_id)
 
         # Clear cart items
         cursor.execute("DELETE FROM cart_items WHERE cart_id=?;", (cart_id,))
 
         conn.commit()
+        order_id = encode_order_id(shard_for(user_id), order_id)
         return f"✅ Order {order_id} placed successfully! Total: ${total:.2f}"
 
-    except sqlite3.Error as e:
-        conn.rollback()  # Rollback on error
-        return f"❌ An error occurred: {e}"
+    except sqlite3.Error:
+        conn.rollback()  # Rollback on error; the caller reports or retries it
+        raise
     finally:
         conn.close()
 
 
+# Single writer for checkouts when CHECKOUT_PIPELINE is on
+order_pipeline = OrderPipeline(place_order)
+
+
+@tool
+@timed_tool
+def checkout(user_id: int) -> str:
+    """Checks out the cart: creates an order and clears cart."""
+    if CHECKOUT_PIPELINE:
+        return order_pipeline.checkout(user_id)
+    try:
+        return place_order(user_id)
+    except sqlite3.Error as e:
+        return f"❌ An error occurred: {e}"
+
+
 @tool
+@timed_tool
 def get_order_status(order_id: int) -> Union[Dict, str]:
     """Gets the status and details of a specific order."""
-    conn, cursor = get_db_connection()
+    # Sharded order ids name the shard they live in
+    shard, local_id = decode_order_id(order_id)
+    conn, cursor = get_shard_connection(shard)
 
     try:
         cursor.execute(
             "SELECT order_id, order_date, total, status FROM orders WHERE order_id=?;",
-            (order_id,),
+            (local_id,),
         )
         order = cursor.fetchone()
 
@@ -293,6 +644,7 @@ def get_order_status(order_id: int) -> Union[Dict, str]:
 
         order_columns = [desc[0] for desc in cursor.description]
         order_dict = dict(zip(order_columns, order))
+        order_dict["order_id"] = order_id
 
         cursor.execute(
             """
@@ -301,7 +653,7 @@ def get_order_status(order_id: int) -> Union[Dict, str]:
             JOIN products p ON oi.product_id = p.product_id
             WHERE oi.order_id=?;
             """,
-            (order_id,),
+            (local_id,),
         )
         items = cursor.fetchall()
 
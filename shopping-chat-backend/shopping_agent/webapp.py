@@ -0,0 +1,46 @@
+# HTTP routes served next to the graph by the LangGraph server (see langgraph.json)
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from shopping_agent.utils.autocomplete import AUTOCOMPLETE_K, AUTOCOMPLETE_MAX_K, get_index, suggest
+from shopping_agent.utils.tools import LIST_PRODUCTS_INLINE_LIMIT, PRODUCT_CHUNK_SIZE, product_page
+
+
+async def autocomplete(request: Request) -> JSONResponse:
+    """GET /autocomplete?q=<typed text>&k=<count>: product suggestions while typing."""
+    try:
+        k = int(request.query_params.get("k", AUTOCOMPLETE_K))
+    except ValueError:
+        return JSONResponse({"error": "k must be an integer"}, status_code=400)
+
+    # Off the event loop: the index now and then reads catalog changes from SQLite
+    suggestions = await run_in_threadpool(suggest, request.query_params.get("q", ""), min(k, AUTOCOMPLETE_MAX_K))
+    return JSONResponse({"suggestions": suggestions})
+
+
+async def products(request: Request) -> JSONResponse:
+    """GET /products?after=<product id>&limit=<count>: the next page of a product list from its cursor."""
+    try:
+        after = request.query_params.get("after")
+        after = int(after) if after is not None else None
+        limit = int(request.query_params.get("limit", PRODUCT_CHUNK_SIZE))
+    except ValueError:
+        return JSONResponse({"error": "after and limit must be integers"}, status_code=400)
+
+    page, cursor = await run_in_threadpool(product_page, after, max(1, min(limit, LIST_PRODUCTS_INLINE_LIMIT)))
+    return JSONResponse({"products": page, "cursor": cursor})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # Build the index before the first keystroke arrives
+    await run_in_threadpool(get_index)
+    yield
+
+
+app = Starlette(routes=[Route("/autocomplete", autocomplete), Route("/products", products)], lifespan=lifespan)
@@ -0,0 +1,44 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+# benchmarks/fake_llm.py is the offline chat model the tests drive the graph with
+sys.path.insert(0, str(APP_DIR / "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    """Runs a test against its own copy of the sample database."""
+    shutil.copy(APP_DIR / "ecommerce_test.db", tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    from shopping_agent.utils import db
+
+    # The schema checks are per process; redo them for the fresh copy
+    monkeypatch.setattr(db, "_schema_ready", False)
+    monkeypatch.setattr(db, "_shards_ready", set())
+    monkeypatch.setattr(db, "_slots_ready", False)
+    return tmp_path
+
+
+@pytest.fixture
+def graph(scratch_db, monkeypatch):
+    """The compiled agent, answering with fake_llm.ScriptedChatModel and an in-memory checkpointer."""
+    from fake_llm import ScriptedChatModel
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from shopping_agent import shopping_agent
+    from shopping_agent.utils.cache import response_cache
+
+    monkeypatch.setattr(shopping_agent, "get_llm", lambda *tier: ScriptedChatModel())
+    monkeypatch.setattr(response_cache, "get", lambda key: None)
+    shopping_agent.get_llm_with_tools.cache_clear()
+    yield shopping_agent.agent.builder.compile(checkpointer=InMemorySaver())
+    shopping_agent.get_llm_with_tools.cache_clear()
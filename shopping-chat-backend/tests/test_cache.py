@@ -0,0 +1,26 @@
+import sqlite3
+
+from langchain_core.messages import HumanMessage
+
+
+def test_cache_key_follows_catalog_writes_without_opening_connections(scratch_db, monkeypatch):
+    from shopping_agent.utils import db
+    from shopping_agent.utils.cache import ResponseCache
+
+    cache = ResponseCache()
+    messages = [HumanMessage("what's cheap today")]
+    before = cache.key_for(messages)
+
+    opened = []
+    open_connection = db.open_connection
+    monkeypatch.setattr(db, "open_connection", lambda *args, **kwargs: opened.append(args) or open_connection(*args, **kwargs))
+    assert cache.key_for(messages) == before
+
+    # Another process changes a price
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("UPDATE products SET price = price + 1 WHERE product_id = 1;")
+    conn.commit()
+    conn.close()
+
+    assert cache.key_for(messages) != before
+    assert opened == []
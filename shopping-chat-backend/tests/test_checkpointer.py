@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from shopping_agent.utils.checkpointer import CheckpointWriteError, SqliteCheckpointSaver
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"), batch_ms=0, retries=2)
+    yield saver
+    saver._commit = SqliteCheckpointSaver._commit.__get__(saver)
+    saver.close()
+
+
+def put(saver, thread_id):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, empty_checkpoint(), {}, {})
+
+
+def fail(saver, error, times=None):
+    """Makes the next `times` commits (all of them if None) raise `error`."""
+    commit, calls = saver._commit, []
+
+    def failing(batch):
+        calls.append(len(batch))
+        if times is None or len(calls) <= times:
+            raise error
+        commit(batch)
+
+    saver._commit = failing
+    return calls
+
+
+def test_failed_batch_is_retried(saver):
+    fail(saver, sqlite3.OperationalError("database is locked"), times=2)
+    put(saver, "a")
+    saver.flush("a")
+    assert saver.get_tuple({"configurable": {"thread_id": "a"}}) is not None
+
+
+def test_dropped_writes_raise_on_the_next_flush_of_their_thread(saver):
+    fail(saver, sqlite3.OperationalError("disk I/O error"))
+    put(saver, "a")
+    saver.flush("b")
+    with pytest.raises(CheckpointWriteError, match="disk I/O error"):
+        saver.flush("a")
+    # Reported once
+    saver.flush("a")
+
+
+def test_writer_survives_other_exceptions(saver):
+    fail(saver, ValueError("not a sqlite error"), times=4)
+    put(saver, "a")
+    with pytest.raises(CheckpointWriteError):
+        saver.flush("a")
+    assert saver._thread.is_alive()
+
+    config = put(saver, "a")
+    saver.flush("a")
+    assert saver.get_tuple(config).config == config
+
+
+def test_flush_waits_only_for_its_thread_and_times_out(saver):
+    # Hold the writer inside its commit
+    saver._write_lock.acquire()
+    try:
+        put(saver, "a")
+        saver.flush("b", timeout=0.1)
+        with pytest.raises(TimeoutError):
+            saver.flush("a", timeout=0.1)
+    finally:
+        saver._write_lock.release()
+    saver.flush("a")
+
+
+def test_batch_that_keeps_failing_is_committed_write_by_write(saver):
+    commit = saver._commit
+    started = threading.Event()
+
+    def commit_or_fail(batch):
+        started.set()
+        if len(batch) > 1:
+            raise sqlite3.OperationalError("batch failed")
+        commit(batch)
+
+    saver._commit = commit_or_fail
+    saver._write_lock.acquire()
+    try:
+        put(saver, "a")
+        started.wait(1)
+        put(saver, "b")
+        put(saver, "c")
+    finally:
+        saver._write_lock.release()
+    saver.flush()
+    assert saver.get_tuple({"configurable": {"thread_id": "c"}}) is not None
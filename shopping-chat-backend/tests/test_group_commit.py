@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+
+import pytest
+
+from shopping_agent.utils import group_commit
+from shopping_agent.utils.group_commit import STILL_RUNNING, TIMED_OUT, GroupCommitter, cart_committer
+
+
+def test_operations_commit_in_batches(scratch_db):
+    committer = GroupCommitter(window_ms=20)
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(committer.run(lambda cursor: f"op {i}")))
+        for i in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [f"op {i}" for i in range(5)]
+    assert committer.stats["batches"] < 5
+
+
+def test_writer_that_cannot_connect_fails_callers_instead_of_hanging(monkeypatch):
+    def no_connection(shard):
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(group_commit, "get_shard_connection", no_connection)
+    committer = GroupCommitter(timeout=5)
+    committer._thread.join(1)
+
+    with pytest.raises(sqlite3.OperationalError, match="unable to open"):
+        committer.run(lambda cursor: "never")
+
+
+def test_stopped_writer_fails_queued_operations_and_is_replaced(scratch_db, monkeypatch):
+    monkeypatch.setattr(group_commit, "_committers", {})
+    committer = cart_committer(None)
+    release = threading.Event()
+
+    def stop(cursor):
+        release.wait(1)
+        raise SystemExit
+
+    outcomes = []
+
+    def call(op):
+        try:
+            outcomes.append(committer.run(op, timeout=5))
+        except BaseException as e:
+            outcomes.append(type(e).__name__)
+
+    first = threading.Thread(target=call, args=(stop,))
+    first.start()
+    queued = threading.Thread(target=call, args=(lambda cursor: "queued",))
+    queued.start()
+    release.set()
+    first.join()
+    queued.join()
+
+    assert outcomes == ["SystemExit", "SystemExit"]
+    assert cart_committer(None) is not committer
+    assert cart_committer(None).run(lambda cursor: "ok") == "ok"
+
+
+def test_run_gives_up_after_its_timeout(scratch_db):
+    committer = GroupCommitter()
+    started, release = threading.Event(), threading.Event()
+
+    def slow(cursor):
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    threading.Thread(target=committer.run, args=(slow,)).start()
+    started.wait(1)
+    try:
+        assert committer.run(lambda cursor: "waiting", timeout=0.05) == TIMED_OUT
+    finally:
+        release.set()
+    assert committer.run(lambda cursor: "after") == "after"
+
+
+def test_run_reports_an_operation_already_in_its_batch(scratch_db):
+    committer = GroupCommitter()
+    release = threading.Event()
+
+    def slow(cursor):
+        release.wait(5)
+        return "slow"
+
+    try:
+        assert committer.run(slow, timeout=0.05) == STILL_RUNNING
+    finally:
+        release.set()
+
+
+def test_batch_waits_for_another_writer_instead_of_failing(scratch_db):
+    committer = GroupCommitter(retries=0)
+
+    def read_then_write(cursor):
+        cursor.execute("SELECT COUNT(*) FROM cart_items;").fetchall()
+        cursor.execute("DELETE FROM cart_items WHERE cart_id = -1;")
+        return "written"
+
+    # Connected (and the schema checked) before the lock is taken
+    assert committer.run(lambda cursor: "ready") == "ready"
+    blocker = sqlite3.connect("ecommerce_test.db", isolation_level=None, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE;")
+    threading.Timer(0.1, lambda: blocker.execute("ROLLBACK;")).start()
+    try:
+        assert committer.run(read_then_write, timeout=5) == "written"
+    finally:
+        blocker.close()
@@ -0,0 +1,79 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from shopping_agent.utils.history import TOOL_STUB_TOKENS, count_tokens, trim_history
+
+
+def tool_turn(n: int, result_chars: int = 100):
+    """A user question, an AI tool call and its result: three blocks' worth of messages."""
+    call_id = f"call_{n}"
+    return [
+        HumanMessage(f"question {n}"),
+        AIMessage("", tool_calls=[{"name": "list_products", "args": {"page": n}, "id": call_id}]),
+        ToolMessage("x" * result_chars, tool_call_id=call_id, name="list_products"),
+    ]
+
+
+def tokens(messages) -> int:
+    return sum(count_tokens(m) for m in messages)
+
+
+def test_history_fits_the_budget_keeping_the_newest_messages():
+    system = SystemMessage("You are a shopping assistant.")
+    messages = [system] + [HumanMessage(f"{i} " + "word " * 80) for i in range(50)]
+
+    trimmed = trim_history(messages, max_tokens=1000, keep_recent=2)
+    assert trimmed[0] is system
+    assert tokens(trimmed) <= 1000
+    assert trimmed[-1] is messages[-1]
+    # What is dropped is the oldest; what is kept is a contiguous tail
+    kept = trimmed[1:]
+    assert kept == messages[-len(kept) :]
+    assert len(kept) < 50
+
+
+def test_newest_block_is_sent_even_over_budget():
+    messages = tool_turn(1) + tool_turn(2, result_chars=40_000)
+    trimmed = trim_history(messages, max_tokens=100, keep_recent=1)
+    # The newest block is the tool call with its (unstubbed) result
+    assert trimmed == messages[-2:]
+
+
+def test_tool_calls_and_results_stay_together_at_every_budget():
+    messages = []
+    for n in range(6):
+        messages += tool_turn(n)
+    # A result whose call is gone is never sent on its own
+    messages.insert(0, ToolMessage("orphan", tool_call_id="call_gone", name="list_products"))
+
+    for budget in range(0, tokens(messages) + 50, 7):
+        trimmed = trim_history(messages, max_tokens=budget, keep_recent=2)
+        sent_calls = {call["id"] for m in trimmed if isinstance(m, AIMessage) for call in m.tool_calls}
+        results = [m for m in trimmed if isinstance(m, ToolMessage)]
+        assert {m.tool_call_id for m in results} == sent_calls
+        assert all(m.content != "orphan" for m in results)
+
+
+def test_recent_blocks_keep_their_tool_results():
+    big = (TOOL_STUB_TOKENS + 50) * 4
+    messages = tool_turn(1, big) + tool_turn(2, big) + [AIMessage("Here you go.")]
+
+    # keep_recent=3 covers the last result (and the reply and the call before it)
+    trimmed = trim_history(messages, max_tokens=100_000, keep_recent=3)
+    results = [m.content for m in trimmed if isinstance(m, ToolMessage)]
+    assert results[-1] == "x" * big
+    assert results[0] != "x" * big
+
+
+def test_older_bulky_results_are_stubbed():
+    big = (TOOL_STUB_TOKENS + 50) * 4
+    old = tool_turn(1, big)
+    small = tool_turn(2, 40)
+    messages = old + small + tool_turn(3)
+
+    trimmed = trim_history(messages, max_tokens=100_000, keep_recent=2)
+    stub = next(m for m in trimmed if isinstance(m, ToolMessage) and m.tool_call_id == "call_1")
+    assert stub.content == f"[list_products result omitted from history (~{count_tokens(old[2])} tokens)]"
+    assert stub.name == "list_products"
+    # Results under the stub threshold are left alone, and the original is untouched
+    assert next(m for m in trimmed if isinstance(m, ToolMessage) and m.tool_call_id == "call_2").content == "x" * 40
+    assert old[2].content == "x" * big
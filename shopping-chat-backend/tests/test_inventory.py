@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import APP_DIR
+
+
+@pytest.fixture
+def sharded(scratch_db, monkeypatch):
+    from shopping_agent.utils import db, inventory
+
+    monkeypatch.setattr(db, "DB_SHARDS", 2)
+    monkeypatch.setattr(db, "STOCK_SLOTS", 2)
+    monkeypatch.setattr(inventory, "STOCK_RESERVE", 5)
+    monkeypatch.setattr(inventory, "_hot", set())
+    monkeypatch.setattr(inventory, "_hot_loaded_at", 0.0)
+    return scratch_db
+
+
+def row_stock(product_id: int) -> int:
+    conn = sqlite3.connect("ecommerce_test.db")
+    try:
+        return conn.execute("SELECT stock FROM products WHERE product_id = ?;", (product_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def mark_hot(product_id: int) -> None:
+    """Lists the product as hot without moving any of its stock off the products row."""
+    from shopping_agent.utils import inventory
+
+    inventory.hot_products(refresh=True)
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("INSERT INTO hot_products (product_id) VALUES (?);", (product_id,))
+    conn.commit()
+    conn.close()
+    inventory.hot_products(refresh=True)
+
+
+def test_sharded_checkout_takes_stock_from_its_shard_slot(sharded):
+    from shopping_agent.utils import inventory
+    from shopping_agent.utils.tools import add_to_cart, checkout
+
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("UPDATE products SET stock = 100 WHERE product_id = 3;")
+    conn.commit()
+    conn.close()
+
+    # An uncontended checkout takes from the row and leaves the product cold
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+    assert checkout.invoke({"user_id": 1}).startswith("✅")
+    assert row_stock(3) == 99
+    assert 3 not in inventory.hot_products(refresh=True)
+
+    mark_hot(3)
+    rows = []
+    for _ in range(6):
+        add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+        assert checkout.invoke({"user_id": 1}).startswith("✅")
+        rows.append(row_stock(3))
+
+    # The first checkout reserves 5 units; the next four never touch the catalog row
+    assert rows == [94, 94, 94, 94, 94, 89]
+    assert inventory.slot_stock([3]) == {3: 4}
+
+
+def test_sharded_checkout_uses_other_shards_stock_when_row_is_empty(sharded):
+    from shopping_agent.utils import inventory
+    from shopping_agent.utils.tools import add_to_cart, checkout
+
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("UPDATE products SET stock = 6 WHERE product_id = 3;")
+    conn.commit()
+    conn.close()
+    mark_hot(3)
+
+    # User 2 (shard 0) reserves 5 units, user 1 (shard 1) gets the last one on the row
+    for user_id in (2, 1):
+        add_to_cart.invoke({"user_id": user_id, "product_id": 3, "quantity": 1})
+        assert checkout.invoke({"user_id": user_id}).startswith("✅")
+    assert row_stock(3) == 0
+
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 4})
+    assert checkout.invoke({"user_id": 1}).startswith("✅")
+    assert inventory.slot_stock([3]) == {3: 0}
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+    assert checkout.invoke({"user_id": 1}).startswith("❌")
+
+
+def test_lock_failures_promote_only_the_product_that_hit_them(sharded, monkeypatch):
+    from shopping_agent.utils import inventory
+    from shopping_agent.utils.tools import add_to_cart, checkout
+
+    monkeypatch.setattr(inventory, "HOT_STOCK_PROMOTE_AFTER", 3)
+    monkeypatch.setattr(inventory, "_contended", {})
+    monkeypatch.setattr(inventory, "_window_started", 0.0)
+    # Product 3 is taken first and finds the lock held; product 5 is never reached
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+    add_to_cart.invoke({"user_id": 1, "product_id": 5, "quantity": 1})
+
+    blocker = sqlite3.connect("ecommerce_test.db", isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE;")
+    for _ in range(3):
+        assert "locked" in checkout.invoke({"user_id": 1})
+    blocker.execute("ROLLBACK;")
+    blocker.close()
+
+    deadline = time.monotonic() + 5
+    while 3 not in inventory.hot_products(refresh=True) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert inventory.hot_products() == {3}
+    assert sum(inventory.slot_stock([3]).values()) > 0
+    assert checkout.invoke({"user_id": 1}).startswith("✅")
+
+
+def test_too_many_shards_for_order_ids_fails_at_import():
+    env = {**os.environ, "DB_SHARDS": "1000"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import shopping_agent.utils.db"], cwd=APP_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "DB_SHARDS must be below 1000" in result.stderr
+
+
+def test_stock_slots_stay_off_unsharded():
+    env = {**os.environ, "STOCK_SLOTS": "4"}
+    env.pop("DB_SHARDS", None)
+    result = subprocess.run(
+        [sys.executable, "-c", "import shopping_agent.utils.db as db; print(db.STOCK_SLOTS)"],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "0", result.stderr
@@ -0,0 +1,44 @@
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+
+def test_batch_reads_the_catalog_version_once(scratch_db, monkeypatch):
+    from shopping_agent.utils import memo
+    from shopping_agent.utils.tools import product_details, view_cart
+
+    reads = []
+    monkeypatch.setattr(memo, "catalog_version", lambda: reads.append(1) or 7)
+    node = memo.MemoizedToolNode(ToolNode([product_details, view_cart]))
+    calls = [{"name": "product_details", "args": {"product_id": i}, "id": f"call_{i}"} for i in (1, 2, 3, 1)]
+    config = {"configurable": {"thread_id": "t"}}
+
+    node({"messages": [AIMessage(content="", tool_calls=calls)]}, config)
+    assert reads == [1]
+    assert node.metrics() == {"executed": 3, "deduplicated": 1}
+
+    # A batch without catalog tools does not read it
+    cart = [{"name": "view_cart", "args": {"user_id": 1}, "id": "call_cart"}]
+    node({"messages": [AIMessage(content="", tool_calls=cart)]}, config)
+    assert reads == [1]
+
+
+def test_cart_reads_are_not_reused_across_batches(scratch_db):
+    from shopping_agent.utils import memo
+    from shopping_agent.utils.tools import add_to_cart, view_cart
+
+    node = memo.MemoizedToolNode(ToolNode([view_cart]))
+    config = {"configurable": {"thread_id": "t"}}
+
+    def view(*ids):
+        calls = [{"name": "view_cart", "args": {"user_id": 1}, "id": call_id} for call_id in ids]
+        return node({"messages": [AIMessage(content="", tool_calls=calls)]}, config)["messages"]
+
+    before = view("a", "b")
+    assert before[0].content == before[1].content
+    assert node.metrics() == {"executed": 1, "deduplicated": 1}
+
+    # Another thread (or process) changes the cart
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+    (after,) = view("c")
+    assert after.content != before[0].content
+    assert node.metrics() == {"executed": 2, "deduplicated": 1}
@@ -0,0 +1,39 @@
+import json
+import sqlite3
+
+from langchain_core.messages import HumanMessage
+
+
+def test_product_list_keeps_one_page_in_state(graph):
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.executemany(
+        "INSERT INTO products (name, price, stock) VALUES (?, ?, ?);",
+        [(f"Generated {i}", 1.0 + i, 5) for i in range(2000)],
+    )
+    conn.commit()
+    (catalog,) = conn.execute("SELECT COUNT(*) FROM products;").fetchone()
+    conn.close()
+
+    from shopping_agent.utils.tools import PRODUCT_CHUNK_SIZE, product_page
+
+    config = {"configurable": {"thread_id": "list", "user_id": 1}}
+    graph.invoke({"messages": [HumanMessage("show me the products")]}, config)
+
+    # What a reloaded thread gets back: one page and the cursor to the next
+    ui = graph.get_state(config).values["ui"]
+    assert len(ui) == 1
+    first = ui[0]["props"]["products"]
+    assert len(first) == PRODUCT_CHUNK_SIZE
+    assert ui[0]["props"]["cursor"] == first[-1]["product_id"]
+    assert len(json.dumps(ui)) < 20_000
+
+    # The pages GET /products serves from that cursor
+    products, cursor = list(first), ui[0]["props"]["cursor"]
+    while cursor is not None:
+        page, cursor = product_page(cursor)
+        products += page
+
+    ids = [p["product_id"] for p in products]
+    assert len(ids) == catalog
+    assert ids == sorted(set(ids))
+
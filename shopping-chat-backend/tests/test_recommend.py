@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def recommend(scratch_db, monkeypatch):
+    from shopping_agent.utils import recommend
+
+    monkeypatch.setattr(recommend, "_recommender", None)
+    monkeypatch.setattr(recommend, "_checked_at", 0.0)
+    monkeypatch.setattr(recommend, "RECOMMEND_REFRESH", 0.0)
+    return recommend
+
+
+def place_elsewhere(*product_ids: int) -> None:
+    """Commits an order the way another worker process would."""
+    conn = sqlite3.connect("ecommerce_test.db")
+    order_id = conn.execute(
+        "INSERT INTO orders (user_id, order_date, total) VALUES (1, datetime('now'), 1.0);"
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, 1, 1.0);",
+        [(order_id, product_id) for product_id in product_ids],
+    )
+    conn.commit()
+    conn.close()
+
+
+def together(matrix, a: int, b: int) -> int:
+    return int(matrix._scores([a])[b])
+
+
+def test_orders_from_other_workers_are_merged(recommend):
+    before = together(recommend.get_recommender(), 1, 2)
+
+    for _ in range(3):
+        place_elsewhere(1, 2)
+    matrix = recommend.get_recommender()
+    assert together(matrix, 1, 2) == before + 3
+    assert matrix.related(1, 1) == [2]
+
+    # Each order is counted once
+    assert together(recommend.get_recommender(), 1, 2) == before + 3
+
+
+def test_saved_matrix_catches_up_on_orders_placed_after_it(recommend, monkeypatch, tmp_path):
+    path = str(tmp_path / "matrix.npz")
+    recommend.build().save(path)
+    place_elsewhere(1, 2)
+
+    monkeypatch.setattr(recommend, "RECOMMEND_MATRIX", path)
+    loaded = recommend.get_recommender()
+    assert together(loaded, 1, 2) == together(recommend.build(), 1, 2)
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+def say(graph, utterance: str, user_id: int = 1):
+    config = {"configurable": {"thread_id": "t", "user_id": user_id}}
+    return graph.invoke({"messages": [HumanMessage(utterance)]}, config)
+
+
+def orders() -> int:
+    conn = sqlite3.connect("ecommerce_test.db")
+    try:
+        return conn.execute("SELECT COUNT(*) FROM orders;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def tool_calls(state):
+    last_human = max(i for i, m in enumerate(state["messages"]) if isinstance(m, HumanMessage))
+    return [m.name for m in state["messages"][last_human:] if isinstance(m, ToolMessage)]
+
+
+def test_empty_cart_is_answered_without_a_cart_ui(graph):
+    state = say(graph, "view my cart", user_id=999)
+
+    assert tool_calls(state) == ["view_cart"]
+    assert state["messages"][-1].content == "🛒 Cart is empty."
+    assert not state.get("ui")
+
+
+@pytest.mark.parametrize("routed", [True, False], ids=["routed", "model"])
+def test_checkout_waits_for_confirmation(graph, monkeypatch, routed):
+    from shopping_agent.utils import router
+
+    if not routed:
+        # The model asks for the checkout instead of the router
+        monkeypatch.setattr(router, "_RULES", [])
+    say(graph, "add product 3 to my cart")
+    placed = orders()
+
+    state = say(graph, "Continue to checkout my cart!" if routed else "checkout")
+    assert tool_calls(state) == []
+    assert state["messages"][-1].response_metadata["confirm"] == "checkout"
+    assert orders() == placed
+
+    state = say(graph, "yes")
+    assert tool_calls(state) == ["checkout"]
+    assert orders() == placed + 1
+
+
+def test_yes_without_a_pending_prompt_does_not_check_out(graph):
+    say(graph, "add product 3 to my cart")
+    placed = orders()
+
+    say(graph, "view my cart")
+    state = say(graph, "yes")
+    assert tool_calls(state) == []
+    assert orders() == placed
+
+
+def test_model_checkout_call_is_held_back():
+    from shopping_agent.utils.router import require_confirmation
+
+    call = AIMessage(content="", tool_calls=[{"name": "checkout", "args": {"user_id": 1}, "id": "call_1"}])
+    held = require_confirmation([HumanMessage("buy it all")], call)
+    assert not held.tool_calls
+    assert held.response_metadata["confirm"] == "checkout"
+
+    confirmed = [HumanMessage("checkout"), held, HumanMessage("Yes, place my order")]
+    assert require_confirmation(confirmed, call) is call
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+
+def place(product_id: int, quantity: int, days_ago: int) -> None:
+    conn = sqlite3.connect("ecommerce_test.db")
+    order_id = conn.execute(
+        "INSERT INTO orders (user_id, order_date, total) VALUES (1, date('now', ?), 0);", (f"-{days_ago} days",)
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, 2.5);",
+        (order_id, product_id, quantity),
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        ("day", [(1, 1)]),
+        ("week", [(2, 5), (1, 1)]),
+        ("month", [(3, 9), (2, 5), (1, 1)]),
+        ("all", [(4, 20), (3, 9), (2, 5), (1, 1)]),
+    ],
+)
+def test_windows_roll_over_the_last_days(scratch_db, window, expected):
+    from shopping_agent.utils import sales
+
+    # Clear out the sample orders so only these count
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("DELETE FROM order_items;")
+    conn.commit()
+    conn.close()
+    place(1, 1, days_ago=0)
+    place(2, 5, days_ago=6)
+    place(3, 9, days_ago=29)
+    place(4, 20, days_ago=30)
+    sales.rebuild()
+
+    top = sales.best_sellers(window)
+    assert [(s["product_id"], s["units"]) for s in top] == expected
+    assert top[0]["revenue"] == expected[0][1] * 2.5
+    assert sales.check() == []
+
+
+def test_running_windows_follow_checkouts_and_roll_over_at_midnight(scratch_db, monkeypatch):
+    from datetime import date, timedelta
+
+    from shopping_agent.utils import sales
+    from shopping_agent.utils.tools import add_to_cart, checkout
+
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute("DELETE FROM order_items;")
+    conn.commit()
+    conn.close()
+    place(2, 5, days_ago=6)
+    sales.rebuild()
+
+    # A checkout adds to the running totals without a rebuild
+    add_to_cart.invoke({"user_id": 4242, "product_id": 1, "quantity": 7})
+    assert checkout.invoke({"user_id": 4242}).startswith("✅")
+    assert [(s["product_id"], s["units"]) for s in sales.best_sellers("week")] == [(1, 7), (2, 5)]
+
+    # The next day, product 2's sales are 7 days old and leave the week, not the month
+    today = date.fromisoformat(sales._today())
+    monkeypatch.setattr(sales, "_today", lambda: (today + timedelta(days=1)).isoformat())
+    assert [(s["product_id"], s["units"]) for s in sales.best_sellers("week")] == [(1, 7)]
+    assert [(s["product_id"], s["units"]) for s in sales.best_sellers("month")] == [(1, 7), (2, 5)]
+    assert sales.check() == []
@@ -0,0 +1,91 @@
+import os
+import random
+
+import pytest
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from shopping_agent.utils.serde import _HEADER, ZSTD_TYPE_PREFIX, CompressedSerializer, get_serializer, train_dictionary
+
+
+def state(rng: random.Random) -> dict:
+    return {
+        "cart": [
+            {"product_id": rng.randint(1, 50), "name": rng.choice(["Kindle Paperwhite", "MX Master 3S"]), "quantity": 1}
+            for _ in range(rng.randint(1, 10))
+        ],
+        "note": f"thread {rng.random()}",
+    }
+
+
+def dict_id(typed) -> int:
+    return _HEADER.unpack_from(typed[1])[2]
+
+
+@pytest.fixture(scope="module")
+def dictionaries():
+    """Two dictionaries, as trained before and after a retrain."""
+    return [train_dictionary([state(random.Random(seed * 1000 + i)) for i in range(300)], 4096) for seed in (1, 2)]
+
+
+def write(directory, name: str, data: bytes, mtime: int) -> None:
+    path = directory / name
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_small_payloads_are_stored_plain():
+    serde = CompressedSerializer()
+    typed = serde.dumps_typed({"a": 1})
+    assert not typed[0].startswith(ZSTD_TYPE_PREFIX)
+    assert serde.loads_typed(typed) == {"a": 1}
+
+
+def test_zstd_round_trip():
+    serde = CompressedSerializer()
+    obj = state(random.Random(0))
+    typed = serde.dumps_typed(obj)
+    assert typed[0].startswith(ZSTD_TYPE_PREFIX)
+    assert dict_id(typed) == 0
+    assert serde.loads_typed(typed) == obj
+
+
+def test_dictionary_round_trip(tmp_path, dictionaries):
+    write(tmp_path, "shopping.zdict", dictionaries[0], 1_000)
+    serde = get_serializer(str(tmp_path / "shopping.zdict"))
+    obj = state(random.Random(0))
+    typed = serde.dumps_typed(obj)
+    assert dict_id(typed) == serde._dict.dict_id() != 0
+    assert serde.loads_typed(typed) == obj
+
+
+def test_old_dictionary_still_decodes_after_a_retrain(tmp_path, dictionaries):
+    write(tmp_path, "shopping-1.zdict", dictionaries[0], 1_000)
+    obj = state(random.Random(0))
+    old = get_serializer(str(tmp_path)).dumps_typed(obj)
+
+    write(tmp_path, "shopping-2.zdict", dictionaries[1], 2_000)
+    serde = get_serializer(str(tmp_path))
+    new = serde.dumps_typed(obj)
+    # New payloads use the newest dictionary; the old one still decodes
+    assert dict_id(new) != dict_id(old)
+    assert dict_id(new) == CompressedSerializer(dictionaries=[dictionaries[1]])._dict.dict_id()
+    assert serde.loads_typed(old) == obj
+    assert serde.loads_typed(new) == obj
+
+    # A list of files works the same way
+    listed = get_serializer(os.pathsep.join([str(tmp_path / "shopping-1.zdict"), str(tmp_path / "shopping-2.zdict")]))
+    assert dict_id(listed.dumps_typed(obj)) == dict_id(new)
+    assert listed.loads_typed(old) == obj
+
+
+def test_unknown_dictionary_is_an_error(tmp_path, dictionaries):
+    write(tmp_path, "shopping-1.zdict", dictionaries[0], 1_000)
+    typed = get_serializer(str(tmp_path)).dumps_typed(state(random.Random(0)))
+    with pytest.raises(ValueError, match="unknown dictionary"):
+        CompressedSerializer().loads_typed(typed)
+
+
+def test_legacy_uncompressed_blobs_load():
+    obj = state(random.Random(0))
+    legacy = JsonPlusSerializer().dumps_typed(obj)
+    assert CompressedSerializer().loads_typed(legacy) == obj
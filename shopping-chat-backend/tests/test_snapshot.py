@@ -0,0 +1,90 @@
+import sqlite3
+import time
+
+import pytest
+
+
+@pytest.fixture
+def snapshot(scratch_db, monkeypatch):
+    from shopping_agent.utils import snapshot
+
+    monkeypatch.setattr(snapshot, "CATALOG_SNAPSHOT", str(scratch_db / "catalog_snapshot.db"))
+    monkeypatch.setattr(snapshot, "_checked_at", 0.0)
+    return snapshot
+
+
+def update(sql: str, *params) -> None:
+    conn = sqlite3.connect("ecommerce_test.db")
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def product_name(product_id: int) -> str:
+    from shopping_agent.utils.tools import product_details
+
+    return product_details.invoke({"product_id": product_id})["name"]
+
+
+def test_snapshot_is_republished_after_the_catalog_changes(snapshot, monkeypatch):
+    monkeypatch.setattr(snapshot, "CATALOG_SNAPSHOT_REFRESH", 0.0)
+    before = product_name(3)
+    update("UPDATE products SET name = 'Renamed' WHERE product_id = 3;")
+
+    # The read that notices the change starts the publish and is served the old copy
+    assert product_name(3) == before
+    deadline = time.monotonic() + 5
+    while product_name(3) != "Renamed" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert product_name(3) == "Renamed"
+
+
+def test_checkout_leaves_the_snapshot_alone(snapshot, monkeypatch):
+    from shopping_agent.utils.tools import add_to_cart, checkout
+
+    published = []
+    monkeypatch.setattr(snapshot, "CATALOG_SNAPSHOT_REFRESH", 0.0)
+    monkeypatch.setattr(snapshot, "_republish_quietly", published.append)
+    product_name(3)
+
+    add_to_cart.invoke({"user_id": 1, "product_id": 3, "quantity": 1})
+    assert checkout.invoke({"user_id": 1}).startswith("✅")
+    product_name(3)
+    # The publish would run on its own thread; give it time to show up
+    time.sleep(0.1)
+    assert published == []
+
+    update("UPDATE products SET price = price + 1 WHERE product_id = 3;")
+    product_name(3)
+    deadline = time.monotonic() + 5
+    while not published and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert published == [snapshot.CATALOG_SNAPSHOT]
+
+
+def test_in_stock_filter_uses_live_stock(snapshot, monkeypatch):
+    from shopping_agent.utils.tools import filter_products
+
+    monkeypatch.setattr(snapshot, "CATALOG_SNAPSHOT_REFRESH", 3600.0)
+    update("UPDATE products SET stock = 0 WHERE product_id = 1;")
+    product_name(1)
+    # Neither change reaches the snapshot
+    update("UPDATE products SET stock = 7 WHERE product_id = 1;")
+    update("UPDATE products SET stock = 0 WHERE product_id = 2;")
+
+    ids = [p["product_id"] for p in filter_products.invoke({"in_stock": True, "limit": 100})]
+    assert 1 in ids
+    assert 2 not in ids
+
+
+def test_live_stock_reuses_the_read_connection(scratch_db, monkeypatch):
+    from shopping_agent.utils import db, snapshot
+
+    snapshot.live_stock([1, 2])
+    opened = []
+    open_connection = db.open_connection
+    monkeypatch.setattr(db, "open_connection", lambda *args, **kwargs: opened.append(args) or open_connection(*args, **kwargs))
+
+    for _ in range(3):
+        assert set(snapshot.live_stock([1, 2])) == {1, 2}
+    assert opened == []
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from shopping_agent.utils import state
+from shopping_agent.utils.state import bounded_ui_reducer
+
+
+def ui(name, id, **props):
+    return {"type": "ui", "id": id, "name": name, "props": props, "metadata": {}}
+
+
+def apply(*updates):
+    current = []
+    for update in updates:
+        current = bounded_ui_reducer(current, update)
+    return current
+
+
+def test_count_cap_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_MESSAGES", 3)
+    result = apply(*([ui("product_details", f"m{i}", product_id=i)] for i in range(5)))
+    assert [m["id"] for m in result] == ["m2", "m3", "m4"]
+
+
+def test_byte_cap_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_BYTES", 1000)
+    result = apply(*([ui("product_details", f"m{i}", text="x" * 300)] for i in range(6)))
+    assert len(result) < 6
+    assert result[-1]["id"] == "m5"
+    assert sum(m["metadata"]["bytes"] for m in result) <= 1000
+
+
+def test_singleton_keeps_latest_render_only():
+    result = apply(
+        [ui("view_cart", "cart1", total=1)],
+        [ui("product_details", "p1", product_id=1)],
+        [ui("view_cart", "cart2", total=2)],
+    )
+    assert [m["id"] for m in result] == ["p1", "cart2"]
+
+
+def test_oversize_newest_entry_is_trimmed(monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_BYTES", 2000)
+    rows = [{"product_id": i, "name": f"Product {i}"} for i in range(500)]
+    (entry,) = apply([ui("list_products", "big", products=rows)])
+    assert entry["props"]["truncated"] is True
+    assert 0 < len(entry["props"]["products"]) < 500
+    assert entry["metadata"]["bytes"] <= 2000
+
+
+def test_oversize_entry_without_lists_is_dropped(monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_BYTES", 500)
+    assert apply([ui("weather", "w", text="x" * 1000)]) == []
+
+
+def test_merge_updates_recorded_size():
+    first = ui("list_products", "l", page_0=[1])
+    merged = {**ui("list_products", "l", page_1=list(range(100))), "metadata": {"merge": True}}
+    (entry,) = apply([first], [merged])
+    assert entry["props"]["page_1"] == list(range(100))
+    assert entry["metadata"]["bytes"] >= len(json.dumps(list(range(100))))
+
+
+@pytest.mark.parametrize("evicted", [True, False])
+def test_removing_an_entry(evicted, monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_MESSAGES", 1)
+    current = apply([ui("product_details", "a")], [ui("product_details", "b")])
+    target = "a" if evicted else "b"
+    result = bounded_ui_reducer(current, [{"type": "remove-ui", "id": target}])
+    assert [m["id"] for m in result] == ([] if not evicted else ["b"])
+
+
+def test_entry_grown_by_merges_stays_under_byte_cap(monkeypatch):
+    monkeypatch.setattr(state, "UI_MAX_BYTES", 5000)
+    pages = (
+        [{**ui("list_products", "l", **{f"page_{n}": list(range(n, n + 25))}), "metadata": {"merge": True}}]
+        for n in range(200)
+    )
+    (entry,) = apply(*pages)
+    assert entry["props"]["truncated"] is True
+    assert entry["metadata"]["bytes"] <= 5000
+    assert len(json.dumps(entry)) <= 5000 + 100
+
+
+# Model-answered turns from the fake_llm script, and routed ones
+TURNS = [
+    "browse the catalog",
+    "search for apple",
+    "show me the products",
+    "view my cart",
+    "show product 2",
+    "add product 3 to my cart",
+    "what do you sell",
+]
+
+
+def test_ui_state_stays_flat_over_a_long_session(graph):
+    config = {"configurable": {"thread_id": "long", "user_id": 1}}
+    sizes = {}
+    for turn in range(1, 201):
+        graph.invoke({"messages": [HumanMessage(TURNS[turn % len(TURNS)])]}, config)
+        if turn in (20, 200):
+            ui = graph.checkpointer.get_tuple(config).checkpoint["channel_values"]["ui"]
+            sizes[turn] = (len(ui), len(graph.checkpointer.serde.dumps_typed(ui)[1]))
+
+    assert {m["name"] for m in graph.get_state(config).values["ui"]} >= {"list_products", "view_cart"}
+    (count_20, bytes_20), (count_200, bytes_200) = sizes[20], sizes[200]
+    assert count_200 <= min(count_20, state.UI_MAX_MESSAGES)
+    assert bytes_200 <= bytes_20 * 1.1
@@ -0,0 +1,87 @@
+from typing import Callable, Optional
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from fake_llm import ScriptedChatModel
+
+
+class BrokenModel(ScriptedChatModel):
+    """Answers like ScriptedChatModel, then lets ``breaks`` spoil the answer."""
+
+    breaks: Optional[Callable[[AIMessage], AIMessage]] = None
+
+    def _next_message(self, messages):
+        message = super()._next_message(messages)
+        return self.breaks(message) if self.breaks else message
+
+
+def malformed(message: AIMessage) -> AIMessage:
+    return AIMessage(
+        content="",
+        invalid_tool_calls=[{"name": "list_products", "args": "{oops", "id": "call_1", "error": "bad JSON"}],
+    )
+
+
+def unknown_tool(message: AIMessage) -> AIMessage:
+    message.tool_calls[0]["name"] = "list_all_products"
+    return message
+
+
+def bad_args(message: AIMessage) -> AIMessage:
+    message.tool_calls[0]["args"]["product_id"] = "three"
+    return message
+
+
+@pytest.fixture
+def router(scratch_db, monkeypatch):
+    from shopping_agent import shopping_agent
+    from shopping_agent.utils import tiering
+
+    monkeypatch.setattr(tiering, "MODEL_TIERING", True)
+    return tiering.ModelRouter(shopping_agent.tools), frozenset(tool.name for tool in shopping_agent.tools)
+
+
+def ask(router, utterance: str, names, breaks=None):
+    models = {"small": BrokenModel(breaks=breaks), "large": ScriptedChatModel()}
+    messages = [HumanMessage(utterance)]
+    response = router.invoke(messages, messages, names, lambda names, tier: models[tier])
+    return response, models
+
+
+def test_easy_turn_stays_on_the_small_model(router):
+    router, names = router
+    response, models = ask(router, "browse the catalog", names)
+
+    assert response.response_metadata["tier"] == "small"
+    assert response.tool_calls[0]["name"] == "list_products"
+    assert (models["small"].calls, models["large"].calls) == (1, 0)
+    assert router.escalations == {}
+
+
+def test_hard_turn_goes_to_the_large_model(router):
+    router, names = router
+    response, models = ask(router, "which of these laptops should I get for video editing", names)
+
+    assert response.response_metadata["tier"] == "large"
+    assert (models["small"].calls, models["large"].calls) == (0, 1)
+
+
+@pytest.mark.parametrize(
+    "utterance, breaks, bound, reason",
+    [
+        ("browse the catalog", malformed, None, "malformed"),
+        ("browse the catalog", unknown_tool, None, "unknown_tool"),
+        ("add product 3 to my cart", None, {"list_products", "search_products"}, "unknown_tool"),
+        ("add product 3 to my cart", bad_args, None, "bad_args"),
+    ],
+    ids=["malformed", "unknown", "unbound", "schema-invalid"],
+)
+def test_bad_small_model_tool_call_is_redone_by_the_large_model(router, utterance, breaks, bound, reason):
+    router, names = router
+    response, models = ask(router, utterance, frozenset(bound) if bound else names, breaks)
+
+    assert router.escalations == {reason: 1}
+    assert response.response_metadata["tier"] == "large"
+    assert (models["small"].calls, models["large"].calls) == (1, 1)
+    assert router.metrics()["large"]["calls"] == 1
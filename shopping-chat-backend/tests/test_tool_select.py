@@ -0,0 +1,48 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+@pytest.fixture
+def selector(monkeypatch):
+    from shopping_agent.shopping_agent import tools
+    from shopping_agent.utils import tool_select
+
+    monkeypatch.setattr(tool_select, "TOOL_SELECTION", True)
+    return tool_select.ToolSelector(tools)
+
+
+def after(tool_name: str, utterance: str):
+    """A thread whose previous turn called tool_name, then the next user message."""
+    return [
+        HumanMessage("earlier request"),
+        AIMessage("", tool_calls=[{"name": tool_name, "args": {}, "id": "call_1"}]),
+        ToolMessage("result", tool_call_id="call_1", name=tool_name),
+        AIMessage("Here you go."),
+        HumanMessage(utterance),
+    ]
+
+
+@pytest.mark.parametrize("utterance", ["I want a Logitech mouse", "do you carry headphones?", "is the kindle any good?"])
+def test_shopping_request_after_weather_binds_every_tool(selector, utterance):
+    assert selector.select(after("get_weather", utterance)) == selector.names
+
+
+def test_follow_up_after_cart_keeps_the_cart_tools(selector):
+    from shopping_agent.utils.tool_select import TOOL_GROUPS
+
+    selected = selector.select(after("add_to_cart", "yes, two"))
+    assert selected == TOOL_GROUPS["cart"]
+
+
+def test_follow_up_after_catalog_keeps_the_catalog_tools(selector):
+    from shopping_agent.utils.tool_select import TOOL_GROUPS
+
+    assert selector.select(after("top_products", "the second one")) == TOOL_GROUPS["catalog"]
+
+
+def test_small_talk_binds_no_tools(selector):
+    assert selector.select(after("get_weather", "thanks")) == frozenset()
+
+
+def test_message_with_an_intent_binds_its_group(selector):
+    assert selector.select(after("add_to_cart", "what's the weather in Paris")) == frozenset({"get_weather"})